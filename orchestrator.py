@@ -4,15 +4,44 @@ Master Orchestrator
 Автоматизація повного циклу тестування AWS інфраструктури
 """
 
+import asyncio
+import socket
 import subprocess
 import time
 import json
+import math
 import os
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 import boto3
 
+from scripts.load_profiles import parse_profile
+from scripts.request_mix import AccessLogReplay, RequestMix
+from scripts.streaming_file import StreamingFileWriter
+from scripts.live_metrics import DEFAULT_PORT as LIVE_METRICS_PORT, live_samples
+
 class CloudOrchestrator:
+    # Налаштування режиму 'search' (пошук максимального стійкого RPS), перевизначаються ключем 'search' в конфігурації
+    DEFAULT_SEARCH = {
+        'slo_p99': 0.5,         # Допустимий P99, с
+        'max_error_rate': 0.01,  # Допустима частка помилок
+        'step_duration': 10,    # Тривалість однієї проби, с
+        'max_steps': 12,        # Максимум проб
+    }
+    SEARCH_STEP_OVERHEAD = 5  # Пауза між пробами та запуск воркерів, с
+    # Запис current_test.json для dashboard, перевизначається ключем 'streaming' в конфігурації
+    DEFAULT_STREAMING = {
+        'max_rate': 2.0,  # Максимум записів на секунду
+        'deltas': False,  # Додатково писати нові точки графіка в current_test.delta.json
+        'live_port': LIVE_METRICS_PORT,  # NDJSON потік metrics_collector через SSH тунель (null - опитування scp)
+    }
+    TIMELINE_POINTS = 50  # Точок графіка в current_test.json
+    DEFAULT_TARGET_PROCESS = 'nginx'  # Веб-сервер target інстансу (terraform/ec2.tf)
+    # Open-loop розподіл запитів для профілю навантаження: у closed-loop режимі повільна ціль
+    # знижує навантаження (coordinated omission) і профіль не відтворюється
+    PROFILE_ARRIVAL_MODES = ('uniform', 'poisson')
+
     def __init__(self, config_file=None):
         self.terraform_dir = Path("terraform")
         self.results_dir = Path("results")
@@ -26,12 +55,44 @@ class CloudOrchestrator:
             self.rps_levels = config.get('rps_levels', [500, 2000, 5000])
             self.test_duration = config.get('test_duration', 60)
             self.test_mode = config.get('mode', 'full')
+            # Профіль навантаження (напр. 'steps:start=500,step=500,hold=30,count=10'):
+            # один безперервний тест на інстанс замість сітки rps_levels
+            self.load_profile = config.get('load_profile')
+            self.profile_arrival = config.get('profile_arrival', 'uniform')
+            self.search_config = {**self.DEFAULT_SEARCH, **config.get('search', {})}
+            # Локальний JSON файл суміші ендпоінтів (копіюється на client перед тестом)
+            self.request_mix = config.get('request_mix')
+            # Відтворення access-логу: {"log": "access.log", "speed": 60}
+            self.replay = config.get('replay')
+            self.streaming_config = {**self.DEFAULT_STREAMING, **config.get('streaming', {})}
+            # Процеси досліджуваного сервера: їхні CPU/RAM ідуть у критерії оптимізації (null - весь хост)
+            self.target_process = config.get('target_process', self.DEFAULT_TARGET_PROCESS)
         else:
             # Default конфігурація для магістерської роботи
             self.instance_types = ['t3.micro', 't3.small', 't3.medium']
             self.rps_levels = [500, 2000, 5000]
             self.test_duration = 60
             self.test_mode = 'full'
+            self.load_profile = None
+            self.profile_arrival = 'uniform'
+            self.search_config = dict(self.DEFAULT_SEARCH)
+            self.request_mix = None
+            self.replay = None
+            self.streaming_config = dict(self.DEFAULT_STREAMING)
+            self.target_process = self.DEFAULT_TARGET_PROCESS
+
+        # Перевіряємо профіль одразу, а не після розгортання інфраструктури
+        self.profile_peak = math.ceil(parse_profile(self.load_profile, self.test_duration).peak()) \
+            if self.load_profile else None
+        if self.profile_arrival not in self.PROFILE_ARRIVAL_MODES:
+            raise ValueError(f"profile_arrival має бути одним з: {', '.join(self.PROFILE_ARRIVAL_MODES)}")
+        if self.request_mix:
+            RequestMix.from_file(self.request_mix)
+        if self.replay and (self.test_mode == 'search' or self.load_profile):
+            raise ValueError("replay не поєднується з mode: search та load_profile")
+        # Піковий RPS відтворення визначає кількість воркерів на client
+        self.replay_peak = max(math.ceil(AccessLogReplay(self.replay['log'], self.replay.get('speed', 1.0))
+                                         .peak_rps()), 1) if self.replay else None
 
         self.results = []
 
@@ -70,6 +131,18 @@ class CloudOrchestrator:
             self.log(f"  RPS Levels: {config.get('rps_levels', [])}", "INFO")
             self.log(f"  Duration: {config.get('test_duration', 60)}s", "INFO")
             self.log(f"  Mode: {config.get('mode', 'full')}", "INFO")
+            if config.get('mode') == 'search':
+                self.log(f"  Search: {config.get('search', {})}", "INFO")
+            if config.get('load_profile'):
+                self.log(f"  Load profile: {config['load_profile']}", "INFO")
+            if config.get('request_mix'):
+                self.log(f"  Request mix: {config['request_mix']}", "INFO")
+            if config.get('replay'):
+                self.log(f"  Replay: {config['replay']}", "INFO")
+            if 'target_process' in config:
+                self.log(f"  Target process: {config['target_process']}", "INFO")
+            if config.get('streaming'):
+                self.log(f"  Streaming: {config['streaming']}", "INFO")
 
             return config
         except Exception as e:
@@ -239,12 +312,27 @@ class CloudOrchestrator:
     def monitor_test_realtime(self, target_ip, instance_type, rps, duration):
         """Real-Time моніторинг тесту з оновленням dashboard (WOW-ефект!)"""
         streaming_file = Path("current_test.json")
+        # Атомарна підміна файлу: dashboard ніколи не читає напівзаписаний JSON
+        stream = StreamingFileWriter(str(streaming_file), self.streaming_config['max_rate'],
+                                     self.streaming_config['deltas'])
         start_time = time.time()
         end_time = start_time + duration
 
         self.log(f"📊 Real-Time streaming в {streaming_file}...", "INFO")
 
-        while time.time() < end_time:
+        live_port = self.streaming_config['live_port']
+        if live_port:
+            received = self.monitor_live_stream(stream, target_ip, live_port, instance_type, rps, start_time, end_time)
+            if received is not None:
+                stream.update_status('completed')
+                self.log(f"✅ Real-Time моніторинг завершено (live потік, {received} зразків)", "SUCCESS")
+                return
+            self.log("Live потік недоступний, повертаємось до опитування через scp", "WARN")
+
+        # Хоча б одне опитування: порожній live потік міг вичерпати весь час тесту
+        polled = False
+        while not polled or time.time() < end_time:
+            polled = True
             try:
                 # Завантажуємо поточні метрики з target сервера
                 temp_metrics = Path("temp_metrics.json")
@@ -288,8 +376,7 @@ class CloudOrchestrator:
                         }
 
                         # Записуємо в локальний файл для dashboard
-                        with open(streaming_file, 'w') as f:
-                            json.dump(streaming_data, f, indent=2)
+                        stream.publish(streaming_data)
 
                         elapsed = int(time.time() - start_time)
                         self.log(
@@ -309,22 +396,120 @@ class CloudOrchestrator:
             time.sleep(2)
 
         # Після завершення тесту змінюємо статус
-        if streaming_file.exists():
-            with open(streaming_file) as f:
-                final_data = json.load(f)
-            final_data['status'] = 'completed'
-            with open(streaming_file, 'w') as f:
-                json.dump(final_data, f, indent=2)
+        stream.update_status('completed')
 
         self.log("✅ Real-Time моніторинг завершено", "SUCCESS")
 
-    def run_test(self, instance_type, rps, target_ip, client_ip, target_http_ip=None):
+    def open_ssh_tunnel(self, host, remote_port, timeout=10):
+        """
+        SSH тунель localhost:<вільний порт> → host:127.0.0.1:remote_port
+
+        Returns:
+            (процес ssh, локальний порт) або None якщо тунель не піднявся
+        """
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            local_port = probe.getsockname()[1]
+
+        process = subprocess.Popen(
+            ['ssh', '-o', 'StrictHostKeyChecking=no', '-o', 'ExitOnForwardFailure=yes', '-N',
+             '-L', f'{local_port}:127.0.0.1:{remote_port}', f'ubuntu@{host}'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        deadline = time.time() + timeout
+        while time.time() < deadline and process.poll() is None:
+            try:
+                socket.create_connection(('127.0.0.1', local_port), timeout=1).close()
+                return process, local_port
+            except OSError:
+                time.sleep(0.2)
+
+        process.terminate()
+        return None
+
+    def monitor_live_stream(self, stream, target_ip, live_port, instance_type, rps, start_time, end_time):
+        """
+        Real-Time моніторинг через NDJSON потік metrics_collector (одне SSH з'єднання
+        на весь тест, лише нові зразки замість повного metrics.json кожні 2 секунди)
+
+        Returns:
+            Кількість отриманих зразків або None, якщо тунель не вдалося відкрити, потік
+            обірвався з помилкою чи не надіслав жодного зразка (тоді - опитування scp)
+        """
+        tunnel = self.open_ssh_tunnel(target_ip, live_port)
+        if tunnel is None:
+            return None
+
+        process, local_port = tunnel
+        try:
+            received = asyncio.run(self.consume_live_metrics(stream, local_port, instance_type, rps,
+                                                             start_time, end_time))
+        except Exception as e:
+            self.log(f"Real-Time моніторинг: {e}", "WARN")
+            return None
+        finally:
+            process.terminate()
+            process.wait()
+        return received or None
+
+    async def consume_live_metrics(self, stream, port, instance_type, rps, start_time, end_time):
+        """Отримує зразки з live потоку і публікує стан для dashboard"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(end_time - time.time(), 0)
+        timeline = deque(maxlen=self.TIMELINE_POINTS)
+        last_seq = 0
+        next_log = 0.0
+
+        async for message in live_samples('127.0.0.1', port, deadline):
+            # Після перепідключення сервер повторює історію - пропускаємо вже отримані зразки
+            if message.get('type') != 'sample' or message['seq'] <= last_seq:
+                continue
+            last_seq = message['seq']
+
+            timeline.append({
+                'timestamp': message['timestamp'],
+                'cpu': {'percent': message['cpu']},
+                'memory': {'percent': message['memory']},
+                'is_critical': message['is_critical']
+            })
+            stream.publish({
+                'status': 'testing',
+                'timestamp': message['timestamp'],
+                'test_info': {
+                    'instance_type': instance_type,
+                    'rps': rps,
+                    'total_requests': rps * int(time.time() - start_time)
+                },
+                'current': {
+                    'cpu': message['cpu'],
+                    'memory': message['memory'],
+                    'is_critical': message['is_critical']
+                },
+                'statistics': message['statistics'],
+                'timeline': list(timeline)
+            })
+
+            if loop.time() >= next_log:
+                next_log = loop.time() + 2
+                self.log(
+                    f"📊 {int(time.time() - start_time)}s: CPU={message['cpu']:.1f}% | "
+                    f"RAM={message['memory']:.1f}% | Samples={message['statistics']['samples_count']}",
+                    "PROGRESS"
+                )
+
+        stream.flush()
+        return last_seq
+
+    def run_test(self, instance_type, rps, target_ip, client_ip, target_http_ip=None, load_profile=None):
         """Запуск одного тесту
 
         Args:
+            rps: Цільовий RPS (для профілю - піковий, для режиму search - верхня межа пошуку)
             target_ip: Public IP для SSH доступу до target
             client_ip: Public IP для SSH доступу до client
             target_http_ip: IP для HTTP запитів (private IP якщо в одній VPC)
+            load_profile: Опис профілю навантаження для request_simulator --profile
         """
         # Якщо не вказано окремий HTTP IP, використовуємо target_ip
         if target_http_ip is None:
@@ -332,14 +517,59 @@ class CloudOrchestrator:
 
         self.log(f"Тест: {instance_type} @ {rps} RPS", "PROGRESS")
 
+        # --workers 0: навантаження ділиться між процесами, щоб 2000-5000 RPS не впирались у CPU клієнта
+        if self.test_mode == 'search':
+            # Пошук насичення: серія коротких проб замість тесту з фіксованим RPS
+            search = self.search_config
+            simulator_args = (
+                f"http://{target_http_ip} {rps} {search['step_duration']} --workers 0 --search "
+                f"--slo-p99 {search['slo_p99']} --max-error-rate {search['max_error_rate']} "
+                f"--max-steps {search['max_steps']}"
+            )
+            # Верхня оцінка тривалості: всі проби з паузами
+            run_duration = search['max_steps'] * (search['step_duration'] + self.SEARCH_STEP_OVERHEAD)
+        else:
+            simulator_args = f"http://{target_http_ip} {rps} {self.test_duration} --workers 0 --timeseries test_timeseries.jsonl"
+            if load_profile:
+                # Профіль містить ';' - лапки, щоб bash на client не розбив команду
+                simulator_args += f' --profile \\"{load_profile}\\" --arrival {self.profile_arrival}'
+                self.log(f"Профіль навантаження: {load_profile} ({self.profile_arrival})", "INFO")
+            run_duration = self.test_duration
+
+        if self.request_mix:
+            success, _, stderr = self.run_command(
+                f"scp -o StrictHostKeyChecking=no {self.request_mix} ubuntu@{client_ip}:/home/ubuntu/scripts/request_mix.json"
+            )
+            if not success:
+                self.log(f"Не вдалося скопіювати суміш запитів: {stderr}", "ERROR")
+                return None
+            simulator_args += " --mix request_mix.json"
+            self.log(f"Суміш запитів: {self.request_mix}", "INFO")
+
+        if self.replay:
+            success, _, stderr = self.run_command(
+                f"scp -o StrictHostKeyChecking=no {self.replay['log']} ubuntu@{client_ip}:/home/ubuntu/scripts/replay_access.log"
+            )
+            if not success:
+                self.log(f"Не вдалося скопіювати access-лог: {stderr}", "ERROR")
+                return None
+            simulator_args += f" --replay replay_access.log --speed {self.replay.get('speed', 1.0)}"
+            self.log(f"Відтворення логу: {self.replay['log']} (пік {rps} RPS)", "INFO")
+
         # 1. Запуск metrics_collector на target сервері (в фоні через bash -c)
         self.log(f"Запуск збору метрик на target сервері ({target_ip})...", "INFO")
 
+        live_port = self.streaming_config['live_port']
+        collector_args = f" metrics.json --live-port {live_port}" if live_port else ""
+        if self.target_process:
+            collector_args += f' --process \\"{self.target_process}\\"'
+
         # Використовуємо bash -c з правильним background запуском
         # ОНОВЛЕНО: інтервал 1 секунда для детальних метрик!
         ssh_command = (
             f'ssh -o StrictHostKeyChecking=no -f ubuntu@{target_ip} '
-            f'"bash -c \'cd /home/ubuntu/scripts && python3 metrics_collector.py 1 90 > metrics.log 2>&1 &\'"'
+            f'"bash -c \'cd /home/ubuntu/scripts && python3 metrics_collector.py 1 {run_duration + 30}{collector_args} '
+            f'> metrics.log 2>&1 &\'"'
         )
         success, _, stderr = self.run_command(ssh_command)
 
@@ -355,12 +585,12 @@ class CloudOrchestrator:
         # 2. Запуск request_simulator на client сервері в фоні
         self.log(f"Запуск генерації навантаження {rps} RPS на client ({client_ip})...", "INFO")
         self.log(f"Target HTTP URL: http://{target_http_ip}", "INFO")
-        self.log(f"Тривалість тесту: {self.test_duration} сек", "INFO")
+        self.log(f"Тривалість тесту: {run_duration} сек", "INFO")
 
         # Запускаємо request_simulator в фоновому режимі
         ssh_command = (
             f'ssh -o StrictHostKeyChecking=no -f ubuntu@{client_ip} '
-            f'"bash -c \'cd /home/ubuntu/scripts && python3 request_simulator.py http://{target_http_ip} {rps} {self.test_duration} > test.log 2>&1 &\'"'
+            f'"bash -c \'cd /home/ubuntu/scripts && python3 request_simulator.py {simulator_args} > test.log 2>&1 &\'"'
         )
         success, stdout, stderr = self.run_command(ssh_command)
 
@@ -372,7 +602,7 @@ class CloudOrchestrator:
 
         # Real-Time моніторинг під час виконання тесту (WOW-ефект!)
         self.log("🔥 Real-Time моніторинг активовано!", "INFO")
-        self.monitor_test_realtime(target_ip, instance_type, rps, self.test_duration)
+        self.monitor_test_realtime(target_ip, instance_type, rps, run_duration)
 
         self.log("Генерація навантаження завершена", "SUCCESS")
         
@@ -385,6 +615,7 @@ class CloudOrchestrator:
 
         test_results_file = self.results_dir / f"test_{instance_type}_{rps}rps.json"
         metrics_file = self.results_dir / f"metrics_{instance_type}_{rps}rps.json"
+        timeseries_file = self.results_dir / f"timeseries_{instance_type}_{rps}rps.jsonl"
 
         # Завантажуємо test_results.json з client
         self.log(f"Завантаження test_results.json з client ({client_ip})...", "INFO")
@@ -395,6 +626,14 @@ class CloudOrchestrator:
         if not success:
             self.log(f"Помилка завантаження test_results.json: {stderr}", "WARN")
 
+        # Посекундний часовий ряд клієнта (для зіставлення з метриками сервера)
+        success, _, stderr = self.run_command(
+            f"scp -o StrictHostKeyChecking=no ubuntu@{client_ip}:/home/ubuntu/scripts/test_timeseries.jsonl {timeseries_file}"
+        )
+
+        if not success:
+            self.log(f"Помилка завантаження test_timeseries.jsonl: {stderr}", "WARN")
+
         # Завантажуємо metrics.json з target
         self.log(f"Завантаження metrics.json з target ({target_ip})...", "INFO")
         success, _, stderr = self.run_command(
@@ -416,7 +655,8 @@ class CloudOrchestrator:
                 'rps': rps,
                 'timestamp': datetime.now().isoformat(),
                 'test_results': test_data,
-                'metrics': metrics_data
+                'metrics': metrics_data,
+                'timeseries_file': str(timeseries_file) if timeseries_file.exists() else None
             }
             
             self.log(f"Тест завершено: {instance_type} @ {rps} RPS", "SUCCESS")
@@ -438,6 +678,14 @@ class CloudOrchestrator:
         else:
             self.log(f"Помилка знищення: {stderr}", "WARN")
     
+    def test_rps_levels(self):
+        """RPS рівні тестів на інстанс: верхня межа пошуку, пік профілю чи логу (один тест) або сітка rps_levels"""
+        if self.test_mode == 'search':
+            return [max(self.rps_levels)]
+        if self.replay:
+            return [self.replay_peak]
+        return [self.profile_peak] if self.load_profile else self.rps_levels
+
     def run_full_test_suite(self):
         """Запуск повного набору тестів"""
         self.log("=" * 60)
@@ -482,16 +730,17 @@ class CloudOrchestrator:
                 self.destroy_infrastructure()
                 continue
 
-            # Цикл по всіх RPS
-            for rps in self.rps_levels:
+            # Цикл по всіх RPS (або один тест з профілем навантаження)
+            for rps in self.test_rps_levels():
                 # Використовуємо публічний IP для SSH, приватний для HTTP
-                result = self.run_test(instance_type, rps, target_public_ip, client_ip, target_private_ip)
+                result = self.run_test(instance_type, rps, target_public_ip, client_ip, target_private_ip,
+                                       self.load_profile)
                 
                 if result:
                     self.results.append(result)
                 
                 # Пауза між тестами
-                if rps != self.rps_levels[-1]:
+                if rps != self.test_rps_levels()[-1]:
                     self.log("Пауза 30 секунд між тестами...")
                     time.sleep(30)
             
@@ -509,7 +758,7 @@ class CloudOrchestrator:
         elapsed = time.time() - start_time
         self.log("=" * 60)
         self.log(f"ТЕСТУВАННЯ ЗАВЕРШЕНО ЗА {elapsed/60:.1f} ХВИЛИН", "SUCCESS")
-        self.log(f"Всього тестів: {len(self.results)}/9")
+        self.log(f"Всього тестів: {len(self.results)}/{len(self.instance_types) * len(self.test_rps_levels())}")
         self.log("=" * 60)
 
         # Автоматичний запуск TOPSIS оптимізації
@@ -544,17 +793,19 @@ class CloudOrchestrator:
             import shutil
 
             # Вибираємо один репрезентативний тест для кожного інстансу
-            # ОНОВЛЕНО: використовуємо 500 RPS як базовий рівень
+            # ОНОВЛЕНО: використовуємо 500 RPS як базовий рівень (з профілем чи пошуком - єдиний тест)
+            base_rps = self.test_rps_levels()[0] if self.test_mode == 'search' or self.load_profile or self.replay \
+                else 500
             test_files = [
-                ("results/test_t3.micro_500rps.json", "test_t3_micro.json"),
-                ("results/test_t3.small_500rps.json", "test_t3_small.json"),
-                ("results/test_t3.medium_500rps.json", "test_t3_medium.json"),
+                (f"results/test_t3.micro_{base_rps}rps.json", "test_t3_micro.json"),
+                (f"results/test_t3.small_{base_rps}rps.json", "test_t3_small.json"),
+                (f"results/test_t3.medium_{base_rps}rps.json", "test_t3_medium.json"),
             ]
 
             metrics_files = [
-                ("results/metrics_t3.micro_500rps.json", "metrics_t3_micro.json"),
-                ("results/metrics_t3.small_500rps.json", "metrics_t3_small.json"),
-                ("results/metrics_t3.medium_500rps.json", "metrics_t3_medium.json"),
+                (f"results/metrics_t3.micro_{base_rps}rps.json", "metrics_t3_micro.json"),
+                (f"results/metrics_t3.small_{base_rps}rps.json", "metrics_t3_small.json"),
+                (f"results/metrics_t3.medium_{base_rps}rps.json", "metrics_t3_medium.json"),
             ]
 
             for src, dst in test_files:
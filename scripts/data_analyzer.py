@@ -8,7 +8,9 @@ import json
 import sys
 import logging
 import os
-from typing import Dict
+from typing import Dict, Iterator, List, Optional
+
+from latency_histogram import LatencyHistogram
 
 # Налаштування логування
 logging.basicConfig(
@@ -17,6 +19,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Пороги розпізнавання троттлінгу через вичерпані CPU кредити
+STEAL_THRESHOLD = 10.0  # Середній steal, %
+THROTTLED_SHARE_THRESHOLD = 0.2  # Частка часу тесту у вікнах steal-троттлінгу
+
 def load_json(filename: str) -> Dict:
     """
     Завантажує JSON файл з валідацією
@@ -47,6 +53,23 @@ def load_json(filename: str) -> Dict:
         logger.error(f"Помилка читання файлу {filename}: {e}")
         raise
 
+def analyze_latency_histogram(data: Dict, key: str = 'latency_histogram') -> Dict:
+    """
+    Перцентилі часу відгуку з повного розподілу
+
+    Args:
+        data: Результати request_simulator з полем гістограми
+        key: Назва поля гістограми
+
+    Returns:
+        Словник {'p50': мс, ...} або порожній словник для старих результатів без гістограми
+    """
+    if key not in data:
+        return {}
+
+    histogram = LatencyHistogram.from_dict(data[key])
+    return {name: value * 1000 for name, value in histogram.percentiles().items()}
+
 def analyze_test_results(data: Dict) -> Dict:
     """Аналізує результати тестування"""
     return {
@@ -57,8 +80,29 @@ def analyze_test_results(data: Dict) -> Dict:
         'avg_response_time_ms': data['avg_response_time'] * 1000,
         'min_response_time_ms': data['min_response_time'] * 1000,
         'max_response_time_ms': data['max_response_time'] * 1000,
+        'response_time_percentiles_ms': analyze_latency_histogram(data),
+        # Складові часу відгуку: черга до відправки та обслуговування ціллю
+        'queue_delay_percentiles_ms': analyze_latency_histogram(data.get('queue_delay', {}), 'histogram'),
+        'service_time_percentiles_ms': analyze_latency_histogram(data.get('service_time', {}), 'histogram'),
+        # Старі результати зберігали список рядків замість класів помилок
+        'error_classes': {name: entry['count'] for name, entry in data['errors'].items()}
+            if isinstance(data.get('errors'), dict) else {},
         'rps': data['rps'],
-        'duration': data['duration']
+        'duration': data['duration'],
+        # Фактична пропускна здатність замість заданого RPS
+        'achieved_rps': data['successful_requests'] / data['duration'] if data['duration'] else 0,
+        # Результат пошуку насичення (request_simulator --search), якщо він був
+        'max_sustainable_rps': data.get('saturation', {}).get('max_sustainable_rps'),
+        # Ендпоінти суміші запитів (request_simulator --mix), якщо вона була
+        'endpoints': {
+            name: {
+                'requests': endpoint['requests'],
+                'failed': endpoint['failed'],
+                'share': endpoint['requests'] / data['total_requests'] if data['total_requests'] else 0,
+                'response_time_percentiles_ms': analyze_latency_histogram(endpoint),
+            }
+            for name, endpoint in (data.get('endpoints') or {}).items()
+        },
     }
 
 def analyze_metrics(data: Dict) -> Dict:
@@ -67,34 +111,146 @@ def analyze_metrics(data: Dict) -> Dict:
     
     cpu_values = [m['cpu']['percent'] for m in metrics]
     mem_values = [m['memory']['percent'] for m in metrics]
+    summary_data = data.get('summary', {})
+    steal_windows = [moment for moment in summary_data.get('critical_moments', [])
+                     if moment.get('reason') == 'steal']
     
+    if data.get('collection_info', {}).get('retention_minutes'):
+        # Повна роздільність лише за останні хвилини - загальні значення беремо зі зведення збирача
+        summary = data['summary']
+        cpu = {key: summary['cpu'][key] for key in ('avg', 'min', 'max')}
+        memory = {key: summary['memory'][key] for key in ('avg', 'min', 'max')}
+        samples = data['collection_info']['samples_count']
+        # Складові часу CPU - з потокової статистики збирача за всі зразки, а не за збережений хвіст
+        breakdown = summary.get('cpu_breakdown')
+        cpu_breakdown = {field: {key: breakdown[field][key] for key in ('avg', 'max')}
+                         for field in ('steal', 'iowait', 'softirq')} if breakdown else None
+    else:
+        cpu = {'avg': sum(cpu_values) / len(cpu_values), 'min': min(cpu_values), 'max': max(cpu_values)}
+        memory = {'avg': sum(mem_values) / len(mem_values), 'min': min(mem_values), 'max': max(mem_values)}
+        samples = len(metrics)
+        breakdowns = [m['cpu']['times_percent'] for m in metrics if 'times_percent' in m['cpu']]
+        cpu_breakdown = {
+            field: {
+                'avg': sum(b.get(field, 0.0) for b in breakdowns) / len(breakdowns),
+                'max': max(b.get(field, 0.0) for b in breakdowns),
+            }
+            for field in ('steal', 'iowait', 'softirq')
+        } if breakdowns else None
+
     return {
-        'cpu': {
-            'avg': sum(cpu_values) / len(cpu_values),
-            'min': min(cpu_values),
-            'max': max(cpu_values),
-        },
-        'memory': {
-            'avg': sum(mem_values) / len(mem_values),
-            'min': min(mem_values),
-            'max': max(mem_values),
+        'cpu': cpu,
+        'memory': memory,
+        'samples': samples,
+        # Складові часу CPU: steal - час, відібраний гіпервізором (вичерпані кредити t3)
+        'cpu_breakdown': cpu_breakdown,
+        # Лічильники зведення - за весь збір (список вікон з --retention обмежений останніми)
+        'steal_windows': summary_data.get('steal_windows_count', len(steal_windows)),
+        # Вікна steal охоплюють увесь збір - ділимо на загальну кількість зразків
+        'steal_throttled_share': summary_data.get('steal_throttled_samples',
+                                                  sum(w['samples'] for w in steal_windows)) / samples if samples else 0.0,
+        # Окремий облік процесів (metrics_collector --pids/--process): 'target' та 'collector'
+        'processes': {
+            name: {
+                'cpu_avg': group['cpu_percent']['avg'],
+                'cpu_p95': group['cpu_percent']['p95'],
+                'memory_avg': group['memory_percent']['avg'],
+                'peak_rss_mb': group['peak_rss'] / 1024 / 1024,
+                'cpu_time_total': group['cpu_time_total'],
+                'max_processes': group['max_processes'],
+            }
+            for name, group in data.get('summary', {}).get('processes', {}).items()
         },
-        'samples': len(metrics)
+        # Швидкості мережі та диска за інтервал (metrics_collector рахує їх з монотонним часом)
+        'throughput': analyze_rates(data.get('summary', {}).get('rates'))
+    }
+
+def analyze_rates(rates: Optional[Dict]) -> Optional[Dict]:
+    """Пропускна здатність мережі (Mbit/s) та диска (IOPS, MB/s) з зведення швидкостей"""
+    if not rates:
+        return None  # Файл метрик старішого формату - лише накопичувальні лічильники
+    network, disk = rates['network'], rates['disk']
+    return {
+        'network_mbps': {key: network['bytes_total'][key] * 8 / 1e6 for key in ('avg', 'p95', 'max')},
+        'network_recv_mbps_avg': network['bytes_recv']['avg'] * 8 / 1e6,
+        'network_sent_mbps_avg': network['bytes_sent']['avg'] * 8 / 1e6,
+        'packets_per_sec_avg': network['packets_recv']['avg'] + network['packets_sent']['avg'],
+        'drops_per_sec': {key: network['drops_in'][key] + network['drops_out'][key] for key in ('avg', 'max')},
+        'disk_iops': {key: disk['read_iops'][key] + disk['write_iops'][key] for key in ('avg', 'p95')},
+        'disk_mb_per_sec': {key: (disk['read_bytes'][key] + disk['write_bytes'][key]) / 1e6 for key in ('avg', 'p95')},
     }
 
+def load_timeseries(filename: str) -> Iterator[Dict]:
+    """
+    Потоково читає посекундний часовий ряд request_simulator (NDJSON)
+
+    Raises:
+        FileNotFoundError: Якщо файл не знайдено
+    """
+    if not os.path.exists(filename):
+        logger.error(f"Файл не знайдено: {filename}")
+        raise FileNotFoundError(f"Файл {filename} не існує")
+
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def align_timeseries(timeseries: Iterator[Dict], metrics_data: Dict) -> List[Dict]:
+    """
+    Поєднує часовий ряд клієнта з метриками сервера по секундах
+
+    Returns:
+        Рядки {'timestamp', 'rps', 'failed', 'p99_ms', 'cpu', 'memory'} для секунд,
+        де є і клієнтські дані, і зразок метрик
+    """
+    # Ключ - мітка часу з точністю до секунди (обидва боки пишуть локальний час в ISO)
+    samples = {m['timestamp'][:19]: m for m in metrics_data['metrics']}
+
+    aligned = []
+    for record in timeseries:
+        sample = samples.get(record['timestamp'][:19])
+        if sample is None:
+            continue
+        aligned.append({
+            'timestamp': record['timestamp'],
+            'rps': record['rps'],
+            'failed': record['failed'],
+            'p99_ms': record['latency']['p99'] * 1000,
+            'cpu': sample['cpu']['percent'],
+            'memory': sample['memory']['percent'],
+        })
+    return aligned
+
 def create_instance_profile(test_results: Dict, metrics: Dict, instance_type: str, cost_per_hour: float) -> Dict:
-    """Створює профіль інстансу для оптимізації"""
+    """
+    Створює профіль інстансу для оптимізації
+
+    Якщо процеси досліджуваного сервера відстежувались окремо, критерії cpu_usage
+    та memory_usage беруться з них - без збирача метрик і фонових агентів. Якщо
+    жодного процесу сервера не знайдено, лишаються показники всього хоста.
+    """
+    target = metrics.get('processes', {}).get('target')
+    if target and not target['max_processes']:
+        logger.warning("⚠️  Процеси сервера не знайдено - cpu_usage та memory_usage за всім хостом")
+        target = None
+    usage = target if target else {'cpu_avg': metrics['cpu']['avg'], 'memory_avg': metrics['memory']['avg']}
     return {
         'instance_type': instance_type,
-        'performance': test_results['rps'],  # requests/sec
+        # Виміряний максимальний стійкий RPS, інакше - фактична пропускна здатність тесту
+        'performance': test_results['max_sustainable_rps']
+            if test_results.get('max_sustainable_rps') is not None else test_results['achieved_rps'],  # requests/sec
         'response_time': test_results['avg_response_time_ms'],  # ms
-        'cpu_usage': metrics['cpu']['avg'],  # %
-        'memory_usage': metrics['memory']['avg'],  # %
+        'cpu_usage': usage['cpu_avg'],  # %
+        'memory_usage': usage['memory_avg'],  # %
+        'usage_source': 'target_processes' if target else 'host',
+        # P95 мережевого трафіку - кандидат у критерії TOPSIS (None для старих файлів метрик)
+        'network_mbps': metrics['throughput']['network_mbps']['p95'] if metrics.get('throughput') else None,
         'cost': cost_per_hour,  # $/hour
         'success_rate': test_results['success_rate'],  # %
     }
 
-def print_report(test_results: Dict, metrics: Dict, instance_profile: Dict):
+def print_report(test_results: Dict, metrics: Dict, instance_profile: Dict, timeline: List[Dict] = None):
     """Друкує детальний звіт"""
     print("\n" + "=" * 70)
     print("📊 ЗВІТ ПРО ТЕСТУВАННЯ")
@@ -109,11 +265,30 @@ def print_report(test_results: Dict, metrics: Dict, instance_profile: Dict):
     print(f"  ❌ Невдалих: {test_results['failed_requests']}")
     print(f"  Успішність: {test_results['success_rate']:.2f}%")
     print(f"  RPS (запитів/сек): {test_results['rps']}")
+    print(f"  Фактичний RPS: {test_results['achieved_rps']:.1f}")
+    if test_results.get('max_sustainable_rps') is not None:
+        print(f"  🏁 Максимальний стійкий RPS (за SLO): {test_results['max_sustainable_rps']}")
+    for error_class, count in test_results.get('error_classes', {}).items():
+        print(f"  ⚠️  {error_class}: {count}")
     
     print("\n⏱️  ЧАС ВІДГУКУ:")
     print(f"  Середній: {test_results['avg_response_time_ms']:.2f} мс")
     print(f"  Мінімум: {test_results['min_response_time_ms']:.2f} мс")
     print(f"  Максимум: {test_results['max_response_time_ms']:.2f} мс")
+    for name, value in test_results.get('response_time_percentiles_ms', {}).items():
+        print(f"  {name.upper()}: {value:.2f} мс")
+    queue_delay = test_results.get('queue_delay_percentiles_ms')
+    service_time = test_results.get('service_time_percentiles_ms')
+    if queue_delay and service_time:
+        print(f"  Черга / обслуговування: P50 {queue_delay['p50']:.2f} / {service_time['p50']:.2f} мс, "
+              f"P99 {queue_delay['p99']:.2f} / {service_time['p99']:.2f} мс")
+
+    if test_results.get('endpoints'):
+        print("\n🧭 ЕНДПОІНТИ:")
+        for name, endpoint in sorted(test_results['endpoints'].items(), key=lambda item: -item[1]['requests']):
+            percentiles = endpoint['response_time_percentiles_ms']
+            print(f"  {name}: {endpoint['share']:.1%} запитів, помилок {endpoint['failed']} | "
+                  f"P50 {percentiles.get('p50', 0):.2f} мс, P99 {percentiles.get('p99', 0):.2f} мс")
     
     print("\n💻 ВИКОРИСТАННЯ РЕСУРСІВ:")
     print(f"  CPU:")
@@ -124,12 +299,56 @@ def print_report(test_results: Dict, metrics: Dict, instance_profile: Dict):
     print(f"    Середнє: {metrics['memory']['avg']:.2f}%")
     print(f"    Мінімум: {metrics['memory']['min']:.2f}%")
     print(f"    Максимум: {metrics['memory']['max']:.2f}%")
+    throughput = metrics.get('throughput')
+    if throughput:
+        print(f"  Мережа: сер. {throughput['network_mbps']['avg']:.2f} Mbit/s, p95 {throughput['network_mbps']['p95']:.2f}, "
+              f"макс. {throughput['network_mbps']['max']:.2f} | відкинуто пакетів/с: "
+              f"{throughput['drops_per_sec']['avg']:.2f} (макс. {throughput['drops_per_sec']['max']:.0f})")
+        print(f"  Диск: сер. {throughput['disk_iops']['avg']:.1f} IOPS, {throughput['disk_mb_per_sec']['avg']:.2f} MB/s "
+              f"(p95 {throughput['disk_iops']['p95']:.1f} IOPS, {throughput['disk_mb_per_sec']['p95']:.2f} MB/s)")
+    processes = metrics.get('processes', {})
+    if 'target' in processes:
+        target = processes['target']
+        if target['max_processes']:
+            print(f"  Досліджуваний сервер: CPU {target['cpu_avg']:.2f}% (p95 {target['cpu_p95']:.2f}%), "
+                  f"RAM {target['memory_avg']:.2f}% (пік RSS {target['peak_rss_mb']:.1f} MB) - критерії оптимізації")
+        else:
+            print("  ⚠️  Процеси досліджуваного сервера не знайдено - критерії оптимізації за всім хостом")
+    if 'collector' in processes:
+        collector = processes['collector']
+        print(f"  Збирач метрик: CPU {collector['cpu_avg']:.2f}%, RAM {collector['memory_avg']:.2f}% "
+              f"(всього {collector['cpu_time_total']:.2f}с CPU)")
     
+    if timeline:
+        worst = max(timeline, key=lambda row: row['p99_ms'])
+        print("\n🕒 ЧАСОВИЙ РЯД (клієнт + сервер):")
+        print(f"  Секунд з даними обох сторін: {len(timeline)}")
+        print(f"  Найгірша секунда: {worst['timestamp']} - P99 {worst['p99_ms']:.2f} мс, "
+              f"{worst['rps']} RPS, CPU {worst['cpu']:.1f}%, RAM {worst['memory']:.1f}%")
+
+    breakdown = metrics.get('cpu_breakdown')
+    if breakdown:
+        print(f"  Steal / iowait / softirq (сер.): {breakdown['steal']['avg']:.1f} / "
+              f"{breakdown['iowait']['avg']:.1f} / {breakdown['softirq']['avg']:.1f}% "
+              f"(макс. steal {breakdown['steal']['max']:.1f}%)")
+        if metrics.get('steal_windows'):
+            print(f"  Вікон steal-троттлінгу: {metrics['steal_windows']} "
+                  f"({metrics['steal_throttled_share']:.0%} часу тесту)")
+
+    # Високий steal означає, що CPU забирає гіпервізор (вичерпані кредити t3), а не навантаження
+    credits_exhausted = bool(breakdown) and (breakdown['steal']['avg'] >= STEAL_THRESHOLD
+                                             or metrics.get('steal_throttled_share', 0) >= THROTTLED_SHARE_THRESHOLD)
+
     print("\n💡 ВИСНОВКИ:")
-    if metrics['cpu']['avg'] < 20:
-        print("  ⚠️  CPU недовантажений - можна використати менший інстанс")
+    if metrics['cpu']['avg'] > 80 and credits_exhausted:
+        print(f"  🪫 Вичерпано CPU кредити: steal {breakdown['steal']['avg']:.1f}% - інстанс троттлиться "
+              f"гіпервізором, а не перевантажений роботою (потрібен unlimited режим або не-burstable інстанс)")
     elif metrics['cpu']['avg'] > 80:
         print("  ⚠️  CPU перевантажений - потрібен більший інстанс")
+    elif credits_exhausted:
+        print("  🪫 CPU кредити вичерпувались під час тесту - результати занижені троттлінгом")
+    elif metrics['cpu']['avg'] < 20:
+        print("  ⚠️  CPU недовантажений - можна використати менший інстанс")
     else:
         print("  ✅ CPU використовується оптимально")
     
@@ -145,7 +364,7 @@ def print_report(test_results: Dict, metrics: Dict, instance_profile: Dict):
 def main():
     """Головна функція"""
     if len(sys.argv) < 3:
-        print("Використання: python data_analyzer.py <test_results.json> <metrics.json> [instance_type] [cost_per_hour]")
+        print("Використання: python data_analyzer.py <test_results.json> <metrics.json> [instance_type] [cost_per_hour] [timeseries.jsonl]")
         print("Приклад: python data_analyzer.py test_results_client.json metrics_target.json t3.small 0.0208")
         sys.exit(1)
     
@@ -153,6 +372,7 @@ def main():
     metrics_file = sys.argv[2]
     instance_type = sys.argv[3] if len(sys.argv) > 3 else "t3.small"
     cost = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0208
+    timeseries_file = sys.argv[5] if len(sys.argv) > 5 else None
     
     # Завантаження даних
     print("📂 Завантаження даних...")
@@ -164,9 +384,10 @@ def main():
     test_results = analyze_test_results(test_data)
     metrics = analyze_metrics(metrics_data)
     instance_profile = create_instance_profile(test_results, metrics, instance_type, cost)
+    timeline = align_timeseries(load_timeseries(timeseries_file), metrics_data) if timeseries_file else []
     
     # Звіт
-    print_report(test_results, metrics, instance_profile)
+    print_report(test_results, metrics, instance_profile, timeline)
     
     # Збереження профілю для оптимізації
     output_file = f'instance_profile_{instance_type}.json'
@@ -174,7 +395,8 @@ def main():
         json.dump({
             'test_results': test_results,
             'metrics': metrics,
-            'instance_profile': instance_profile
+            'instance_profile': instance_profile,
+            'timeline': timeline
         }, f, indent=2)
     
     print(f"\n💾 Профіль збережено: {output_file}")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Latency Histogram
+Логарифмічна гістограма затримок з фіксованим обсягом пам'яті (у стилі HDR Histogram)
+"""
+
+import math
+from typing import Dict, Iterable
+
+
+class LatencyHistogram:
+    """
+    Гістограма затримок з логарифмічними кошиками
+
+    Кожен кошик охоплює діапазон [v, v * (1 + 2 * precision)), тож будь-який
+    перцентиль відновлюється з відносною похибкою не більше precision.
+    Запис - O(1), пам'ять фіксована і не залежить від кількості запитів.
+    """
+
+    def __init__(self, precision: float = 0.01, min_value: float = 1e-6, max_value: float = 60.0):
+        """
+        Args:
+            precision: Максимальна відносна похибка перцентилів (0.01 = 1%)
+            min_value: Найменше значення, що розрізняється (секунди); менші потрапляють у перший кошик
+            max_value: Найбільше значення, що розрізняється (секунди); більші - в останній кошик
+
+        Raises:
+            ValueError: Якщо параметри невалідні
+        """
+        if not 0 < precision < 0.5:
+            raise ValueError("Точність має бути в межах (0, 0.5)")
+        if not 0 < min_value < max_value:
+            raise ValueError("Має виконуватись 0 < min_value < max_value")
+
+        self.precision = precision
+        self.min_value = min_value
+        self.max_value = max_value
+
+        self._log_base = math.log1p(2 * precision)
+        self._bucket_count = int(math.ceil(math.log(max_value / min_value) / self._log_base)) + 1
+        self.counts = [0] * self._bucket_count
+
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _bucket_index(self, value: float) -> int:
+        """Індекс кошика для значення"""
+        if value <= self.min_value:
+            return 0
+        index = int(math.log(value / self.min_value) / self._log_base)
+        return min(index, self._bucket_count - 1)
+
+    def _bucket_value(self, index: int) -> float:
+        """Репрезентативне значення кошика (середина діапазону)"""
+        lower = self.min_value * math.exp(index * self._log_base)
+        return lower * (1 + self.precision)
+
+    def record(self, value: float, count: int = 1):
+        """Записує значення затримки (секунди)"""
+        self.counts[self._bucket_index(value)] += count
+        self.count += count
+        self.total += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def is_compatible(self, other: 'LatencyHistogram') -> bool:
+        """Чи мають гістограми однакову сітку кошиків"""
+        return (self.precision, self.min_value, self.max_value) == \
+            (other.precision, other.min_value, other.max_value)
+
+    def merge(self, other: 'LatencyHistogram'):
+        """
+        Додає значення іншої гістограми (наприклад, іншого воркера)
+
+        Raises:
+            ValueError: Якщо сітки кошиків різні
+        """
+        if not self.is_compatible(other):
+            raise ValueError("Неможливо об'єднати гістограми з різною точністю або діапазоном")
+
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                self.counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def reset(self):
+        """Очищає гістограму, зберігаючи налаштування"""
+        self.counts = [0] * self._bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    @property
+    def mean(self) -> float:
+        """Середнє значення (точне, не з кошиків)"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """
+        Значення перцентиля
+
+        Args:
+            p: Перцентиль у відсотках (0-100)
+
+        Returns:
+            Значення з відносною похибкою не більше precision (0, якщо гістограма порожня)
+        """
+        if not self.count:
+            return 0.0
+        if p <= 0:
+            return self.min
+        if p >= 100:
+            return self.max
+
+        target = math.ceil(self.count * p / 100)
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                # Точні min/max обмежують значення крайніх кошиків
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    def percentiles(self, ps: Iterable[float] = (50, 90, 95, 99, 99.9)) -> Dict[str, float]:
+        """Кілька перцентилів одним словником: {'p50': ..., 'p99.9': ...}"""
+        return {f"p{p:g}": self.percentile(p) for p in ps}
+
+    def to_dict(self) -> Dict:
+        """Серіалізація для JSON (зберігаються лише непорожні кошики)"""
+        return {
+            'precision': self.precision,
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'buckets': [[index, bucket_count] for index, bucket_count in enumerate(self.counts) if bucket_count]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        """Відновлює гістограму з результату to_dict()"""
+        histogram = cls(data['precision'], data['min_value'], data['max_value'])
+        for index, bucket_count in data['buckets']:
+            histogram.counts[index] = bucket_count
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min'] if data['count'] else math.inf
+        histogram.max = data['max']
+        return histogram
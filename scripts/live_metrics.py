@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Live Metrics
+Push-канал зразків метрик: TCP сервер з NDJSON потоком (по одному JSON об'єкту
+на рядок) у metrics_collector та асинхронний споживач для оркестратора
+"""
+
+import asyncio
+import json
+import socket
+import threading
+from collections import deque
+from typing import AsyncIterator, Dict, Optional
+
+DEFAULT_PORT = 8765
+
+
+class _Subscriber:
+    """Підключений споживач: власна черга рядків і потік відправки"""
+
+    def __init__(self, sock: socket.socket, queue_size: int):
+        self.sock = sock
+        self.queue = deque(maxlen=queue_size)  # Повільний споживач втрачає найстаріші рядки
+        self.ready = threading.Event()
+        self.closed = False
+        self.thread = None
+
+
+class LiveMetricsServer:
+    """
+    NDJSON сервер зразків метрик
+
+    publish() не блокує збір: рядок серіалізується один раз і додається в
+    черги підписників, а відправку виконує окремий потік кожного підписника.
+    Новий підписник спочатку отримує останні history рядків, тож графік
+    dashboard заповнюється одразу після підключення.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, history: int = 50,
+                 queue_size: int = 1000):
+        """
+        Args:
+            host: Адреса прослуховування (127.0.0.1 - доступ лише через SSH тунель)
+            port: TCP порт (0 - будь-який вільний)
+            history: Скільки останніх рядків надсилати новому підписнику
+            queue_size: Максимум рядків у черзі одного підписника
+        """
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.history = deque(maxlen=history)
+        self.published = 0
+
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._socket = None
+        self._running = False
+
+    def start(self):
+        """Відкриває порт і запускає потік прийому підключень"""
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen()
+        self._socket.settimeout(0.5)
+        self.port = self._socket.getsockname()[1]
+        self._running = True
+        threading.Thread(target=self._accept_loop, name='live-metrics-accept', daemon=True).start()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def publish(self, message: Dict):
+        """Надсилає повідомлення всім підписникам (без очікування мережі)"""
+        line = (json.dumps(message, separators=(',', ':')) + '\n').encode()
+        with self._lock:
+            self.history.append(line)
+            self.published += 1
+            for subscriber in self._subscribers:
+                subscriber.queue.append(line)
+                subscriber.ready.set()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            subscriber = _Subscriber(sock, self.queue_size)
+            with self._lock:
+                subscriber.queue.extend(self.history)
+                subscriber.ready.set()
+                self._subscribers.append(subscriber)
+            subscriber.thread = threading.Thread(target=self._send_loop, args=(subscriber,),
+                                                 name='live-metrics-send', daemon=True)
+            subscriber.thread.start()
+
+    def _send_loop(self, subscriber: _Subscriber):
+        try:
+            while True:
+                subscriber.ready.wait(0.5)
+                subscriber.ready.clear()
+                lines = []
+                while subscriber.queue:
+                    lines.append(subscriber.queue.popleft())
+                if lines:
+                    # Накопичені рядки - одним викликом, а не по одному
+                    subscriber.sock.sendall(b''.join(lines))
+                if subscriber.closed:
+                    break
+        except OSError:
+            pass  # Споживач відключився
+        finally:
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+            subscriber.sock.close()
+
+    def close(self, timeout: float = 2.0):
+        """Зупиняє сервер і відключає підписників (після відправки їхніх черг)"""
+        self._running = False
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.closed = True
+            subscriber.ready.set()
+        for subscriber in subscribers:
+            subscriber.thread.join(timeout)
+        if self._socket:
+            self._socket.close()
+
+
+async def live_samples(host: str, port: int, deadline: Optional[float] = None,
+                       retry_delay: float = 1.0, max_retry_delay: float = 10.0) -> AsyncIterator[Dict]:
+    """
+    Асинхронний потік повідомлень від LiveMetricsServer
+
+    Перепідключається, поки сервер не запустився або з'єднання обірвалось, і
+    завершується після deadline (час циклу подій asyncio) або коли сервер
+    надіслав повідомлення з type='end'. Пауза перед перепідключенням
+    подвоюється до max_retry_delay і скидається після отриманого рядка: через
+    SSH тунель підключення вдається завжди, а сервер за ним закриває його одразу.
+    """
+    loop = asyncio.get_running_loop()
+    delay = retry_delay
+
+    def remaining() -> Optional[float]:
+        return None if deadline is None else deadline - loop.time()
+
+    async def backoff():
+        nonlocal delay
+        await asyncio.sleep(min(delay, max(remaining() or delay, 0)))
+        delay = min(delay * 2, max_retry_delay)
+
+    while remaining() is None or remaining() > 0:
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), remaining())
+        except (OSError, asyncio.TimeoutError):
+            await backoff()
+            continue
+
+        try:
+            while True:
+                line = await asyncio.wait_for(reader.readline(), remaining())
+                if not line:
+                    break  # Сервер закрив з'єднання
+                message = json.loads(line)
+                delay = retry_delay
+                yield message
+                if message.get('type') == 'end':
+                    return
+        except asyncio.TimeoutError:
+            return
+        except (OSError, ValueError):
+            pass
+        finally:
+            writer.close()
+        await backoff()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Load Profiles
+Профілі навантаження (rate від часу) для request_simulator
+"""
+
+import math
+from typing import Dict, List, Optional
+
+
+class LoadProfile:
+    """Базовий профіль: інтенсивність запитів (RPS) як функція часу від початку тесту"""
+    kind = 'base'
+
+    def rate(self, t: float) -> float:
+        """Цільова інтенсивність у момент t (секунди від початку тесту)"""
+        raise NotImplementedError
+
+    def peak(self) -> float:
+        """Максимальна інтенсивність профілю"""
+        raise NotImplementedError
+
+    def scaled(self, factor: float) -> 'LoadProfile':
+        """Той самий профіль з інтенсивністю, помноженою на factor (частка воркера)"""
+        return ScaledProfile(self, factor)
+
+    def describe(self) -> Dict:
+        """Опис профілю для test_results.json"""
+        return {'kind': self.kind, **{k: v for k, v in vars(self).items() if not k.startswith('_')}}
+
+
+class ConstantProfile(LoadProfile):
+    """Постійне навантаження"""
+    kind = 'const'
+
+    def __init__(self, rps: float):
+        self.rps = rps
+
+    def rate(self, t: float) -> float:
+        return self.rps
+
+    def peak(self) -> float:
+        return self.rps
+
+
+class RampProfile(LoadProfile):
+    """Лінійне зростання (або спад) від start до end за duration секунд, далі - end"""
+    kind = 'ramp'
+
+    def __init__(self, start: float, end: float, duration: float):
+        if duration <= 0:
+            raise ValueError("Тривалість рампи має бути додатною")
+        self.start = start
+        self.end = end
+        self.duration = duration
+
+    def rate(self, t: float) -> float:
+        if t >= self.duration:
+            return self.end
+        return self.start + (self.end - self.start) * t / self.duration
+
+    def peak(self) -> float:
+        return max(self.start, self.end)
+
+
+class StepProfile(LoadProfile):
+    """Сходинки: start, start + step, ... - кожна тримається hold секунд, всього count сходинок"""
+    kind = 'steps'
+
+    def __init__(self, start: float, step: float, hold: float, count: int):
+        if hold <= 0 or count <= 0:
+            raise ValueError("Тривалість і кількість сходинок мають бути додатними")
+        self.start = start
+        self.step = step
+        self.hold = hold
+        self.count = int(count)
+
+    def rate(self, t: float) -> float:
+        index = min(int(t // self.hold), self.count - 1)
+        return self.start + self.step * index
+
+    def peak(self) -> float:
+        return max(self.start, self.start + self.step * (self.count - 1))
+
+
+class SpikeProfile(LoadProfile):
+    """Базове навантаження з короткими сплесками до peak_rps кожні every секунд"""
+    kind = 'spike'
+
+    def __init__(self, base: float, peak: float, every: float, length: float):
+        if every <= 0 or not 0 < length <= every:
+            raise ValueError("Має виконуватись 0 < length <= every")
+        self.base = base
+        self.peak_rps = peak
+        self.every = every
+        self.length = length
+
+    def rate(self, t: float) -> float:
+        # Сплеск - наприкінці кожного періоду, щоб тест починався з базового рівня
+        return self.peak_rps if t % self.every >= self.every - self.length else self.base
+
+    def peak(self) -> float:
+        return max(self.base, self.peak_rps)
+
+
+class SineProfile(LoadProfile):
+    """Синусоїда mean ± amplitude з періодом period секунд"""
+    kind = 'sine'
+
+    def __init__(self, mean: float, amplitude: float, period: float):
+        if period <= 0:
+            raise ValueError("Період має бути додатним")
+        self.mean = mean
+        self.amplitude = amplitude
+        self.period = period
+
+    def rate(self, t: float) -> float:
+        return max(self.mean + self.amplitude * math.sin(2 * math.pi * t / self.period), 0.0)
+
+    def peak(self) -> float:
+        return self.mean + abs(self.amplitude)
+
+
+class SequenceProfile(LoadProfile):
+    """Послідовність сегментів, кожен зі своєю тривалістю (час у сегменті рахується від його початку)"""
+    kind = 'sequence'
+
+    def __init__(self, segments: List[tuple]):
+        """
+        Args:
+            segments: [(профіль, тривалість), ...]; тривалість останнього може бути None - до кінця тесту
+        """
+        if not segments:
+            raise ValueError("Послідовність має містити хоча б один сегмент")
+        self.segments = segments
+
+    def rate(self, t: float) -> float:
+        for profile, length in self.segments:
+            if length is None or t < length:
+                return profile.rate(t)
+            t -= length
+        last_profile, last_length = self.segments[-1]
+        return last_profile.rate(last_length)
+
+    def peak(self) -> float:
+        return max(profile.peak() for profile, _ in self.segments)
+
+    def describe(self) -> Dict:
+        return {
+            'kind': self.kind,
+            'segments': [{**profile.describe(), 'length': length} for profile, length in self.segments]
+        }
+
+
+class ScaledProfile(LoadProfile):
+    """Профіль, помножений на сталий коефіцієнт"""
+    kind = 'scaled'
+
+    def __init__(self, profile: LoadProfile, factor: float):
+        self.profile = profile
+        self.factor = factor
+
+    def rate(self, t: float) -> float:
+        return self.profile.rate(t) * self.factor
+
+    def peak(self) -> float:
+        return self.profile.peak() * self.factor
+
+    def describe(self) -> Dict:
+        return {**self.profile.describe(), 'scale': self.factor}
+
+
+PROFILE_TYPES = {
+    'const': (ConstantProfile, ('rps',)),
+    'ramp': (RampProfile, ('start', 'end', 'duration')),
+    'steps': (StepProfile, ('start', 'step', 'hold', 'count')),
+    'spike': (SpikeProfile, ('base', 'peak', 'every', 'length')),
+    'sine': (SineProfile, ('mean', 'amplitude', 'period')),
+}
+
+
+def _parse_segment(spec: str, test_duration: Optional[float]) -> tuple:
+    """Розбирає один сегмент 'kind:key=value,...' → (профіль, тривалість сегмента)"""
+    kind, _, params_spec = spec.strip().partition(':')
+    if kind not in PROFILE_TYPES:
+        raise ValueError(f"Невідомий профіль: {kind}. Доступні: {', '.join(PROFILE_TYPES)}")
+    profile_class, param_names = PROFILE_TYPES[kind]
+
+    params = {}
+    for item in filter(None, params_spec.split(',')):
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Очікується key=value: {item}")
+        params[key.strip()] = float(value)
+
+    # 'for' - тривалість сегмента в послідовності; рампа за замовчуванням триває весь сегмент або тест
+    length = params.pop('for', None)
+    if kind == 'ramp' and 'duration' not in params and (length or test_duration):
+        params['duration'] = length or test_duration
+
+    missing = [name for name in param_names if name not in params]
+    unknown = [name for name in params if name not in param_names]
+    if missing or unknown:
+        raise ValueError(f"Профіль {kind} приймає параметри {', '.join(param_names)} "
+                         f"(відсутні: {missing}, зайві: {unknown})")
+
+    return profile_class(**params), length
+
+
+def parse_profile(spec: str, test_duration: Optional[float] = None) -> LoadProfile:
+    """
+    Створює профіль з декларативного опису
+
+    Формат: 'kind:key=value,...', сегменти послідовності розділяються ';'
+    і задають свою тривалість параметром for=секунди. Приклади:
+        ramp:start=100,end=5000
+        steps:start=500,step=500,hold=30,count=10
+        spike:base=500,peak=3000,every=60,length=5
+        sine:mean=2000,amplitude=1500,period=120
+        ramp:start=100,end=2000,for=60;const:rps=2000
+
+    Args:
+        spec: Опис профілю
+        test_duration: Тривалість тесту - за замовчуванням для рампи без duration
+
+    Raises:
+        ValueError: Якщо опис невалідний
+    """
+    segments = [_parse_segment(part, test_duration) for part in spec.split(';') if part.strip()]
+    if not segments:
+        raise ValueError("Порожній опис профілю")
+    if len(segments) == 1:
+        return segments[0][0]
+
+    if any(length is None for _, length in segments[:-1]):
+        raise ValueError("Усі сегменти, крім останнього, мають задавати тривалість for=секунди")
+    return SequenceProfile(segments)
@@ -5,12 +5,27 @@ System Metrics Collector
 """
 
 import psutil
+import argparse
 import json
+import os
 import time
 import sys
 import logging
+import math
+import re
+from collections import deque, namedtuple
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from latency_histogram import LatencyHistogram
+from sample_log import SampleLogReader, SampleLogWriter
+from streaming_file import StreamingFileWriter
+from live_metrics import LiveMetricsServer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 # Налаштування логування
 logging.basicConfig(
@@ -19,112 +34,915 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DISK_IO_FIELDS = ('read_count', 'write_count', 'read_bytes', 'write_bytes')
+NETWORK_RATE_FIELDS = ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv',
+                       'drops_in', 'drops_out', 'errors_in', 'errors_out')
+DISK_SECTOR_SIZE = 512  # /proc/diskstats рахує в секторах по 512 байт незалежно від пристрою
+
+# Поля рядка cpuN у /proc/stat (у тіках), в тому ж порядку, що й psutil.cpu_times() на Linux
+CpuTimes = namedtuple('CpuTimes', 'user nice system idle iowait irq softirq steal guest guest_nice')
+# Складові часу CPU у блоці cpu.times_percent (як psutil.cpu_times_percent)
+CPU_TIME_FIELDS = ('user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal')
+
+
+class PsutilBackend:
+    """Джерело метрик через psutil (кросплатформне)"""
+    name = 'psutil'
+
+    def __init__(self, disk_path: str = '/'):
+        self.disk_path = disk_path
+
+    def cpu_times(self) -> List:
+        """Знімок часів CPU по ядрах"""
+        return psutil.cpu_times(percpu=True)
+
+    def memory(self) -> Dict:
+        """Блок 'memory' запису метрик"""
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        return {
+            'total': memory.total,
+            'available': memory.available,
+            'percent': memory.percent,
+            'used': memory.used,
+            'free': memory.free,
+            'swap_total': swap.total,
+            'swap_used': swap.used,
+            'swap_percent': swap.percent
+        }
+
+    def disk(self) -> Dict:
+        """Блок 'disk' запису метрик"""
+        disk = psutil.disk_usage(self.disk_path)
+        return {
+            'total': disk.total,
+            'used': disk.used,
+            'free': disk.free,
+            'percent': disk.percent
+        }
+
+    def network(self) -> Dict:
+        """Блок 'network' запису метрик (сума по всіх інтерфейсах)"""
+        net_io = psutil.net_io_counters()
+        return {
+            'bytes_sent': net_io.bytes_sent,
+            'bytes_recv': net_io.bytes_recv,
+            'packets_sent': net_io.packets_sent,
+            'packets_recv': net_io.packets_recv,
+            'errors_in': net_io.errin,
+            'errors_out': net_io.errout,
+            'drops_in': net_io.dropin,
+            'drops_out': net_io.dropout
+        }
+
+    def disk_io(self) -> Dict:
+        """Накопичувальні лічильники операцій диска (сума по фізичних дисках)"""
+        counters = psutil.disk_io_counters()
+        if counters is None:
+            return dict.fromkeys(DISK_IO_FIELDS, 0)  # Диски без статистики (деякі контейнери)
+        return {
+            'read_count': counters.read_count,
+            'write_count': counters.write_count,
+            'read_bytes': counters.read_bytes,
+            'write_bytes': counters.write_bytes
+        }
+
+    def load_avg(self) -> Tuple[float, float, float]:
+        """Load average за 1, 5 і 15 хвилин"""
+        try:
+            return psutil.getloadavg()
+        except (AttributeError, OSError):
+            return (0, 0, 0)  # Windows не підтримує
+
+    def close(self):
+        pass
+
+
+class ProcfsBackend:
+    """
+    Джерело метрик напряму з /proc (лише Linux) для частого збору (10-100 Гц)
+
+    Файли /proc відкриваються один раз і перечитуються через os.pread з
+    нульового зсуву - без open/close та об'єктів psutil на кожен зразок.
+    Розбір шукає потрібні поля в байтах без розбиття всього файлу на рядки.
+    Формули ті самі, що в psutil, тож записи збігаються за схемою і значеннями.
+    """
+    name = 'procfs'
+    FILES = ('stat', 'meminfo', 'net/dev', 'loadavg', 'diskstats')
+    READ_SIZE = 64 * 1024
+
+    def __init__(self, disk_path: str = '/', proc_path: str = '/proc'):
+        """
+        Raises:
+            OSError: Якщо /proc недоступний (не Linux)
+        """
+        self.disk_path = disk_path
+        # Як psutil: у суму входять лише пристрої з /sys/block, без розділів (sda1 вже врахований в sda)
+        self._block_devices = set(os.listdir('/sys/block')) if os.path.isdir('/sys/block') else None
+        self._fds = {}
+        try:
+            for name in self.FILES:
+                self._fds[name] = os.open(f"{proc_path}/{name}", os.O_RDONLY)
+        except OSError:
+            self.close()
+            raise
+
+    def _read(self, name: str) -> bytes:
+        """Повний вміст файлу /proc одним pread (кількома - якщо файл більший за буфер)"""
+        fd = self._fds[name]
+        data = os.pread(fd, self.READ_SIZE, 0)
+        while len(data) % self.READ_SIZE == 0 and data:
+            chunk = os.pread(fd, self.READ_SIZE, len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def cpu_times(self) -> List[CpuTimes]:
+        """Знімок часів CPU по ядрах з рядків cpuN файлу /proc/stat"""
+        data = self._read('stat')
+        cores = []
+        # Перший рядок - сумарний 'cpu ', далі 'cpu0', 'cpu1', ...
+        position = data.find(b'\ncpu') + 1
+        while position and data.startswith(b'cpu', position):
+            end = data.find(b'\n', position)
+            values = data[position:end].split()[1:11]
+            if len(values) < 10:
+                values += [0] * (10 - len(values))  # Старі ядра без steal/guest
+            cores.append(CpuTimes(*map(int, values)))
+            position = end + 1
+        return cores
+
+    @staticmethod
+    def _meminfo_value(data: bytes, key: bytes) -> int:
+        """Значення поля /proc/meminfo у байтах (0, якщо поля немає)"""
+        start = data.find(key)
+        if start < 0:
+            return 0
+        start += len(key)
+        return int(data[start:data.find(b'kB', start)]) * 1024
+
+    def memory(self) -> Dict:
+        """Блок 'memory' запису метрик (як psutil.virtual_memory / swap_memory на Linux)"""
+        data = self._read('meminfo')
+        total = self._meminfo_value(data, b'MemTotal:')
+        free = self._meminfo_value(data, b'\nMemFree:')
+        buffers = self._meminfo_value(data, b'\nBuffers:')
+        cached = self._meminfo_value(data, b'\nCached:') + self._meminfo_value(data, b'\nSReclaimable:')
+        available = min(self._meminfo_value(data, b'\nMemAvailable:') or free + buffers + cached, total)
+        used = total - free - cached - buffers
+        if used < 0:
+            used = total - free
+        swap_total = self._meminfo_value(data, b'\nSwapTotal:')
+        swap_used = swap_total - self._meminfo_value(data, b'\nSwapFree:')
+        return {
+            'total': total,
+            'available': available,
+            'percent': round((total - available) / total * 100, 1) if total else 0.0,
+            'used': used,
+            'free': free,
+            'swap_total': swap_total,
+            'swap_used': swap_used,
+            'swap_percent': round(swap_used / swap_total * 100, 1) if swap_total else 0.0
+        }
+
+    def disk(self) -> Dict:
+        """Блок 'disk' запису метрик (statvfs, як psutil.disk_usage)"""
+        st = os.statvfs(self.disk_path)
+        total = st.f_blocks * st.f_frsize
+        used = total - st.f_bfree * st.f_frsize
+        free = st.f_bavail * st.f_frsize
+        return {
+            'total': total,
+            'used': used,
+            'free': free,
+            'percent': round(used / (used + free) * 100, 1) if used + free else 0.0
+        }
+
+    def network(self) -> Dict:
+        """Блок 'network' запису метрик - сума по всіх інтерфейсах /proc/net/dev"""
+        data = self._read('net/dev')
+        totals = [0] * 16
+        # Два рядки заголовка, далі 'iface: rx(8 полів) tx(8 полів)'
+        for line in data.split(b'\n')[2:]:
+            _, sep, fields = line.partition(b':')
+            if sep:
+                for index, value in enumerate(fields.split()):
+                    totals[index] += int(value)
+        return {
+            'bytes_sent': totals[8],
+            'bytes_recv': totals[0],
+            'packets_sent': totals[9],
+            'packets_recv': totals[1],
+            'errors_in': totals[2],
+            'errors_out': totals[10],
+            'drops_in': totals[3],
+            'drops_out': totals[11]
+        }
+
+    def disk_io(self) -> Dict:
+        """Накопичувальні лічильники операцій диска з /proc/diskstats (як psutil.disk_io_counters)"""
+        totals = [0, 0, 0, 0]
+        for line in self._read('diskstats').split(b'\n'):
+            fields = line.split()
+            if len(fields) < 14:
+                continue  # Порожній рядок або розділ у форматі старих ядер
+            if self._block_devices is not None and fields[2].decode() not in self._block_devices:
+                continue
+            totals[0] += int(fields[3])
+            totals[1] += int(fields[7])
+            totals[2] += int(fields[5]) * DISK_SECTOR_SIZE
+            totals[3] += int(fields[9]) * DISK_SECTOR_SIZE
+        return dict(zip(DISK_IO_FIELDS, totals))
+
+    def load_avg(self) -> Tuple[float, float, float]:
+        """Load average з /proc/loadavg"""
+        values = self._read('loadavg').split(None, 3)
+        return float(values[0]), float(values[1]), float(values[2])
+
+    def close(self):
+        """Закриває дескриптори файлів /proc"""
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+
+BACKENDS = {backend.name: backend for backend in (PsutilBackend, ProcfsBackend)}
+
+
+class RunningStats:
+    """
+    Потокова статистика показника (відсотки, швидкості) за O(1) на зразок
+
+    Середнє і дисперсія - алгоритмом Велфорда, min/max - точні,
+    перцентилі - з логарифмічної гістограми з фіксованою пам'яттю.
+    """
+
+    def __init__(self, precision: float = 0.005, min_value: float = 0.1, max_value: float = 100.0):
+        """
+        Args:
+            precision: Відносна похибка перцентилів
+            min_value: Найменше значення, що розрізняється (за замовчуванням - для відсотків)
+            max_value: Найбільше значення, що розрізняється
+        """
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0  # Сума квадратів відхилень від поточного середнього
+        self.min = math.inf
+        self.max = 0.0
+        self.histogram = LatencyHistogram(precision, min_value=min_value, max_value=max_value)
+
+    def add(self, value: float):
+        """Враховує одне значення"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.histogram.record(value)
+
+    @property
+    def variance(self) -> float:
+        """Вибіркова дисперсія"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def percentile(self, p: float) -> float:
+        """Перцентиль з відносною похибкою не більше точності гістограми"""
+        value = self.histogram.percentile(p)
+        # Перший кошик охоплює [0, min_value) - це фактично простій, повертаємо точний мінімум
+        if value <= self.histogram.min_value * (1 + 2 * self.histogram.precision):
+            return min(value, self.min) if self.count else 0.0
+        return value
+
+    def to_dict(self) -> Dict:
+        """Зведення для streaming файлу"""
+        return {
+            'avg': self.mean,
+            'stddev': self.stddev,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            **{f"p{p}": self.percentile(p) for p in (50, 95, 99)},
+        }
+
+
+class ProcessTracker:
+    """
+    Ресурси групи процесів між двома зразками
+
+    Група задається PID-ами та/або регулярним виразом для імені чи командного
+    рядка (напр. 'nginx|gunicorn'). Для шаблону список процесів періодично
+    оновлюється - веб-сервер може перезапускати воркери під час тесту.
+    Значення групи - сума по всіх її процесах.
+    """
+
+    RESCAN_INTERVAL = 5.0  # Як часто шукати нові процеси за шаблоном, с
+    COLLECTOR_SCRIPT = os.path.basename(__file__)  # Командні рядки збирача не належать до групи
+    FIELDS = ('count', 'cpu_percent', 'cpu_time', 'memory_rss', 'memory_percent', 'threads', 'fds',
+              'ctx_switches_voluntary', 'ctx_switches_involuntary')
+
+    def __init__(self, pids: Optional[List[int]] = None, pattern: Optional[str] = None):
+        """
+        Args:
+            pids: PID-и процесів
+            pattern: Регулярний вираз для імені або командного рядка процесу
+
+        Raises:
+            ValueError: Якщо не задано ні PID-ів, ні шаблону
+        """
+        if not pids and not pattern:
+            raise ValueError("Потрібні PID-и або шаблон імені процесу")
+
+        self.pids = list(pids or [])
+        self.pattern = re.compile(pattern) if pattern else None
+        self.seen_pids = set()
+        self.cpu_count = psutil.cpu_count(logical=True) or 1
+        # Збирач і його предки (напр. bash -c '... --process "nginx" ...' з оркестратора)
+        # мають шаблон у командному рядку, але не є процесами сервера
+        own = psutil.Process()
+        self._excluded_pids = {own.pid} | {parent.pid for parent in own.parents()}
+
+        self._processes = {}  # pid → [psutil.Process, (час CPU, добровільні, примусові перемикання) або None]
+        self._last_scan = None
+        self._last_time = None
+        self._scan()
+        # Перший знімок - база для різниць наступного зразка
+        self.sample(psutil.virtual_memory().total)
+
+    def _scan(self):
+        """Додає процеси групи, яких ще немає серед відстежуваних"""
+        self._last_scan = time.monotonic()
+        candidates = []
+        for pid in self.pids:
+            if pid not in self._processes:
+                try:
+                    candidates.append(psutil.Process(pid))
+                except psutil.NoSuchProcess:
+                    pass
+
+        if self.pattern:
+            for process in psutil.process_iter(['name', 'cmdline']):
+                if process.pid in self._processes or process.pid in self._excluded_pids:
+                    continue
+                command = ' '.join(process.info['cmdline'] or [])
+                if self.COLLECTOR_SCRIPT in command:
+                    continue  # Інші запуски збирача та їхні обгортки
+                if self.pattern.search(process.info['name'] or '') or self.pattern.search(command):
+                    candidates.append(process)
+
+        for process in candidates:
+            self._processes[process.pid] = [process, None]
+            self.seen_pids.add(process.pid)
+
+    def sample(self, memory_total: int) -> Dict:
+        """
+        Ресурси групи за інтервал від попереднього зразка
+
+        cpu_percent - частка всієї потужності хоста (як cpu.percent), cpu_time - секунди
+        CPU за інтервал, перемикання контексту - за секунду. fds - None, якщо дескриптори
+        хоча б одного процесу недоступні (процес іншого користувача, напр. nginx під root).
+        """
+        now = time.monotonic()
+        if self.pattern and now - self._last_scan >= self.RESCAN_INTERVAL:
+            self._scan()
+        elapsed = now - self._last_time if self._last_time is not None else 0.0
+        self._last_time = now
+
+        group = dict.fromkeys(self.FIELDS, 0)
+        cpu_time = voluntary = involuntary = 0.0
+        fds_available = True
+        for pid, entry in list(self._processes.items()):
+            process, previous = entry
+            try:
+                with process.oneshot():
+                    times = process.cpu_times()
+                    switches = process.num_ctx_switches()
+                    rss = process.memory_info().rss
+                    threads = process.num_threads()
+                    try:
+                        # /proc/<pid>/fd читає лише власник або root - решта показників доступна
+                        fds = process.num_fds() if hasattr(process, 'num_fds') else 0
+                    except psutil.AccessDenied:
+                        fds = None
+            except psutil.NoSuchProcess:
+                del self._processes[pid]
+                continue
+            except psutil.AccessDenied:
+                continue  # Процес лишається в групі - доступ може з'явитися (напр. після exec)
+
+            counters = (times.user + times.system, switches.voluntary, switches.involuntary)
+            entry[1] = counters
+            group['count'] += 1
+            group['memory_rss'] += rss
+            group['threads'] += threads
+            if fds is None:
+                fds_available = False
+            else:
+                group['fds'] += fds
+            # Новий процес не має попереднього знімка - його внесок рахується з наступного зразка
+            if previous is not None:
+                cpu_time += counters[0] - previous[0]
+                voluntary += counters[1] - previous[1]
+                involuntary += counters[2] - previous[2]
+
+        if not fds_available:
+            group['fds'] = None
+        group['cpu_time'] = cpu_time
+        group['memory_percent'] = group['memory_rss'] / memory_total * 100 if memory_total else 0.0
+        if elapsed > 0:
+            group['cpu_percent'] = min(cpu_time / elapsed / self.cpu_count * 100, 100.0)
+            group['ctx_switches_voluntary'] = voluntary / elapsed
+            group['ctx_switches_involuntary'] = involuntary / elapsed
+        else:
+            group['cpu_percent'] = group['ctx_switches_voluntary'] = group['ctx_switches_involuntary'] = 0.0
+        return group
+
+
+class SelfTracker:
+    """
+    Власні витрати збирача з тими ж полями, що й ProcessTracker
+
+    Замість кількох викликів psutil.Process на зразок - один getrusage (час CPU,
+    перемикання контексту) та один pread відкритого /proc/self/stat (RSS, потоки).
+    Дескриптори не рахуються (fds = None): це вимагало б читати /proc/self/fd.
+    """
+
+    FIELDS = ProcessTracker.FIELDS
+
+    def __init__(self):
+        self.seen_pids = {os.getpid()}
+        self.cpu_count = psutil.cpu_count(logical=True) or 1
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+        try:
+            self._stat_fd = os.open('/proc/self/stat', os.O_RDONLY)
+        except OSError:
+            self._stat_fd = None  # Не Linux - RSS і потоки через psutil
+        self._last = None
+        self.sample(psutil.virtual_memory().total)
+
+    def _counters(self) -> Tuple[float, float, float, float]:
+        """(монотонний час, час CPU, добровільні, примусові перемикання)"""
+        if resource is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            return time.monotonic(), usage.ru_utime + usage.ru_stime, usage.ru_nvcsw, usage.ru_nivcsw
+        times = os.times()
+        return time.monotonic(), times.user + times.system, 0.0, 0.0
+
+    def _memory_and_threads(self) -> Tuple[int, int]:
+        if self._stat_fd is None:
+            process = psutil.Process()
+            return process.memory_info().rss, process.num_threads()
+        # Поля після ')' у /proc/self/stat: [17] - num_threads, [21] - rss у сторінках
+        fields = os.pread(self._stat_fd, 1024, 0).rpartition(b')')[2].split()
+        return int(fields[21]) * self._page_size, int(fields[17])
+
+    def sample(self, memory_total: int) -> Dict:
+        """Витрати збирача за інтервал від попереднього зразка (як ProcessTracker.sample)"""
+        current = self._counters()
+        rss, threads = self._memory_and_threads()
+        previous, self._last = self._last, current
+        elapsed = current[0] - previous[0] if previous else 0.0
+
+        group = {
+            'count': 1,
+            'cpu_time': current[1] - previous[1] if previous else 0.0,
+            'memory_rss': rss,
+            'memory_percent': rss / memory_total * 100 if memory_total else 0.0,
+            'threads': threads,
+            'fds': None,
+        }
+        if elapsed > 0:
+            group['cpu_percent'] = min(group['cpu_time'] / elapsed / self.cpu_count * 100, 100.0)
+            group['ctx_switches_voluntary'] = (current[2] - previous[2]) / elapsed
+            group['ctx_switches_involuntary'] = (current[3] - previous[3]) / elapsed
+        else:
+            group['cpu_percent'] = group['ctx_switches_voluntary'] = group['ctx_switches_involuntary'] = 0.0
+        return group
+
+    def close(self):
+        if self._stat_fd is not None:
+            os.close(self._stat_fd)
+            self._stat_fd = None
+
+
+class RollupTier:
+    """
+    Агреговані кошики фіксованої тривалості з обмеженою кількістю
+
+    Зразки групуються за часом початку кошика (кратним resolution), для
+    кожного показника кошик зберігає min/avg/max/p95. Пам'ять - значення
+    лише відкритого кошика плюс max_buckets закритих.
+    """
+
+    def __init__(self, resolution: int, max_buckets: int):
+        """
+        Args:
+            resolution: Тривалість кошика, с
+            max_buckets: Скільки останніх закритих кошиків зберігати
+        """
+        self.resolution = resolution
+        self.buckets = deque(maxlen=max_buckets)
+        self._key = None
+        self._values = None
+
+    def add(self, epoch: float, values: Dict[str, float]):
+        """Враховує зразок з моментом epoch (секунди)"""
+        key = int(epoch // self.resolution)
+        if key != self._key:
+            if self._key is not None:
+                self.buckets.append(self._bucket())
+            self._key = key
+            self._values = {name: [] for name in values}
+        for name, value in values.items():
+            self._values.setdefault(name, []).append(value)
+
+    def _bucket(self) -> Dict:
+        bucket = {
+            'timestamp': datetime.fromtimestamp(self._key * self.resolution).isoformat(),
+            'samples': max(len(values) for values in self._values.values())
+        }
+        for name, values in self._values.items():
+            ordered = sorted(values)
+            bucket[name] = {
+                'min': ordered[0],
+                'avg': sum(ordered) / len(ordered),
+                'max': ordered[-1],
+                'p95': ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+            }
+        return bucket
+
+    def to_dict(self) -> Dict:
+        """Закриті кошики та поточний (неповний) кошик"""
+        buckets = list(self.buckets)
+        if self._key is not None:
+            buckets.append(self._bucket())
+        return {'resolution': self.resolution, 'buckets': buckets}
+
+
+class ProcessGroupStats:
+    """Підсумок групи процесів за весь збір (з блоків 'processes' зразків)"""
+
+    def __init__(self):
+        self.cpu = RunningStats()
+        self.memory = RunningStats()
+        self.cpu_time = 0.0
+        self.peak_rss = 0
+        self.peak_threads = 0
+        self.peak_fds = None  # None - дескриптори недоступні в жодному зразку
+        self.max_count = 0
+        self._switches = [0.0, 0.0]
+
+    def add(self, group: Dict):
+        self.cpu.add(group['cpu_percent'])
+        self.memory.add(group['memory_percent'])
+        self.cpu_time += group['cpu_time']
+        self.peak_rss = max(self.peak_rss, group['memory_rss'])
+        self.peak_threads = max(self.peak_threads, group['threads'])
+        if group['fds'] is not None:
+            self.peak_fds = max(self.peak_fds or 0, group['fds'])
+        self.max_count = max(self.max_count, group['count'])
+        self._switches[0] += group['ctx_switches_voluntary']
+        self._switches[1] += group['ctx_switches_involuntary']
+
+    def to_dict(self) -> Dict:
+        count = self.cpu.count or 1
+        return {
+            'cpu_percent': self.cpu.to_dict(),
+            'memory_percent': self.memory.to_dict(),
+            'cpu_time_total': self.cpu_time,
+            'peak_rss': self.peak_rss,
+            'peak_threads': self.peak_threads,
+            'peak_fds': self.peak_fds,
+            'max_processes': self.max_count,
+            'ctx_switches_voluntary_avg': self._switches[0] / count,
+            'ctx_switches_involuntary_avg': self._switches[1] / count,
+        }
+
 
 class MetricsCollector:
-    def __init__(self, interval: int = 1, duration: int = 90, streaming_file: str = None):
+    LOG_INTERVAL = 1.0  # Не частіше одного рядка логу на секунду навіть при інтервалі 100 мс
+    # Агрегати (тривалість кошика, с; скільки останніх кошиків зберігати): 10 с за годину, 60 с за добу
+    ROLLUP_TIERS = ((10, 360), (60, 1440))
+    STEAL_THRESHOLD = 10.0  # % часу CPU, відібраного гіпервізором, з якого зразок вважається троттлінгом
+    TIMELINE_POINTS = 50  # Точок графіка в streaming файлі
+    MAX_CRITICAL_MOMENTS = 1000  # З --retention зберігаються лише останні вікна (лічильники - за весь збір)
+
+    def __init__(self, interval: float = 1, duration: int = 90, streaming_file: str = None,
+                 backend: str = 'psutil', sample_log: str = None, stream_rate: float = 2.0,
+                 stream_deltas: bool = False, live_port: Optional[int] = None, live_host: str = '127.0.0.1',
+                 target_pids: Optional[List[int]] = None, target_pattern: Optional[str] = None,
+                 retention_minutes: Optional[float] = None):
         """
         Ініціалізація збирача метрик
 
         Args:
-            interval: Інтервал між збором метрик (секунди) - за замовчуванням 1 сек для деталізації
+            interval: Інтервал між збором метрик (секунди, можна дробові - напр. 0.1)
             duration: Загальна тривалість збору (секунди)
             streaming_file: Файл для Real-Time streaming (current_test.json)
+            backend: Джерело метрик: 'psutil' або 'procfs' (прямо з /proc, дешевше при 10-100 Гц)
+            sample_log: Журнал зразків (sample_log.py); якщо задано, зразки одразу дописуються
+                на диск і не накопичуються в пам'яті
+            stream_rate: Максимум записів streaming файлу на секунду (частіші оновлення зливаються)
+            stream_deltas: Додатково писати дельти графіка (<name>.delta.json)
+            live_port: TCP порт NDJSON потоку зразків (live_metrics.py); None - вимкнено
+            live_host: Адреса потоку (за замовчуванням лише локальна - доступ через SSH тунель)
+            target_pids: PID-и досліджуваного сервера для окремого обліку його ресурсів
+            target_pattern: Регулярний вираз імені процесів досліджуваного сервера (напр. 'nginx')
+            retention_minutes: Зберігати повну роздільність лише за останні N хвилин (старші
+                зразки лишаються тільки в 10 с / 60 с агрегатах); None - всі зразки
+
+        Raises:
+            ValueError: Якщо backend невідомий
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Невідоме джерело метрик: {backend}. Доступні: {', '.join(BACKENDS)}")
+
         self.interval = interval
         self.duration = duration
         self.streaming_file = streaming_file
-        self.metrics = []
+        self._stream = StreamingFileWriter(streaming_file, stream_rate, stream_deltas) if streaming_file else None
+        # Повна роздільність - лише за останні retention_minutes, якщо задано
+        self.retention_minutes = retention_minutes
+        self.metrics = deque(maxlen=max(math.ceil(retention_minutes * 60 / interval), 1)) \
+            if retention_minutes else []
+        self.rollups = [RollupTier(resolution, max_buckets) for resolution, max_buckets in self.ROLLUP_TIERS]
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.backend = BACKENDS[backend]()
+        self._live = LiveMetricsServer(live_host, live_port) if live_port is not None else None
+
+        # Облік процесів: власні витрати збирача окремо від навантаження, що тестується
+        self.target_pids = target_pids
+        self.target_pattern = target_pattern
+        self.process_trackers = {'collector': SelfTracker()}
+        if target_pids or target_pattern:
+            self.process_trackers['target'] = ProcessTracker(target_pids, target_pattern)
+        self.process_stats = {}
+        self.sample_log = sample_log
+        self._log_writer = None
+        self.samples_count = 0
+
+        # Статичні значення - один раз, а не на кожен зразок
+        self.cpu_count = psutil.cpu_count()
+        self.cpu_count_logical = psutil.cpu_count(logical=True)
+        # Попередній знімок часів CPU: відсоток рахується як різниця між знімками,
+        # без блокуючого очікування всередині psutil.cpu_percent(interval=...)
+        self._cpu_times = self.backend.cpu_times()
+        # Попередні лічильники мережі та диска з монотонним часом їх зчитування - для швидкостей
+        self._counters = (time.monotonic(), self.backend.network(), self.backend.disk_io())
+        self.rate_stats = {}
+        self.missed_ticks = 0  # Тіки, пропущені через те, що збір не встиг за інтервал
 
         # Для відстеження пікових значень (WOW-ефект!)
         self.peak_cpu = 0.0
         self.peak_memory = 0.0
-        self.critical_moments = []  # Моменти коли CPU > 90% або Memory > 90%
+        # Вікна, коли CPU > 90% або Memory > 90% (перевантаження), а також вікна steal
+        self.critical_moments = deque(maxlen=self.MAX_CRITICAL_MOMENTS) if retention_minutes else []
+        self.critical_moments_count = 0
+        self.steal_windows_count = 0
+        self.steal_throttled_samples = 0
+        # Поточні вікна перевантаження та steal-троттлінгу (гіпервізор забирає CPU - напр. вичерпані кредити t3)
+        self._overload_window = None
+        self._steal_window = None
+        self.cpu_breakdown_stats = {field: RunningStats() for field in CPU_TIME_FIELDS}
 
-    def collect_current_metrics(self) -> Dict:
-        """Збирає поточні метрики системи з високою деталізацією"""
-        try:
-            # CPU метрики - загальний та per-core
-            cpu_percent = psutil.cpu_percent(interval=0.1)  # Швидший збір
-            cpu_per_core = psutil.cpu_percent(interval=0.1, percpu=True)
+        # Потокові агрегати та кільцевий буфер лише з полів графіка dashboard:
+        # оновлення streaming файлу не залежить від кількості зібраних зразків
+        self.cpu_stats = RunningStats()
+        self.memory_stats = RunningStats()
+        self.timeline = deque(maxlen=self.TIMELINE_POINTS)
 
-            # Memory метрики
-            memory = psutil.virtual_memory()
-            swap = psutil.swap_memory()
+    @staticmethod
+    def _busy_and_total(times) -> Tuple[float, float]:
+        """Зайнятий і загальний час CPU зі знімка (як у psutil.cpu_percent)"""
+        total = sum(times)
+        # guest уже враховано в user на Linux
+        total -= getattr(times, 'guest', 0) + getattr(times, 'guest_nice', 0)
+        busy = total - times.idle - getattr(times, 'iowait', 0)
+        return busy, total
 
-            # Disk метрики
-            disk = psutil.disk_usage('/')
+    def sample_cpu(self) -> Tuple[float, List[float], Dict[str, float]]:
+        """
+        Завантаження CPU з моменту попереднього виклику
 
-            # Network метрики
-            net_io = psutil.net_io_counters()
+        Загальний і per-core відсотки та розподіл часу за складовими (user,
+        iowait, steal, ...) рахуються з одного знімка часів CPU по ядрах, тож
+        усі - за одне й те саме вікно.
 
-            # Load average (для Linux)
-            try:
-                load_avg = psutil.getloadavg()
-            except (AttributeError, OSError):
-                load_avg = (0, 0, 0)  # Windows не підтримує
+        Returns:
+            (загальний відсоток, відсотки по ядрах, {складова: відсоток часу всіх ядер})
+        """
+        current = self.backend.cpu_times()
+        per_core = []
+        busy_sum = total_sum = 0.0
+        field_sums = dict.fromkeys(CPU_TIME_FIELDS, 0.0)
+        for previous_times, current_times in zip(self._cpu_times, current):
+            previous_busy, previous_total = self._busy_and_total(previous_times)
+            current_busy, current_total = self._busy_and_total(current_times)
+            busy = max(current_busy - previous_busy, 0.0)
+            total = current_total - previous_total
+            per_core.append(round(min(busy / total * 100, 100.0), 1) if total > 0 else 0.0)
+            busy_sum += busy
+            total_sum += max(total, 0.0)
+            for field in CPU_TIME_FIELDS:
+                # Поля, яких немає на платформі (steal поза Linux), - нуль
+                field_sums[field] += max(getattr(current_times, field, 0) - getattr(previous_times, field, 0), 0)
+        self._cpu_times = current
 
-            # Оновлення пікових значень
-            if cpu_percent > self.peak_cpu:
-                self.peak_cpu = cpu_percent
-            if memory.percent > self.peak_memory:
-                self.peak_memory = memory.percent
+        cpu_percent = round(min(busy_sum / total_sum * 100, 100.0), 1) if total_sum > 0 else 0.0
+        times_percent = {field: round(value / total_sum * 100, 1) if total_sum > 0 else 0.0
+                         for field, value in field_sums.items()}
+        return cpu_percent, per_core, times_percent
+
+    def collect_current_metrics(self) -> Dict:
+        """Збирає поточні метрики системи з високою деталізацією (без блокуючих очікувань)"""
+        try:
+            # CPU метрики - загальний та per-core з одного знімка
+            cpu_percent, cpu_per_core, cpu_times_percent = self.sample_cpu()
+
+            memory = self.backend.memory()
+            load_avg = self.backend.load_avg()
+            network = self.backend.network()
+            disk_io = self.backend.disk_io()
+            rates = self.calculate_rates(time.monotonic(), network, disk_io)
 
             # Позначаємо критичний момент
-            is_critical = cpu_percent > 90 or memory.percent > 90
+            is_critical = cpu_percent > 90 or memory['percent'] > 90
 
             metrics = {
                 'timestamp': datetime.now().isoformat(),
                 'cpu': {
                     'percent': cpu_percent,
                     'per_core': cpu_per_core,
-                    'count': psutil.cpu_count(),
-                    'count_logical': psutil.cpu_count(logical=True),
+                    'times_percent': cpu_times_percent,
+                    'count': self.cpu_count,
+                    'count_logical': self.cpu_count_logical,
                     'load_avg_1m': load_avg[0],
                     'load_avg_5m': load_avg[1],
                     'load_avg_15m': load_avg[2]
                 },
-                'memory': {
-                    'total': memory.total,
-                    'available': memory.available,
-                    'percent': memory.percent,
-                    'used': memory.used,
-                    'free': memory.free,
-                    'swap_total': swap.total,
-                    'swap_used': swap.used,
-                    'swap_percent': swap.percent
-                },
-                'disk': {
-                    'total': disk.total,
-                    'used': disk.used,
-                    'free': disk.free,
-                    'percent': disk.percent
-                },
-                'network': {
-                    'bytes_sent': net_io.bytes_sent,
-                    'bytes_recv': net_io.bytes_recv,
-                    'packets_sent': net_io.packets_sent,
-                    'packets_recv': net_io.packets_recv,
-                    'errors_in': net_io.errin,
-                    'errors_out': net_io.errout,
-                    'drops_in': net_io.dropin,
-                    'drops_out': net_io.dropout
-                },
+                'memory': memory,
+                'disk': self.backend.disk(),
+                'network': network,
+                'rates': rates,
+                'processes': {name: tracker.sample(memory['total'])
+                              for name, tracker in self.process_trackers.items()},
                 'is_critical': is_critical
             }
 
-            # Зберігаємо критичні моменти
-            if is_critical:
-                self.critical_moments.append({
-                    'timestamp': metrics['timestamp'],
-                    'cpu': cpu_percent,
-                    'memory': memory.percent
-                })
-
+            self._account(metrics)
             return metrics
         except Exception as e:
             logger.error(f"Помилка збору метрик: {e}")
             return None
 
+    def calculate_rates(self, now: float, network: Dict, disk_io: Dict) -> Dict:
+        """
+        Швидкості за інтервал від попереднього зчитування лічильників (за секунду)
+
+        Час - монотонний момент зчитування, а не номінальний інтервал, тож
+        пропущені тіки та затримки збору не спотворюють швидкість.
+        """
+        previous_time, previous_network, previous_disk = self._counters
+        self._counters = (now, network, disk_io)
+        elapsed = now - previous_time
+
+        def rate(current: Dict, previous: Dict, key: str) -> float:
+            # Скидання лічильника (перезапуск інтерфейсу) - не від'ємна швидкість, а нуль
+            return max(current[key] - previous[key], 0) / elapsed if elapsed > 0 else 0.0
+
+        network_rates = {key: rate(network, previous_network, key) for key in NETWORK_RATE_FIELDS}
+        network_rates['bytes_total'] = network_rates['bytes_sent'] + network_rates['bytes_recv']
+        return {
+            'network': network_rates,
+            'disk': {
+                'read_iops': rate(disk_io, previous_disk, 'read_count'),
+                'write_iops': rate(disk_io, previous_disk, 'write_count'),
+                'read_bytes': rate(disk_io, previous_disk, 'read_bytes'),
+                'write_bytes': rate(disk_io, previous_disk, 'write_bytes')
+            }
+        }
+
+    def _account(self, metrics: Dict):
+        """Оновлює пікові значення, потокову статистику, графік і критичні моменти"""
+        cpu_percent = metrics['cpu']['percent']
+        memory_percent = metrics['memory']['percent']
+
+        # Оновлення пікових значень
+        if cpu_percent > self.peak_cpu:
+            self.peak_cpu = cpu_percent
+        if memory_percent > self.peak_memory:
+            self.peak_memory = memory_percent
+        self.cpu_stats.add(cpu_percent)
+        self.memory_stats.add(memory_percent)
+        for name, group in metrics.get('processes', {}).items():
+            self.process_stats.setdefault(name, ProcessGroupStats()).add(group)
+        for block, rates in metrics.get('rates', {}).items():
+            for key, value in rates.items():
+                stats = self.rate_stats.get((block, key))
+                if stats is None:
+                    # Швидкості - від 1 до 10^11 за секунду, похибка перцентилів 1%
+                    stats = self.rate_stats[(block, key)] = RunningStats(0.01, min_value=1.0, max_value=1e11)
+                stats.add(value)
+
+        self.timeline.append({
+            'timestamp': metrics['timestamp'],
+            'cpu': {'percent': cpu_percent},
+            'memory': {'percent': memory_percent},
+            'is_critical': metrics['is_critical']
+        })
+
+        # Послідовні критичні зразки - одне вікно, тож список не росте з кожним зразком
+        self._track_overload(metrics['timestamp'], metrics['is_critical'], cpu_percent, memory_percent)
+
+        if self.first_timestamp is None:
+            self.first_timestamp = metrics['timestamp']
+        self.last_timestamp = metrics['timestamp']
+        self._rollup(metrics)
+
+        times_percent = metrics['cpu'].get('times_percent')
+        if times_percent:
+            for field, stats in self.cpu_breakdown_stats.items():
+                stats.add(times_percent.get(field, 0.0))
+            self._track_steal(metrics['timestamp'], times_percent.get('steal', 0.0), cpu_percent, memory_percent)
+
+    def _rollup(self, metrics: Dict):
+        """Додає основні показники зразка до агрегатів 10 с / 60 с"""
+        values = {'cpu': metrics['cpu']['percent'], 'memory': metrics['memory']['percent']}
+        if 'times_percent' in metrics['cpu']:
+            values['steal'] = metrics['cpu']['times_percent']['steal']
+        if 'rates' in metrics:
+            values['network_bytes'] = metrics['rates']['network']['bytes_total']
+            values['disk_iops'] = metrics['rates']['disk']['read_iops'] + metrics['rates']['disk']['write_iops']
+
+        epoch = datetime.fromisoformat(metrics['timestamp']).timestamp()
+        for tier in self.rollups:
+            tier.add(epoch, values)
+
+    def _track_overload(self, timestamp: str, is_critical: bool, cpu_percent: float, memory_percent: float):
+        """Об'єднує послідовні зразки з CPU/RAM > 90% у вікна перевантаження"""
+        if not is_critical:
+            self._overload_window = self._close_window(self._overload_window)
+            return
+
+        window = self._overload_window
+        if window is None:
+            window = self._overload_window = {
+                'timestamp': timestamp, 'end': timestamp, 'reason': 'overload', 'samples': 0,
+                'cpu': 0.0, 'memory': 0.0
+            }
+        window['samples'] += 1
+        window['end'] = timestamp
+        # Пікові значення за вікно
+        window['cpu'] = max(window['cpu'], cpu_percent)
+        window['memory'] = max(window['memory'], memory_percent)
+
+    def _track_steal(self, timestamp: str, steal: float, cpu_percent: float, memory_percent: float):
+        """Об'єднує послідовні зразки зі steal понад поріг у вікна троттлінгу"""
+        if steal < self.STEAL_THRESHOLD:
+            self._steal_window = self._close_window(self._steal_window)
+            return
+
+        window = self._steal_window
+        if window is None:
+            window = self._steal_window = {
+                'timestamp': timestamp, 'end': timestamp, 'reason': 'steal', 'samples': 0,
+                'steal_avg': 0.0, 'steal_max': 0.0, 'cpu': 0.0, 'memory': 0.0
+            }
+        window['samples'] += 1
+        window['end'] = timestamp
+        window['steal_avg'] += (steal - window['steal_avg']) / window['samples']
+        window['steal_max'] = max(window['steal_max'], steal)
+        window['cpu'] += (cpu_percent - window['cpu']) / window['samples']
+        window['memory'] = max(window['memory'], memory_percent)
+
+    def _close_window(self, window: Optional[Dict]) -> None:
+        """Додає закрите вікно до критичних моментів і лічильників (повертає None для поля вікна)"""
+        if window is None:
+            return None
+        self.critical_moments.append(window)
+        self.critical_moments_count += 1
+        if window['reason'] == 'steal':
+            self.steal_windows_count += 1
+            self.steal_throttled_samples += window['samples']
+        return None
+
+    def close_windows(self):
+        """Закриває відкриті вікна перевантаження та steal-троттлінгу"""
+        self._overload_window = self._close_window(self._overload_window)
+        self._steal_window = self._close_window(self._steal_window)
+
+    @property
+    def critical_moments_total(self) -> int:
+        """Кількість вікон критичних моментів за весь збір, включно з відкритими"""
+        return self.critical_moments_count + (self._overload_window is not None) + (self._steal_window is not None)
+
     def update_streaming_file(self, current_metrics: Dict, test_info: Dict = None):
         """
         Оновлює файл для Real-Time streaming (WOW-ефект для dashboard!)
@@ -133,14 +951,11 @@ class MetricsCollector:
             current_metrics: Поточні метрики
             test_info: Інформація про тест (instance_type, rps, тощо)
         """
-        if not self.streaming_file:
+        if not self._stream:
             return
 
-        try:
-            cpu_values = [m['cpu']['percent'] for m in self.metrics] if self.metrics else []
-            mem_values = [m['memory']['percent'] for m in self.metrics] if self.metrics else []
-
-            streaming_data = {
+        def build() -> Dict:
+            return {
                 'status': 'testing',
                 'timestamp': current_metrics['timestamp'],
                 'test_info': test_info or {},
@@ -150,22 +965,50 @@ class MetricsCollector:
                     'is_critical': current_metrics['is_critical']
                 },
                 'statistics': {
-                    'cpu_avg': sum(cpu_values) / len(cpu_values) if cpu_values else 0,
+                    'cpu_avg': self.cpu_stats.mean,
                     'cpu_peak': self.peak_cpu,
-                    'memory_avg': sum(mem_values) / len(mem_values) if mem_values else 0,
+                    'memory_avg': self.memory_stats.mean,
                     'memory_peak': self.peak_memory,
-                    'samples_count': len(self.metrics),
-                    'critical_moments_count': len(self.critical_moments)
+                    'samples_count': self.cpu_stats.count,
+                    'critical_moments_count': self.critical_moments_total,
+                    'cpu': self.cpu_stats.to_dict(),
+                    'memory': self.memory_stats.to_dict()
                 },
-                'timeline': self.metrics[-50:] if len(self.metrics) > 50 else self.metrics  # Останні 50 точок для графіка
+                'timeline': list(self.timeline)  # Останні точки для графіка
             }
 
-            with open(self.streaming_file, 'w') as f:
-                json.dump(streaming_data, f, indent=2)
-
+        try:
+            # Атомарний запис; при частих зразках оновлення зливаються і стан
+            # будується лише для тих, що справді записуються
+            self._stream.publish(build)
         except Exception as e:
             logger.error(f"Помилка оновлення streaming файлу: {e}")
 
+    def publish_live(self, current_metrics: Dict):
+        """
+        Надсилає зразок у live потік: лише поточні значення та агрегати,
+        тож обсяг на зразок сталий незалежно від тривалості тесту
+        """
+        if not self._live:
+            return
+
+        self._live.publish({
+            'type': 'sample',
+            'seq': self.samples_count,
+            'timestamp': current_metrics['timestamp'],
+            'cpu': current_metrics['cpu']['percent'],
+            'memory': current_metrics['memory']['percent'],
+            'is_critical': current_metrics['is_critical'],
+            'statistics': {
+                'cpu_avg': self.cpu_stats.mean,
+                'cpu_peak': self.peak_cpu,
+                'memory_avg': self.memory_stats.mean,
+                'memory_peak': self.peak_memory,
+                'samples_count': self.cpu_stats.count,
+                'critical_moments_count': self.critical_moments_total
+            }
+        })
+
     def collect(self) -> List[Dict]:
         """
         Збирає метрики протягом заданого часу
@@ -173,37 +1016,168 @@ class MetricsCollector:
         Returns:
             Список зібраних метрик
         """
+        if self._live:
+            self._live.start()
+            logger.info(f"📡 Live потік зразків: {self._live.host}:{self._live.port} (NDJSON)")
+
         logger.info(f"Початок збору метрик")
         logger.info(f"Інтервал: {self.interval}с, Тривалість: {self.duration}с")
 
-        start_time = time.time()
+        # Фіксована сітка тіків start + n * interval за монотонним годинником:
+        # час збору не додається до інтервалу, тож розклад не дрейфує
+        start_time = time.monotonic()
         end_time = start_time + self.duration
+        tick = 1  # Перший тік - через інтервал після базового знімка CPU
+        next_tick = start_time + self.interval
+        next_log = start_time
         sample_count = 0
 
-        while time.time() < end_time:
+        while next_tick <= end_time:
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
             metrics = self.collect_current_metrics()
 
             if metrics:
-                self.metrics.append(metrics)
+                self._store(metrics)
                 sample_count += 1
 
                 # Real-Time streaming для dashboard WOW-ефекту!
                 self.update_streaming_file(metrics)
+                self.publish_live(metrics)
 
-                remaining = int(end_time - time.time())
+                now = time.monotonic()
+                if now >= next_log:
+                    next_log = now + self.LOG_INTERVAL
+                    logger.info(
+                        f"Зразок #{sample_count} | "
+                        f"CPU: {metrics['cpu']['percent']:.1f}% | "
+                        f"RAM: {metrics['memory']['percent']:.1f}% | "
+                        f"Залишилось: {int(end_time - now)}с"
+                    )
 
-                logger.info(
-                    f"Зразок #{sample_count} | "
-                    f"CPU: {metrics['cpu']['percent']:.1f}% | "
-                    f"RAM: {metrics['memory']['percent']:.1f}% | "
-                    f"Залишилось: {remaining}с"
-                )
+            # Множення замість накопичення - без дрейфу похибки float
+            tick += 1
+            now = time.monotonic()
+            if now > start_time + tick * self.interval:
+                # Збір не встиг за інтервал - пропускаємо тіки, а не наздоганяємо серією зразків
+                skipped = int((now - start_time) / self.interval) + 1 - tick
+                self.missed_ticks += skipped
+                tick += skipped
+            next_tick = start_time + tick * self.interval
 
-            time.sleep(self.interval)
-
-        logger.info(f"Збір завершено. Всього зразків: {len(self.metrics)}")
+        if self._log_writer:
+            self._log_writer.close()
+        self.close_windows()
+        if self._stream:
+            # Останній стан, відкладений обмеженням частоти
+            self._stream.flush()
+        if self._live:
+            self._live.publish({'type': 'end', 'samples_count': self.samples_count,
+                                'missed_ticks': self.missed_ticks})
+        logger.info(f"Збір завершено. Всього зразків: {self.samples_count}, пропущено тіків: {self.missed_ticks}")
         return self.metrics
 
+    def _store(self, metrics: Dict):
+        """Зберігає зразок: у журнал на диску або в пам'ять"""
+        self.samples_count += 1
+        if not self.sample_log:
+            self.metrics.append(metrics)
+            return
+
+        if self._log_writer is None:
+            self._log_writer = SampleLogWriter(self.sample_log, info={
+                'interval': self.interval, 'duration': self.duration, 'backend': self.backend.name,
+                'target_pids': self.target_pids, 'target_pattern': self.target_pattern
+            })
+        self._log_writer.append(metrics)
+
+    def samples(self) -> Iterator[Dict]:
+        """Усі зібрані зразки у схемі metrics.json (з пам'яті або з журналу)"""
+        if not self.sample_log:
+            yield from self.metrics
+            return
+        if self._log_writer:
+            self._log_writer.close()
+
+        reader = SampleLogReader(self.sample_log)
+        try:
+            yield from reader
+        finally:
+            reader.close()
+
+    def _percent_summaries(self) -> Tuple[Dict, Dict]:
+        """
+        Зведення CPU та RAM: {'avg', 'min', 'max', 'percentiles'}
+
+        Точні значення, якщо збережено всі зразки; при обмеженому зберіганні - з
+        потокової статистики (перцентилі з похибкою гістограми).
+        """
+        if not self.retention_minutes or self.sample_log:
+            return tuple(self._values_summary(values) for values in self._percent_values())
+        return tuple({
+            'avg': stats.mean,
+            'min': stats.min if stats.count else 0,
+            'max': stats.max,
+            'percentiles': {f"p{p}": stats.percentile(p) for p in (50, 95, 99)}
+        } for stats in (self.cpu_stats, self.memory_stats))
+
+    def _values_summary(self, values: List[float]) -> Dict:
+        return {
+            'avg': sum(values) / len(values) if values else 0,
+            'min': min(values) if values else 0,
+            'max': max(values) if values else 0,
+            'percentiles': self.calculate_percentiles(values)
+        }
+
+    def _percent_values(self) -> Tuple[List[float], List[float]]:
+        """Значення CPU та RAM усіх зразків (для журналу - лише два стовпці, без побудови записів)"""
+        if not self.sample_log:
+            return [m['cpu']['percent'] for m in self.metrics], [m['memory']['percent'] for m in self.metrics]
+
+        if self._log_writer:
+            self._log_writer.close()
+        reader = SampleLogReader(self.sample_log)
+        try:
+            return reader.column('cpu.percent'), reader.column('memory.percent')
+        finally:
+            reader.close()
+
+    @classmethod
+    def from_sample_log(cls, filename: str) -> 'MetricsCollector':
+        """
+        Відновлює збирач з журналу зразків (напр. після аварійного завершення),
+        щоб зберегти metrics.json у звичній схемі
+
+        Raises:
+            ValueError: Якщо файл не є журналом зразків
+        """
+        reader = SampleLogReader(filename)
+        info = reader.info
+        collector = cls(info.get('interval', 1), info.get('duration', 0),
+                        backend=info.get('backend', 'psutil'), sample_log=filename)
+        # Процеси вже враховані в записах журналу - лише опис групи для metrics.json
+        collector.target_pids = info.get('target_pids')
+        collector.target_pattern = info.get('target_pattern')
+        try:
+            for metrics in reader:
+                collector._account(metrics)
+                collector.samples_count += 1
+            collector.close_windows()
+        finally:
+            reader.close()
+        return collector
+
+    def close(self):
+        """Звільняє ресурси джерела метрик (дескриптори /proc), закриває журнал зразків і live потік"""
+        self.backend.close()
+        self.process_trackers['collector'].close()
+        if self._live:
+            self._live.close()
+        if self._log_writer:
+            self._log_writer.close()
+
     def calculate_percentiles(self, values: List[float]) -> Dict:
         """Розраховує percentiles для наочності (p50, p95, p99)"""
         if not values:
@@ -222,43 +1196,68 @@ class MetricsCollector:
             'p99': percentile(99)   # 99th percentile (worst case)
         }
 
+    def rate_summary(self) -> Dict:
+        """Зведення швидкостей мережі та диска: {'network': {'bytes_recv': {avg, p95, ...}}, 'disk': ...}"""
+        summary = {}
+        for (block, key), stats in self.rate_stats.items():
+            summary.setdefault(block, {})[key] = stats.to_dict()
+        return summary
+
     def save_to_file(self, filename: str = 'metrics.json'):
         """Зберігає метрики у файл з аналітикою"""
         try:
             # Розрахунок статистики
-            cpu_values = [m['cpu']['percent'] for m in self.metrics]
-            mem_values = [m['memory']['percent'] for m in self.metrics]
-
-            cpu_percentiles = self.calculate_percentiles(cpu_values)
-            mem_percentiles = self.calculate_percentiles(mem_values)
+            cpu_summary, mem_summary = self._percent_summaries()
+            metrics = list(self.samples())
 
             output = {
                 'collection_info': {
                     'interval': self.interval,
                     'duration': self.duration,
-                    'samples_count': len(self.metrics),
-                    'start_time': self.metrics[0]['timestamp'] if self.metrics else None,
-                    'end_time': self.metrics[-1]['timestamp'] if self.metrics else None
+                    'samples_count': self.samples_count,
+                    'retention_minutes': self.retention_minutes,
+                    'retained_samples': len(metrics),
+                    'missed_ticks': self.missed_ticks,
+                    'backend': self.backend.name,
+                    'target_processes': {
+                        'pids': self.target_pids,
+                        'pattern': self.target_pattern,
+                        'seen_pids': sorted(self.process_trackers['target'].seen_pids)
+                        if 'target' in self.process_trackers else None
+                    } if self.target_pids or self.target_pattern else None,
+                    'start_time': self.first_timestamp,
+                    'end_time': self.last_timestamp
                 },
                 'summary': {
                     'cpu': {
-                        'avg': sum(cpu_values) / len(cpu_values) if cpu_values else 0,
-                        'min': min(cpu_values) if cpu_values else 0,
-                        'max': max(cpu_values) if cpu_values else 0,
+                        'avg': cpu_summary['avg'],
+                        'min': cpu_summary['min'],
+                        'max': cpu_summary['max'],
                         'peak': self.peak_cpu,
-                        'percentiles': cpu_percentiles
+                        'stddev': self.cpu_stats.stddev,
+                        'percentiles': cpu_summary['percentiles']
                     },
                     'memory': {
-                        'avg': sum(mem_values) / len(mem_values) if mem_values else 0,
-                        'min': min(mem_values) if mem_values else 0,
-                        'max': max(mem_values) if mem_values else 0,
+                        'avg': mem_summary['avg'],
+                        'min': mem_summary['min'],
+                        'max': mem_summary['max'],
                         'peak': self.peak_memory,
-                        'percentiles': mem_percentiles
+                        'stddev': self.memory_stats.stddev,
+                        'percentiles': mem_summary['percentiles']
                     },
-                    'critical_moments_count': len(self.critical_moments),
-                    'critical_moments': self.critical_moments
+                    'processes': {name: stats.to_dict() for name, stats in self.process_stats.items()},
+                    'rates': self.rate_summary(),
+                    'cpu_breakdown': {field: stats.to_dict() for field, stats in self.cpu_breakdown_stats.items()
+                                      if stats.count},
+                    'steal_throttled_samples': self.steal_throttled_samples,
+                    'steal_windows_count': self.steal_windows_count,
+                    'critical_moments_count': self.critical_moments_count,
+                    # З --retention - лише останні MAX_CRITICAL_MOMENTS вікон
+                    'critical_moments': list(self.critical_moments)
                 },
-                'metrics': self.metrics
+                # Агрегати за весь збір (у межах кількості кошиків), 'metrics' - повна роздільність
+                'tiers': {f"{tier.resolution}s": tier.to_dict() for tier in self.rollups},
+                'metrics': metrics
             }
 
             with open(filename, 'w') as f:
@@ -272,65 +1271,189 @@ class MetricsCollector:
 
     def print_summary(self):
         """Виводить розширену підсумкову статистику з WOW-ефектом"""
-        if not self.metrics:
+        if not self.samples_count:
             logger.warning("Немає зібраних метрик для відображення")
             return
 
-        cpu_values = [m['cpu']['percent'] for m in self.metrics]
-        mem_values = [m['memory']['percent'] for m in self.metrics]
-
-        cpu_percentiles = self.calculate_percentiles(cpu_values)
-        mem_percentiles = self.calculate_percentiles(mem_values)
+        cpu_summary, mem_summary = self._percent_summaries()
+        cpu_percentiles = cpu_summary['percentiles']
+        mem_percentiles = mem_summary['percentiles']
 
         print("\n" + "=" * 70)
         print("📊 РОЗШИРЕНИЙ ПІДСУМОК МЕТРИК (для магістерської роботи)")
         print("=" * 70)
-        print(f"⏱️  Всього зразків: {len(self.metrics)} (інтервал: {self.interval}с)")
-        print(f"🔥 Критичних моментів (CPU/RAM > 90%): {len(self.critical_moments)}")
+        print(f"⏱️  Всього зразків: {self.samples_count} (інтервал: {self.interval}с)")
+        if self.retention_minutes:
+            print(f"🗂️  Повна роздільність: останні {self.retention_minutes:g} хв ({len(self.metrics)} зразків), "
+                  f"старші - агрегати {', '.join(f'{tier.resolution}с' for tier in self.rollups)}")
+        print(f"🔥 Критичних моментів (CPU/RAM > 90% або steal > {self.STEAL_THRESHOLD:.0f}%): "
+              f"{self.critical_moments_count}")
 
         print(f"\n💻 CPU НАВАНТАЖЕННЯ:")
-        print(f"  ├─ Середнє:  {sum(cpu_values) / len(cpu_values):.2f}%")
-        print(f"  ├─ Мінімум:  {min(cpu_values):.2f}%")
-        print(f"  ├─ Максимум: {max(cpu_values):.2f}% {'🔥 КРИТИЧНО!' if max(cpu_values) > 90 else ''}")
+        print(f"  ├─ Середнє:  {cpu_summary['avg']:.2f}%")
+        print(f"  ├─ Мінімум:  {cpu_summary['min']:.2f}%")
+        print(f"  ├─ Максимум: {cpu_summary['max']:.2f}% {'🔥 КРИТИЧНО!' if cpu_summary['max'] > 90 else ''}")
         print(f"  ├─ p50 (median): {cpu_percentiles['p50']:.2f}%")
         print(f"  ├─ p95: {cpu_percentiles['p95']:.2f}%")
         print(f"  └─ p99 (worst): {cpu_percentiles['p99']:.2f}%")
+        breakdown = self.cpu_breakdown_stats
+        if breakdown['steal'].count:
+            print(f"  Розподіл часу (сер. / макс.): steal {breakdown['steal'].mean:.1f} / {breakdown['steal'].max:.1f}%, "
+                  f"iowait {breakdown['iowait'].mean:.1f} / {breakdown['iowait'].max:.1f}%, "
+                  f"softirq {breakdown['softirq'].mean:.1f} / {breakdown['softirq'].max:.1f}%")
 
         print(f"\n🧠 MEMORY (RAM) ВИКОРИСТАННЯ:")
-        print(f"  ├─ Середнє:  {sum(mem_values) / len(mem_values):.2f}%")
-        print(f"  ├─ Мінімум:  {min(mem_values):.2f}%")
-        print(f"  ├─ Максимум: {max(mem_values):.2f}% {'🔥 КРИТИЧНО!' if max(mem_values) > 90 else ''}")
+        print(f"  ├─ Середнє:  {mem_summary['avg']:.2f}%")
+        print(f"  ├─ Мінімум:  {mem_summary['min']:.2f}%")
+        print(f"  ├─ Максимум: {mem_summary['max']:.2f}% {'🔥 КРИТИЧНО!' if mem_summary['max'] > 90 else ''}")
         print(f"  ├─ p50 (median): {mem_percentiles['p50']:.2f}%")
         print(f"  ├─ p95: {mem_percentiles['p95']:.2f}%")
         print(f"  └─ p99 (worst): {mem_percentiles['p99']:.2f}%")
 
+        rates = self.rate_summary()
+        if rates:
+            network, disk = rates['network'], rates['disk']
+            print(f"\n🌐 МЕРЕЖА ТА ДИСК (за секунду, сер. / p95 / макс.):")
+            print(f"  ├─ Мережа, Mbit/s: {network['bytes_total']['avg'] * 8 / 1e6:.2f} / "
+                  f"{network['bytes_total']['p95'] * 8 / 1e6:.2f} / {network['bytes_total']['max'] * 8 / 1e6:.2f} "
+                  f"(вх. сер. {network['bytes_recv']['avg'] * 8 / 1e6:.2f}, вих. сер. {network['bytes_sent']['avg'] * 8 / 1e6:.2f})")
+            print(f"  ├─ Пакети: вх. {network['packets_recv']['avg']:.0f}, вих. {network['packets_sent']['avg']:.0f} | "
+                  f"відкинуто: {network['drops_in']['avg'] + network['drops_out']['avg']:.2f} "
+                  f"(макс. {max(network['drops_in']['max'], network['drops_out']['max']):.0f})")
+            print(f"  └─ Диск: IOPS читання/запис {disk['read_iops']['avg']:.1f} / {disk['write_iops']['avg']:.1f}, "
+                  f"MB/s {disk['read_bytes']['avg'] / 1e6:.2f} / {disk['write_bytes']['avg'] / 1e6:.2f} "
+                  f"(p95 запису {disk['write_bytes']['p95'] / 1e6:.2f})")
+
+        titles = {'target': '🎯 ДОСЛІДЖУВАНИЙ СЕРВЕР', 'collector': '🔧 ВЛАСНІ ВИТРАТИ ЗБИРАЧА'}
+        for name in ('target', 'collector'):
+            if name not in self.process_stats:
+                continue
+            stats = self.process_stats[name].to_dict()
+            print(f"\n{titles[name]} (процесів: до {stats['max_processes']}):")
+            print(f"  ├─ CPU: сер. {stats['cpu_percent']['avg']:.2f}%, p95 {stats['cpu_percent']['p95']:.2f}%, "
+                  f"всього {stats['cpu_time_total']:.2f}с")
+            print(f"  ├─ RAM: сер. {stats['memory_percent']['avg']:.2f}%, пік RSS {stats['peak_rss'] / 1024 / 1024:.1f} MB")
+            fds = stats['peak_fds'] if stats['peak_fds'] is not None else 'н/д (немає доступу)'
+            print(f"  ├─ Потоки / дескриптори (пік): {stats['peak_threads']} / {fds}")
+            print(f"  └─ Перемикання контексту/с: {stats['ctx_switches_voluntary_avg']:.0f} добровільних, "
+                  f"{stats['ctx_switches_involuntary_avg']:.0f} примусових")
+
         if self.critical_moments:
             print(f"\n⚠️  КРИТИЧНІ МОМЕНТИ:")
-            for i, moment in enumerate(self.critical_moments[:5], 1):  # Показуємо перші 5
-                print(f"  {i}. {moment['timestamp']} - CPU: {moment['cpu']:.1f}%, RAM: {moment['memory']:.1f}%")
-            if len(self.critical_moments) > 5:
-                print(f"  ... та ще {len(self.critical_moments) - 5} моментів")
+            for i, moment in enumerate(list(self.critical_moments)[:5], 1):  # Показуємо перші 5
+                if moment.get('reason') == 'steal':
+                    print(f"  {i}. {moment['timestamp']} … {moment['end']} - steal-троттлінг: "
+                          f"сер. {moment['steal_avg']:.1f}%, макс. {moment['steal_max']:.1f}% (CPU {moment['cpu']:.1f}%)")
+                else:
+                    print(f"  {i}. {moment['timestamp']} … {moment['end']} - перевантаження ({moment['samples']} зразків): "
+                          f"пік CPU {moment['cpu']:.1f}%, RAM {moment['memory']:.1f}%")
+            if self.critical_moments_count > 5:
+                print(f"  ... та ще {self.critical_moments_count - 5} моментів")
 
         print("=" * 70)
 
 
+def benchmark_backends(samples: int = 2000) -> Dict[str, float]:
+    """
+    Власна вартість збору: CPU час процесу на один зразок для кожного джерела метрик
+
+    Args:
+        samples: Кількість зразків на джерело
+
+    Returns:
+        {назва джерела: секунд CPU на зразок}
+    """
+    costs = {}
+    for name in BACKENDS:
+        try:
+            collector = MetricsCollector(backend=name)
+        except OSError as e:
+            logger.warning(f"Джерело {name} недоступне: {e}")
+            continue
+
+        collector.collect_current_metrics()  # Прогрів
+        start = time.process_time()
+        for _ in range(samples):
+            collector.collect_current_metrics()
+        costs[name] = (time.process_time() - start) / samples
+        collector.close()
+
+    print("\n" + "=" * 70)
+    print(f"⏱️  ВАРТІСТЬ ЗБОРУ МЕТРИК ({samples} зразків на джерело)")
+    print("=" * 70)
+    for name, cost in costs.items():
+        print(f"  {name:8} {cost * 1e6:8.1f} мкс/зразок | CPU збирача: "
+              f"{cost * 10 * 100:.2f}% при 10 Гц, {cost * 100 * 100:.2f}% при 100 Гц")
+    if len(costs) == len(BACKENDS):
+        print(f"  procfs дешевше у {costs['psutil'] / costs['procfs']:.1f} раз(и)")
+    print("=" * 70)
+    return costs
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Розбирає аргументи командного рядка"""
+    parser = argparse.ArgumentParser(
+        description="System Metrics Collector",
+        epilog="Приклад: python3 metrics_collector.py 1 90 metrics_target.json current_test.json"
+    )
+    parser.add_argument('interval', nargs='?', type=float,
+                        help="Інтервал між зразками, с (можна дробовий, напр. 0.1)")
+    parser.add_argument('duration', nargs='?', type=int, help="Тривалість збору, с")
+    parser.add_argument('output_file', nargs='?', default='metrics.json',
+                        help="Файл результатів (за замовчуванням metrics.json)")
+    parser.add_argument('streaming_file', nargs='?', help="Файл для Real-Time streaming (current_test.json)")
+    parser.add_argument('--backend', choices=list(BACKENDS), default='psutil',
+                        help="Джерело метрик: psutil (за замовчуванням) або procfs - напряму з /proc (Linux)")
+    parser.add_argument('--stream-rate', type=float, default=2.0, metavar='HZ',
+                        help="Максимум записів streaming файлу на секунду (за замовчуванням 2)")
+    parser.add_argument('--stream-deltas', action='store_true',
+                        help="Додатково писати нові точки графіка в <streaming_file>.delta.json")
+    parser.add_argument('--live-port', type=int, metavar='PORT',
+                        help="Віддавати зразки NDJSON потоком на 127.0.0.1:PORT (для оркестратора через SSH тунель)")
+    parser.add_argument('--live-host', default='127.0.0.1', help="Адреса live потоку (за замовчуванням 127.0.0.1)")
+    parser.add_argument('--pids', type=int, nargs='+', metavar='PID',
+                        help="PID-и досліджуваного сервера: його CPU, RSS, потоки, дескриптори окремо від хоста")
+    parser.add_argument('--process', metavar='PATTERN',
+                        help="Регулярний вираз імені/командного рядка процесів сервера (напр. 'nginx|python3 app.py')")
+    parser.add_argument('--retention', type=float, metavar='MINUTES',
+                        help="Зберігати всі зразки лише за останні MINUTES хвилин, старші - агрегатами 10 с / 60 с "
+                             "(для довгих soak-тестів)")
+    parser.add_argument('--sample-log', metavar='FILE',
+                        help="Дописувати зразки в компактний журнал FILE під час збору (не тримати в пам'яті)")
+    parser.add_argument('--convert', nargs=2, metavar=('LOG', 'OUTPUT'),
+                        help="Перетворити журнал зразків LOG у файл метрик OUTPUT (схема metrics.json) та вийти")
+    parser.add_argument('--benchmark', type=int, nargs='?', const=2000, metavar='SAMPLES',
+                        help="Порівняти власну вартість збору для psutil і procfs та вийти")
+
+    args = parser.parse_args(argv)
+    if not args.convert and args.benchmark is None and (args.interval is None or args.duration is None):
+        parser.error("Потрібні INTERVAL та DURATION")
+    return args
+
+
 def main():
     """Основна функція"""
-    if len(sys.argv) < 3:
-        print("Використання: python3 metrics_collector.py <INTERVAL> <DURATION> [OUTPUT_FILE] [STREAMING_FILE]")
-        print("Приклад: python3 metrics_collector.py 1 90 metrics_target.json current_test.json")
-        sys.exit(1)
+    args = parse_args(sys.argv[1:])
+    if args.benchmark is not None:
+        benchmark_backends(args.benchmark)
+        return
+    if args.convert:
+        log_file, output_file = args.convert
+        collector = MetricsCollector.from_sample_log(log_file)
+        collector.print_summary()
+        collector.save_to_file(output_file)
+        collector.close()
+        return
 
+    collector = None
+    output_file = args.output_file
     try:
-        interval = int(sys.argv[1])
-        duration = int(sys.argv[2])
-        output_file = sys.argv[3] if len(sys.argv) > 3 else 'metrics.json'
-        streaming_file = sys.argv[4] if len(sys.argv) > 4 else None
-
-        if interval <= 0 or duration <= 0:
+        if args.interval <= 0 or args.duration <= 0:
             raise ValueError("Інтервал та тривалість мають бути додатними числами")
 
-        collector = MetricsCollector(interval, duration, streaming_file)
+        collector = MetricsCollector(args.interval, args.duration, args.streaming_file, args.backend,
+                                     args.sample_log, args.stream_rate, args.stream_deltas,
+                                     args.live_port, args.live_host, args.pids, args.process, args.retention)
 
         # Збір метрик
         collector.collect()
@@ -343,7 +1466,7 @@ def main():
 
     except KeyboardInterrupt:
         logger.info("\n⚠️ Збір метрик перервано користувачем")
-        if collector.metrics:
+        if collector and collector.samples_count:
             collector.print_summary()
             collector.save_to_file(output_file)
     except ValueError as e:
@@ -352,6 +1475,9 @@ def main():
     except Exception as e:
         logger.error(f"Неочікувана помилка: {e}")
         sys.exit(1)
+    finally:
+        if collector:
+            collector.close()
 
 
 if __name__ == "__main__":
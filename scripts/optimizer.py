@@ -1,20 +1,174 @@
 #!/usr/bin/env python3
 """
 Multi-Criteria Optimization using TOPSIS
-Багатокритеріальна оптимізація методом TOPSIS
+Багатокритеріальна оптимізація методом TOPSIS (а також VIKOR, PROMETHEE II, SAW
+та TOPSIS з ентропійними вагами для перевірки узгодженості рейтингу)
 """
 
 import numpy as np
 import json
-from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Напрям критеріїв: True - більше краще (вигода), False - менше краще (витрати)
+DEFAULT_BENEFIT_CRITERIA = {
+    'performance': True,
+    'response_time': False,
+    'cpu_usage': False,
+    'memory_usage': False,
+    'cost': False,
+    'network_mbps': False,
+    'success_rate': True,
+}
+
+def _rank_statistics(criteria_weights: Dict[str, float], benefit_criteria: Dict[str, bool],
+                     matrix: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Переможці та суми рангів для пакета векторів ваг (окрема функція - для пулу процесів)
+
+    Returns:
+        (індекс переможця для кожного вектора ваг, сума рангів кожної альтернативи)
+    """
+    scores = TOPSISOptimizer(criteria_weights, benefit_criteria).score_tensor(matrix, weights)
+    order = np.argsort(-scores, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, scores.shape[1] + 1)[None, :], axis=1)
+    return order[:, 0], ranks.sum(axis=0)
+
+class DecisionMatrix:
+    """
+    Матриця рішень (альтернативи × критерії), нормалізована один раз
+
+    vector - векторна нормалізація (TOPSIS), linear - лінійна min-max, орієнтована
+    за напрямом критерію (1 - найкраще значення, 0 - найгірше; SAW, VIKOR, PROMETHEE II).
+    """
+
+    def __init__(self, matrix: np.ndarray, alt_names: List[str], benefit: np.ndarray, vector: np.ndarray):
+        self.matrix = matrix
+        self.alt_names = alt_names
+        self.benefit = benefit
+        self.vector = vector
+
+        column_min = matrix.min(axis=0) if len(matrix) else np.zeros(matrix.shape[1])
+        column_max = matrix.max(axis=0) if len(matrix) else np.zeros(matrix.shape[1])
+        span = np.where(column_max > column_min, column_max - column_min, 1.0)
+        self.linear = np.where(benefit, matrix - column_min, column_max - matrix) / span
+
+    def entropy_weights(self) -> np.ndarray:
+        """
+        Об'єктивні ваги за ентропією Шеннона: критерій, за яким альтернативи
+        відрізняються сильніше, отримує більшу вагу
+        """
+        count, criteria = self.matrix.shape
+        if count < 2:
+            return np.full(criteria, 1.0 / criteria)
+
+        values = np.abs(self.matrix)
+        totals = values.sum(axis=0)
+        # Стовпець з нулів не розрізняє альтернатив - рівномірний розподіл, нульова вага
+        shares = np.where(totals > 0, values / np.where(totals > 0, totals, 1), 1.0 / count)
+        entropy = -np.sum(shares * np.log(np.where(shares > 0, shares, 1)), axis=0) / np.log(count)
+        divergence = np.clip(1 - entropy, 0, None)
+        if divergence.sum() == 0:
+            return np.full(criteria, 1.0 / criteria)
+        return divergence / divergence.sum()
+
+
+class MCDMMethod:
+    """
+    Метод багатокритеріального рейтингу над спільною DecisionMatrix
+
+    score() повертає оцінки альтернатив, де більше - краще, тож рейтинги
+    різних методів порівнюються напряму.
+    """
+
+    def method_weights(self, decision: DecisionMatrix, weights: np.ndarray) -> np.ndarray:
+        """Ваги, з якими працює метод (за замовчуванням - ваги оптимізатора)"""
+        return weights
+
+    def score(self, optimizer: 'TOPSISOptimizer', decision: DecisionMatrix, weights: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class TOPSISMethod(MCDMMethod):
+    """Близькість до ідеального рішення (векторна нормалізація)"""
+
+    def score(self, optimizer, decision, weights):
+        return optimizer.score_normalized(decision.vector[None], weights)[0]
+
+
+class EntropyTOPSISMethod(TOPSISMethod):
+    """TOPSIS з ентропійними вагами замість експертних"""
+
+    def method_weights(self, decision, weights):
+        return decision.entropy_weights()
+
+
+class SAWMethod(MCDMMethod):
+    """Зважена сума лінійно нормалізованих значень"""
+
+    def score(self, optimizer, decision, weights):
+        return decision.linear @ weights
+
+
+class VIKORMethod(MCDMMethod):
+    """
+    Компромісний рейтинг VIKOR: S - зважена сума відставань від найкращих
+    значень, R - найбільше зважене відставання, Q - їх комбінація з вагою
+    стратегії більшості v. Оцінка = 1 - Q.
+    """
+
+    def __init__(self, v: float = 0.5):
+        self.v = v
+
+    def score(self, optimizer, decision, weights):
+        regret = (1 - decision.linear) * weights
+        group_utility = regret.sum(axis=1)
+        individual_regret = regret.max(axis=1) if regret.size else group_utility
+
+        def scaled(values):
+            span = values.max() - values.min() if len(values) else 0
+            return (values - values.min()) / span if span > 0 else np.zeros_like(values)
+
+        return 1 - (self.v * scaled(group_utility) + (1 - self.v) * scaled(individual_regret))
+
+
+class PROMETHEEMethod(MCDMMethod):
+    """
+    PROMETHEE II: чистий потік переваг з лінійною функцією переваги
+    (повна перевага при різниці на весь діапазон критерію). Оцінка від -1 до 1.
+    """
+
+    def score(self, optimizer, decision, weights):
+        count = len(decision.alt_names)
+        if count < 2:
+            return np.zeros(count)
+        # preference[a, b] - зважена перевага a над b
+        preference = np.clip(decision.linear[:, None, :] - decision.linear[None, :, :], 0, None) @ weights
+        return (preference.sum(axis=1) - preference.sum(axis=0)) / (count - 1)
+
+
+MCDM_METHODS = {
+    'TOPSIS': TOPSISMethod(),
+    'TOPSIS-entropy': EntropyTOPSISMethod(),
+    'SAW': SAWMethod(),
+    'VIKOR': VIKORMethod(),
+    'PROMETHEE II': PROMETHEEMethod(),
+}
+
 
 class TOPSISOptimizer:
-    def __init__(self, criteria_weights: Dict[str, float] = None):
+    def __init__(self, criteria_weights: Dict[str, float] = None, benefit_criteria: Dict[str, bool] = None):
         """
         Ініціалізація оптимізатора TOPSIS
         
         Args:
             criteria_weights: Ваги критеріїв (сума має дорівнювати 1.0)
+            benefit_criteria: Напрям критеріїв {назва: True якщо більше = краще};
+                доповнює DEFAULT_BENEFIT_CRITERIA
+        
+        Raises:
+            ValueError: Якщо сума ваг не 1.0 або для критерію невідомий напрям
         """
         self.criteria_weights = criteria_weights or {
             'performance': 0.35,    # Продуктивність (requests/sec)
@@ -28,19 +182,30 @@ class TOPSISOptimizer:
         total_weight = sum(self.criteria_weights.values())
         if abs(total_weight - 1.0) > 0.01:
             raise ValueError(f"Сума ваг має дорівнювати 1.0, поточна: {total_weight}")
+
+        self.criteria_names = list(self.criteria_weights.keys())
+        directions = {**DEFAULT_BENEFIT_CRITERIA, **(benefit_criteria or {})}
+        unknown = [c for c in self.criteria_names if c not in directions]
+        if unknown:
+            raise ValueError(f"Невідомий напрям критеріїв (вкажіть benefit_criteria): {', '.join(unknown)}")
+        self.benefit_criteria = {c: directions[c] for c in self.criteria_names}
+
+        self.weights = np.array([self.criteria_weights[c] for c in self.criteria_names], dtype=float)
+        self.benefit = np.array([self.benefit_criteria[c] for c in self.criteria_names], dtype=bool)
     
     def normalize_matrix(self, matrix: np.ndarray) -> np.ndarray:
         """
         Нормалізація матриці рішень
 
         Args:
-            matrix: Вхідна матриця для нормалізації
+            matrix: Вхідна матриця (альтернативи × критерії) або тензор
+                (сценарії × альтернативи × критерії) - нормалізується кожен сценарій окремо
 
         Returns:
             Нормалізована матриця
         """
-        # Векторна нормалізація
-        col_sums = np.sqrt(np.sum(matrix ** 2, axis=0))
+        # Векторна нормалізація по альтернативах
+        col_sums = np.sqrt(np.sum(matrix ** 2, axis=-2, keepdims=True))
 
         # Захист від ділення на нуль
         col_sums = np.where(col_sums == 0, 1, col_sums)
@@ -52,44 +217,140 @@ class TOPSISOptimizer:
         return normalized_matrix * weights
     
     def find_ideal_solutions(self, weighted_matrix: np.ndarray, 
-                            benefit_criteria: List[bool]) -> Tuple[np.ndarray, np.ndarray]:
+                            benefit_criteria: Sequence[bool]) -> Tuple[np.ndarray, np.ndarray]:
         """
         Знаходить ідеальне та антиідеальне рішення
         
         Args:
-            weighted_matrix: Зважена нормалізована матриця
+            weighted_matrix: Зважена нормалізована матриця (або тензор зі сценаріями)
             benefit_criteria: Список булевих значень (True якщо більше = краще)
         
         Returns:
             Tuple (ideal_solution, anti_ideal_solution)
         """
-        ideal = np.zeros(weighted_matrix.shape[1])
-        anti_ideal = np.zeros(weighted_matrix.shape[1])
-        
-        for j in range(weighted_matrix.shape[1]):
-            if benefit_criteria[j]:
-                # Для критеріїв вигоди: більше = краще
-                ideal[j] = np.max(weighted_matrix[:, j])
-                anti_ideal[j] = np.min(weighted_matrix[:, j])
-            else:
-                # Для критеріїв витрат: менше = краще
-                ideal[j] = np.min(weighted_matrix[:, j])
-                anti_ideal[j] = np.max(weighted_matrix[:, j])
-        
+        benefit = np.asarray(benefit_criteria, dtype=bool)
+        column_max = weighted_matrix.max(axis=-2)
+        column_min = weighted_matrix.min(axis=-2)
+        # Для критеріїв вигоди ідеал - максимум, для критеріїв витрат - мінімум
+        ideal = np.where(benefit, column_max, column_min)
+        anti_ideal = np.where(benefit, column_min, column_max)
         return ideal, anti_ideal
     
     def calculate_distances(self, weighted_matrix: np.ndarray, 
                            ideal: np.ndarray, 
                            anti_ideal: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """Обчислює відстані до ідеального та антиідеального рішення"""
-        distance_to_ideal = np.sqrt(np.sum((weighted_matrix - ideal) ** 2, axis=1))
-        distance_to_anti_ideal = np.sqrt(np.sum((weighted_matrix - anti_ideal) ** 2, axis=1))
+        distance_to_ideal = np.sqrt(np.sum((weighted_matrix - ideal[..., None, :]) ** 2, axis=-1))
+        distance_to_anti_ideal = np.sqrt(np.sum((weighted_matrix - anti_ideal[..., None, :]) ** 2, axis=-1))
         return distance_to_ideal, distance_to_anti_ideal
     
     def calculate_scores(self, distance_to_ideal: np.ndarray, 
                         distance_to_anti_ideal: np.ndarray) -> np.ndarray:
         """Обчислює фінальні оцінки близькості"""
-        return distance_to_anti_ideal / (distance_to_ideal + distance_to_anti_ideal)
+        total = distance_to_ideal + distance_to_anti_ideal
+        # Усі альтернативи однакові - жодна не ближча до ідеалу
+        return np.divide(distance_to_anti_ideal, total, out=np.full_like(total, 0.5), where=total > 0)
+
+    def score_tensor(self, tensor: np.ndarray, weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Оцінки TOPSIS для тензора сценаріїв і набору векторів ваг за один прохід NumPy
+
+        Ідеал зваженої матриці - це ідеал нормалізованої, помножений на вагу
+        (ваги невід'ємні), тож квадрат відстані дорівнює сумі w_j^2 * (n_ij - n*_j)^2.
+        Відстані для всіх векторів ваг - одне матричне множення
+        (сценарії × альтернативи × критерії) @ (критерії × ваги), без тензора
+        зважених матриць для кожного вектора ваг.
+
+        Args:
+            tensor: (альтернативи × критерії) або (сценарії × альтернативи × критерії),
+                стовпці в порядку criteria_names
+            weights: (критерії,) або (вектори ваг × критерії); за замовчуванням - ваги оптимізатора
+
+        Returns:
+            Оцінки (сценарії × [вектори ваг ×] альтернативи); осі, яких не було у вхідних даних, відсутні
+
+        Raises:
+            ValueError: Якщо кількість критеріїв не збігається або ваги від'ємні
+        """
+        tensor = np.asarray(tensor, dtype=float)
+        weights = self.weights if weights is None else np.asarray(weights, dtype=float)
+        if tensor.shape[-1] != len(self.criteria_names) or weights.shape[-1] != len(self.criteria_names):
+            raise ValueError(f"Очікується {len(self.criteria_names)} критеріїв: {', '.join(self.criteria_names)}")
+        if np.any(weights < 0):
+            raise ValueError("Ваги критеріїв мають бути невід'ємними")
+
+        single_scenario = tensor.ndim == 2
+        scores = self.score_normalized(self.normalize_matrix(tensor[None] if single_scenario else tensor), weights)
+        return scores[0] if single_scenario else scores
+
+    def score_normalized(self, normalized: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Оцінки TOPSIS для вже нормалізованого тензора (сценарії × альтернативи × критерії)
+
+        Returns:
+            Оцінки (сценарії × [вектори ваг ×] альтернативи)
+        """
+        single_weights = weights.ndim == 1
+        squared_weights = np.atleast_2d(weights).T ** 2  # (критерії × вектори ваг)
+
+        ideal, anti_ideal = self.find_ideal_solutions(normalized, self.benefit)
+        # (сценарії × альтернативи × вектори ваг) → (сценарії × вектори ваг × альтернативи)
+        distance_to_ideal = np.sqrt(((normalized - ideal[:, None, :]) ** 2) @ squared_weights).transpose(0, 2, 1)
+        distance_to_anti_ideal = np.sqrt(((normalized - anti_ideal[:, None, :]) ** 2) @ squared_weights).transpose(0, 2, 1)
+        scores = self.calculate_scores(distance_to_ideal, distance_to_anti_ideal)
+
+        return scores[:, 0] if single_weights else scores
+
+    def build_matrix(self, alternatives: Dict[str, Dict[str, float]]) -> Tuple[np.ndarray, List[str]]:
+        """
+        Матриця рішень (альтернативи × критерії) з словника альтернатив
+
+        Raises:
+            ValueError: Якщо в альтернативи немає значення критерію
+        """
+        alt_names = list(alternatives.keys())
+        try:
+            matrix = np.array([[alternatives[alt][criterion] for criterion in self.criteria_names]
+                               for alt in alt_names], dtype=float)
+        except KeyError as e:
+            raise ValueError(f"Немає значення критерію {e} для однієї з альтернатив")
+        return matrix.reshape(len(alt_names), len(self.criteria_names)), alt_names
+
+    def build_tensor(self, scenarios: Dict[str, Dict[str, Dict[str, float]]]) -> Tuple[np.ndarray, List[str], List[str]]:
+        """
+        Тензор (сценарії × альтернативи × критерії), напр. сценарії - рівні RPS
+
+        Raises:
+            ValueError: Якщо набори альтернатив у сценаріях різні
+        """
+        scenario_names = list(scenarios.keys())
+        alt_names = list(scenarios[scenario_names[0]].keys()) if scenario_names else []
+        matrices = []
+        for name in scenario_names:
+            if set(scenarios[name]) != set(alt_names):
+                raise ValueError(f"Сценарій {name} має інший набір альтернатив")
+            matrices.append(self.build_matrix({alt: scenarios[name][alt] for alt in alt_names})[0])
+        tensor = np.stack(matrices) if matrices else np.empty((0, 0, len(self.criteria_names)))
+        return tensor, scenario_names, alt_names
+
+    def format_results(self, alternatives: Dict[str, Dict[str, float]], alt_names: List[str],
+                       scores: np.ndarray, method: str = 'TOPSIS',
+                       criteria_weights: Optional[Dict[str, float]] = None) -> Dict:
+        """Результати у форматі optimization_results.json (рейтинг за спаданням оцінки)"""
+        order = np.argsort(-scores, kind='stable')
+        results = [{
+            'alternative': alt_names[index],
+            'score': float(scores[index]),
+            'rank': rank,
+            'criteria': alternatives[alt_names[index]]
+        } for rank, index in enumerate(order, 1)]
+
+        return {
+            'method': method,
+            'criteria_weights': criteria_weights or self.criteria_weights,
+            'results': results,
+            'best_alternative': results[0]['alternative'] if results else None
+        }
     
     def optimize(self, alternatives: Dict[str, Dict[str, float]]) -> Dict:
         """
@@ -105,66 +366,218 @@ class TOPSISOptimizer:
         Returns:
             Результати оптимізації з рейтингом
         """
-        # Перетворення даних у матрицю
-        alt_names = list(alternatives.keys())
-        criteria_names = list(self.criteria_weights.keys())
-        
-        matrix = np.array([
-            [alternatives[alt][criterion] for criterion in criteria_names]
-            for alt in alt_names
-        ])
-        
-        # Визначення типів критеріїв (більше = краще?)
-        benefit_criteria = [
-            True,   # performance - більше краще
-            False,  # response_time - менше краще
-            False,  # cpu_usage - менше краще
-            False,  # memory_usage - менше краще
-            False,  # cost - менше краще
-        ]
-        
-        # Ваги як масив
-        weights = np.array([self.criteria_weights[c] for c in criteria_names])
-        
-        # Крок 1: Нормалізація
-        normalized = self.normalize_matrix(matrix)
-        
-        # Крок 2: Зважена матриця
-        weighted = self.calculate_weighted_matrix(normalized, weights)
-        
-        # Крок 3: Ідеальні рішення
-        ideal, anti_ideal = self.find_ideal_solutions(weighted, benefit_criteria)
-        
-        # Крок 4: Відстані
-        dist_ideal, dist_anti_ideal = self.calculate_distances(weighted, ideal, anti_ideal)
-        
-        # Крок 5: Оцінки
-        scores = self.calculate_scores(dist_ideal, dist_anti_ideal)
-        
-        # Формування результатів
-        results = []
-        for i, alt_name in enumerate(alt_names):
-            results.append({
-                'alternative': alt_name,
-                'score': float(scores[i]),
-                'rank': 0,  # Буде заповнено нижче
-                'criteria': alternatives[alt_name]
-            })
-        
-        # Сортування за оцінкою (більша оцінка = краще)
-        results.sort(key=lambda x: x['score'], reverse=True)
-        
-        # Додавання рангів
-        for i, result in enumerate(results):
-            result['rank'] = i + 1
-        
+        matrix, alt_names = self.build_matrix(alternatives)
+        scores = self.score_tensor(matrix)
+        return self.format_results(alternatives, alt_names, scores)
+
+    def optimize_scenarios(self, scenarios: Dict[str, Dict[str, Dict[str, float]]]) -> Dict[str, Dict]:
+        """
+        TOPSIS для кількох сценаріїв (напр. рівнів RPS) одним проходом
+
+        Args:
+            scenarios: {сценарій: {альтернатива: {критерій: значення}}}
+
+        Returns:
+            {сценарій: результати у форматі optimize()}
+        """
+        tensor, scenario_names, alt_names = self.build_tensor(scenarios)
+        scores = self.score_tensor(tensor)
+        return {name: self.format_results(scenarios[name], alt_names, scores[i])
+                for i, name in enumerate(scenario_names)}
+    
+    def decision_matrix(self, alternatives: Dict[str, Dict[str, float]]) -> 'DecisionMatrix':
+        """Матриця рішень, нормалізована один раз для всіх методів MCDM"""
+        matrix, alt_names = self.build_matrix(alternatives)
+        return DecisionMatrix(matrix, alt_names, self.benefit, self.normalize_matrix(matrix))
+
+    def compare_methods(self, alternatives: Dict[str, Dict[str, float]],
+                        methods: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Рейтинг кількома методами MCDM з однієї матриці рішень та їх узгодженість
+
+        Args:
+            alternatives: Словник альтернатив як для optimize()
+            methods: Назви методів з MCDM_METHODS (за замовчуванням - усі)
+
+        Returns:
+            {'methods': {метод: результати у форматі optimize()}, 'agreement': узгодженість рейтингів}
+
+        Raises:
+            ValueError: Якщо метод невідомий
+        """
+        names = list(methods or MCDM_METHODS)
+        unknown = [name for name in names if name not in MCDM_METHODS]
+        if unknown:
+            raise ValueError(f"Невідомі методи: {', '.join(unknown)}. Доступні: {', '.join(MCDM_METHODS)}")
+
+        decision = self.decision_matrix(alternatives)
+        results = {}
+        scores = {}
+        for name in names:
+            method = MCDM_METHODS[name]
+            weights = method.method_weights(decision, self.weights)
+            scores[name] = method.score(self, decision, weights)
+            results[name] = self.format_results(
+                alternatives, decision.alt_names, scores[name], method=name,
+                criteria_weights=dict(zip(self.criteria_names, map(float, weights))))
+
+        return {'methods': results, 'agreement': self._method_agreement(decision.alt_names, scores)}
+
+    def _method_agreement(self, alt_names: List[str], scores: Dict[str, np.ndarray]) -> Dict:
+        """Узгодженість рейтингів: τ Кендалла для пар методів і консенсус за середнім рангом"""
+        names = list(scores)
+        ranks = np.array([np.argsort(np.argsort(-scores[name], kind='stable'), kind='stable') + 1
+                          for name in names])
+        mean_ranks = ranks.mean(axis=0)
+        consensus = alt_names[int(np.argmin(mean_ranks))] if alt_names else None
+        best = {name: alt_names[int(np.argmin(ranks[i]))] for i, name in enumerate(names)} if alt_names else {}
+
+        # τ-a Кендалла: частка узгоджених пар альтернатив мінус частка неузгоджених
+        n = len(alt_names)
+        order_signs = np.sign(ranks[:, :, None] - ranks[:, None, :])
+        kendall_tau = {}
+        for i in range(len(names)):
+            for j in range(i + 1, len(names)):
+                tau = (order_signs[i] * order_signs[j]).sum() / (n * (n - 1)) if n > 1 else 1.0
+                kendall_tau[f"{names[i]}/{names[j]}"] = float(tau)
+
         return {
-            'method': 'TOPSIS',
-            'criteria_weights': self.criteria_weights,
-            'results': results,
-            'best_alternative': results[0]['alternative']
+            'best_alternatives': best,
+            'consensus_winner': consensus,
+            'winner_agreement': float(np.mean([winner == consensus for winner in best.values()])) if best else 0.0,
+            'unanimous': len(set(best.values())) <= 1,
+            'mean_ranks': {alt: float(rank) for alt, rank in zip(alt_names, mean_ranks)},
+            'kendall_tau': kendall_tau,
+            'min_kendall_tau': min(kendall_tau.values()) if kendall_tau else 1.0,
         }
-    
+
+    def print_agreement(self, comparison: Dict):
+        """Виводить рейтинги різних методів та їх узгодженість"""
+        agreement = comparison['agreement']
+        print("\n" + "=" * 70)
+        print("ПОРІВНЯННЯ МЕТОДІВ MCDM")
+        print("=" * 70)
+
+        for name, results in comparison['methods'].items():
+            ranking = ' > '.join(result['alternative'] for result in results['results'])
+            print(f"  {name:<16} {ranking}")
+
+        print(f"\nКонсенсус (середній ранг): {agreement['consensus_winner']}, "
+              f"згода методів щодо переможця: {agreement['winner_agreement']:.0%}")
+        print(f"Мінімальний τ Кендалла між методами: {agreement['min_kendall_tau']:.2f}")
+        if agreement['unanimous']:
+            print("✅ Усі методи обирають один варіант")
+        else:
+            print("⚠️  Методи не погоджуються щодо переможця - рішення залежить від методу")
+
+    def sensitivity(self, alternatives: Dict[str, Dict[str, float]], draws: int = 20000,
+                    concentration: Optional[float] = None, seed: Optional[int] = None,
+                    workers: int = 1, chunk_size: int = 10000, sweep_points: int = 1001) -> Dict:
+        """
+        Чутливість рейтингу до ваг критеріїв
+
+        Монте-Карло: вектори ваг рівномірно з симплексу (або з розподілу Діріхле
+        навколо поточних ваг, якщо задано concentration), оцінки всіх векторів -
+        пакетами через score_tensor. Для кожної альтернативи - ймовірність бути #1,
+        середній ранг і область ваг, де вона перемагає. Окремо - розгортка кожного
+        критерію від 0 до 1 (решта ваг у поточних пропорціях) з вагами, на яких
+        змінюється переможець.
+
+        Args:
+            alternatives: Словник альтернатив як для optimize()
+            draws: Кількість векторів ваг
+            concentration: None - рівномірно по симплексу; k - Діріхле з параметрами k * ваги
+                (більше k - ближче до поточних ваг)
+            seed: Зерно генератора (відтворюваність звіту)
+            workers: Процесів для оцінювання (1 - у поточному процесі)
+            chunk_size: Векторів ваг в одному пакеті (обмежує пам'ять)
+            sweep_points: Точок розгортки на критерій
+
+        Returns:
+            Результати аналізу чутливості
+        """
+        matrix, alt_names = self.build_matrix(alternatives)
+        rng = np.random.default_rng(seed)
+        alpha = np.ones(len(self.criteria_names)) if concentration is None else concentration * self.weights
+        weights = rng.dirichlet(alpha, size=draws)
+
+        chunks = [weights[start:start + chunk_size] for start in range(0, draws, chunk_size)]
+        args = (self.criteria_weights, self.benefit_criteria, matrix)
+        if workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                partial = list(pool.map(_rank_statistics, *zip(*[args + (chunk,) for chunk in chunks])))
+        else:
+            partial = [_rank_statistics(*args, chunk) for chunk in chunks]
+
+        winners = np.concatenate([winner for winner, _ in partial])
+        rank_sums = np.sum([ranks for _, ranks in partial], axis=0)
+        wins = np.bincount(winners, minlength=len(alt_names))
+
+        report = {}
+        for index, name in enumerate(alt_names):
+            won = weights[winners == index]
+            report[name] = {
+                'p_rank_1': float(wins[index] / draws),
+                'mean_rank': float(rank_sums[index] / draws),
+                # Область симплексу ваг, де альтернатива - переможець
+                'win_region': {
+                    criterion: {
+                        'min': float(won[:, j].min()),
+                        'mean': float(won[:, j].mean()),
+                        'max': float(won[:, j].max()),
+                    } for j, criterion in enumerate(self.criteria_names)
+                } if len(won) else None
+            }
+
+        baseline = alt_names[int(np.argmax(self.score_tensor(matrix)))]
+        return {
+            'draws': draws,
+            'distribution': 'uniform' if concentration is None else f"dirichlet(k={concentration})",
+            'baseline_winner': baseline,
+            'most_probable_winner': alt_names[int(np.argmax(wins))],
+            'alternatives': report,
+            'flip_points': self._weight_sweep(matrix, alt_names, sweep_points),
+        }
+
+    def _weight_sweep(self, matrix: np.ndarray, alt_names: List[str], points: int) -> List[Dict]:
+        """Ваги критерію, на яких змінюється переможець (решта ваг - у поточних пропорціях)"""
+        grid = np.linspace(0.0, 1.0, points)
+        flips = []
+        for j, criterion in enumerate(self.criteria_names):
+            rest = self.weights.copy()
+            rest[j] = 0.0
+            rest_total = rest.sum()
+            # Рядок k: вага критерію grid[k], решта масштабована до 1 - grid[k]
+            weights = (rest / rest_total if rest_total > 0 else rest)[None, :] * (1 - grid)[:, None]
+            weights[:, j] = grid
+            winners = np.argmax(self.score_tensor(matrix, weights), axis=1)
+            for k in np.flatnonzero(winners[1:] != winners[:-1]):
+                flips.append({
+                    'criterion': criterion,
+                    'weight': float((grid[k] + grid[k + 1]) / 2),
+                    'current_weight': float(self.weights[j]),
+                    'from': alt_names[winners[k]],
+                    'to': alt_names[winners[k + 1]],
+                })
+        return flips
+
+    def print_sensitivity(self, sensitivity: Dict):
+        """Виводить результати аналізу чутливості"""
+        print("\n" + "=" * 70)
+        print(f"ЧУТЛИВІСТЬ ДО ВАГ ({sensitivity['draws']} векторів ваг, {sensitivity['distribution']})")
+        print("=" * 70)
+
+        ranked = sorted(sensitivity['alternatives'].items(), key=lambda item: -item[1]['p_rank_1'])
+        for name, stats in ranked:
+            print(f"  {name}: P(#1) = {stats['p_rank_1']:.1%}, середній ранг {stats['mean_rank']:.2f}")
+
+        print("\nЗміна переможця при зміні однієї ваги (решта - у поточних пропорціях):")
+        if not sensitivity['flip_points']:
+            print("  Переможець не змінюється - рейтинг стійкий")
+        for flip in sensitivity['flip_points']:
+            print(f"  {flip['criterion']} (зараз {flip['current_weight']:.2f}) ≈ {flip['weight']:.3f}: "
+                  f"{flip['from']} → {flip['to']}")
+
     def print_results(self, optimization_results: Dict):
         """Виводить результати оптимізації"""
         print("\n" + "=" * 70)
@@ -226,6 +639,16 @@ def example_usage():
     
     # Вивід результатів
     optimizer.print_results(results)
+
+    # Наскільки рейтинг стійкий до вибору ваг
+    results['sensitivity'] = optimizer.sensitivity(alternatives, seed=42)
+    optimizer.print_sensitivity(results['sensitivity'])
+
+    # Той самий рейтинг іншими методами MCDM
+    comparison = optimizer.compare_methods(alternatives)
+    results['methods'] = comparison['methods']
+    results['agreement'] = comparison['agreement']
+    optimizer.print_agreement(comparison)
     
     # Збереження результатів
     with open('optimization_results.json', 'w', encoding='utf-8') as f:
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Request Mix
+Зважена суміш запитів (шлях, метод, тіло) та відтворення access-логу для request_simulator
+"""
+
+import calendar
+import json
+import random
+import re
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# ${int:1-5000}, ${choice:a|b|c}
+PLACEHOLDER_PATTERN = re.compile(r'\$\{(\w+)(?::([^}]*))?\}')
+MONTHS = {name: index for index, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+
+class AccessLogParser:
+    """
+    Розбір рядків access-логу nginx (common/combined формат)
+
+    '1.2.3.4 - - [10/Oct/2026:13:55:36 +0000] "GET /path HTTP/1.1" 200 612 ...'
+
+    Замість регулярного виразу і strptime - пошук роздільників і розбір
+    часу за фіксованими позиціями; рядки логу йдуть за часом, тож час
+    останнього рядка кешується і для більшості рядків не перераховується.
+    """
+
+    def __init__(self):
+        self._last_time = None
+        self._last_timestamp = None
+
+    def parse(self, line: str) -> Optional[Tuple[float, str, str]]:
+        """(unix час, метод, шлях) або None, якщо рядок не розпізнано"""
+        time_start = line.find('[')
+        time_end = line.find(']', time_start)
+        request_start = line.find('"', time_end)
+        request_end = line.find('"', request_start + 1)
+        if time_start < 0 or time_end < 0 or request_start < 0 or request_end < 0:
+            return None
+
+        request = line[request_start + 1:request_end].split(' ', 2)
+        if len(request) < 2 or not request[1].startswith('/'):
+            return None
+
+        timestamp = self.parse_time(line[time_start + 1:time_end])
+        if timestamp is None:
+            return None
+        return timestamp, request[0], request[1]
+
+    def parse_time(self, value: str) -> Optional[float]:
+        """'10/Oct/2026:13:55:36 +0000' → unix час"""
+        if value == self._last_time:
+            return self._last_timestamp
+        try:
+            seconds = calendar.timegm((int(value[7:11]), MONTHS[value[3:6]], int(value[0:2]),
+                                       int(value[12:14]), int(value[15:17]), int(value[18:20])))
+            zone = value[21:26]
+            if zone:
+                offset = int(zone[1:3]) * 3600 + int(zone[3:5]) * 60
+                seconds -= offset if zone[0] == '+' else -offset
+        except (KeyError, ValueError, IndexError):
+            return None
+
+        self._last_time = value
+        self._last_timestamp = seconds
+        return seconds
+
+
+class Template:
+    """
+    Шаблон рядка з підстановками, скомпільований один раз
+
+    Підтримуються ${int:LOW-HIGH} - випадкове ціле з діапазону
+    та ${choice:a|b|c} - випадковий варіант. Рядок без підстановок
+    повертається як є, без жодної роботи на кожен запит.
+    """
+    KINDS = ('int', 'choice')
+
+    def __init__(self, source: str):
+        """
+        Raises:
+            ValueError: Якщо підстановка невалідна
+        """
+        self.source = source
+        self.parts = []  # Літерали (str) та підстановки (kind, параметри)
+
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            if match.start() > position:
+                self.parts.append(source[position:match.start()])
+            self.parts.append(self._compile_placeholder(match.group(1), match.group(2) or ''))
+            position = match.end()
+        if position < len(source):
+            self.parts.append(source[position:])
+
+        self.static = all(isinstance(part, str) for part in self.parts)
+
+    def _compile_placeholder(self, kind: str, params: str) -> tuple:
+        if kind == 'int':
+            low, sep, high = params.partition('-')
+            try:
+                low, high = int(low), int(high)
+            except ValueError:
+                sep = ''
+            if not sep or low > high:
+                raise ValueError(f"Очікується ${{int:LOW-HIGH}}: {params}")
+            return kind, (low, high)
+        if kind == 'choice':
+            options = params.split('|')
+            if not params:
+                raise ValueError("${choice:...} потребує хоча б один варіант")
+            return kind, options
+        raise ValueError(f"Невідома підстановка: {kind}. Доступні: {', '.join(self.KINDS)}")
+
+    def render(self, rng: random.Random) -> str:
+        """Рядок з підставленими значеннями"""
+        if self.static:
+            return self.source
+
+        values = []
+        for part in self.parts:
+            if isinstance(part, str):
+                values.append(part)
+            elif part[0] == 'int':
+                values.append(str(rng.randint(*part[1])))
+            else:
+                values.append(rng.choice(part[1]))
+        return ''.join(values)
+
+
+class Endpoint:
+    """Один тип запиту суміші"""
+
+    def __init__(self, path: str, weight: float = 1.0, method: str = 'GET', name: Optional[str] = None,
+                 body: Optional[str] = None, headers: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            path: Шлях відносно target_url ('/api/items/${int:1-100}') або повний URL
+            weight: Відносна частка запитів
+            method: HTTP метод
+            name: Назва для статистики (за замовчуванням 'METHOD path')
+            body: Шаблон тіла запиту
+            headers: Додаткові заголовки
+
+        Raises:
+            ValueError: Якщо параметри невалідні
+        """
+        if weight <= 0:
+            raise ValueError(f"Вага має бути додатною: {path}")
+        self.absolute = path.startswith(('http://', 'https://'))
+        if not self.absolute and not path.startswith('/'):
+            raise ValueError(f"Шлях має починатися з '/' або бути повним URL: {path}")
+
+        self.path = Template(path)
+        self.weight = weight
+        self.method = method.upper()
+        self.name = name or f"{self.method} {path}"
+        self.body = Template(body) if body is not None else None
+        self.headers = headers or None
+
+    def describe(self) -> Dict:
+        """Опис для test_results.json"""
+        return {
+            'name': self.name,
+            'method': self.method,
+            'path': self.path.source,
+            'weight': self.weight,
+            'body': self.body.source if self.body else None,
+        }
+
+
+class RequestMix:
+    """
+    Зважена суміш запитів
+
+    Ваги компілюються в таблицю псевдонімів (alias method Уокера/Воуза),
+    тож вибір ендпоінта - O(1) з одним випадковим числом незалежно від
+    кількості ендпоінтів.
+    """
+
+    def __init__(self, endpoints: List[Endpoint], seed: Optional[int] = None):
+        """
+        Raises:
+            ValueError: Якщо суміш порожня або назви ендпоінтів повторюються
+        """
+        if not endpoints:
+            raise ValueError("Суміш запитів має містити хоча б один ендпоінт")
+        names = [endpoint.name for endpoint in endpoints]
+        if len(set(names)) != len(names):
+            raise ValueError("Назви ендпоінтів у суміші мають бути унікальними")
+
+        self.endpoints = endpoints
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._probability, self._alias = self._build_alias_table([endpoint.weight for endpoint in endpoints])
+
+    @staticmethod
+    def _build_alias_table(weights: List[float]) -> Tuple[List[float], List[int]]:
+        """Таблиця псевдонімів: комірка i обирає i з імовірністю probability[i], інакше alias[i]"""
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+        probability = [1.0] * count
+        alias = list(range(count))
+
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            probability[less] = scaled[less]
+            alias[less] = more
+            # Надлишок більшої комірки заповнює нестачу меншої
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Залишки (через похибку float) мають імовірність 1
+
+        return probability, alias
+
+    def forked(self, worker_id: int) -> 'RequestMix':
+        """
+        Та сама суміш з власним генератором для воркера
+
+        Копія, передана у процес як є, мала б той самий стан генератора, і всі
+        воркери обирали б ті самі ендпоінти та значення шаблонів синхронно.
+        З seed воркер отримує seed + worker_id (відтворювано), без seed - випадковий.
+        """
+        mix = RequestMix.__new__(RequestMix)
+        mix.__dict__.update(self.__dict__)
+        mix._random = random.Random(self.seed + worker_id if self.seed is not None else None)
+        return mix
+
+    def sample(self) -> Endpoint:
+        """Випадковий ендпоінт відповідно до ваг"""
+        position = self._random.random() * len(self.endpoints)
+        index = int(position)
+        if position - index >= self._probability[index]:
+            index = self._alias[index]
+        return self.endpoints[index]
+
+    def render(self, endpoint: Endpoint) -> Tuple[str, Optional[str]]:
+        """Шлях і тіло запиту з підставленими значеннями"""
+        body = endpoint.body.render(self._random) if endpoint.body else None
+        return endpoint.path.render(self._random), body
+
+    def describe(self) -> List[Dict]:
+        """Опис суміші для test_results.json (з нормалізованими частками)"""
+        total = sum(endpoint.weight for endpoint in self.endpoints)
+        return [{**endpoint.describe(), 'share': endpoint.weight / total} for endpoint in self.endpoints]
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RequestMix':
+        """
+        Суміш з опису {"endpoints": [{"path": ..., "weight": ..., "method": ..., "body": ...}, ...]}
+
+        Raises:
+            ValueError: Якщо опис невалідний
+        """
+        endpoints = data.get('endpoints') if isinstance(data, dict) else None
+        if not isinstance(endpoints, list):
+            raise ValueError("Опис суміші має містити список 'endpoints'")
+
+        allowed = ('path', 'weight', 'method', 'name', 'body', 'headers')
+        compiled = []
+        for spec in endpoints:
+            unknown = [key for key in spec if key not in allowed]
+            if 'path' not in spec or unknown:
+                raise ValueError(f"Ендпоінт приймає поля {', '.join(allowed)} (обов'язкове - path, "
+                                 f"зайві: {unknown})")
+            compiled.append(Endpoint(**spec))
+        return cls(compiled, data.get('seed'))
+
+    @classmethod
+    def from_file(cls, filename: str) -> 'RequestMix':
+        """Суміш з JSON файлу (див. from_dict)"""
+        with open(filename) as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def from_access_log(cls, filename: str, top: int = 50) -> 'RequestMix':
+        """
+        Суміш з access-логу nginx (common/combined формат)
+
+        Вага кожного (метод, шлях) - кількість його запитів у лозі; лишаються
+        top найчастіших. Лог читається потоково, в пам'яті - лише лічильники.
+
+        Raises:
+            ValueError: Якщо в лозі немає жодного розпізнаного запиту
+        """
+        counts = Counter()
+        parser = AccessLogParser()
+        with open(filename, errors='replace') as f:
+            for line in f:
+                record = parser.parse(line)
+                if record:
+                    counts[record[1:]] += 1
+
+        if not counts:
+            raise ValueError(f"У {filename} немає запитів у форматі nginx access log")
+
+        endpoints = [
+            # Шлях з логу - літерал, '${' у ньому не має означати підстановку
+            Endpoint(path.replace('${', '$%7B'), count, method)
+            for (method, path), count in counts.most_common(top)
+        ]
+        return cls(endpoints)
+
+
+class AccessLogReplay:
+    """
+    Відтворення access-логу з початковими відносними інтервалами
+
+    Лог читається потоково. Час у лозі має точність до секунди, тож запити
+    однієї секунди рівномірно розподіляються всередині неї; в пам'яті -
+    лише рядки поточної секунди. Воркери ділять лог за номером рядка
+    (shard із shards), але відлік усі ведуть від першого запису логу.
+    """
+
+    def __init__(self, filename: str, speed: float = 1.0, shard: int = 0, shards: int = 1):
+        """
+        Args:
+            filename: Access-лог nginx (common/combined формат)
+            speed: Коефіцієнт прискорення (60 - година логу за хвилину)
+            shard: Номер частини логу для цього воркера
+            shards: Загальна кількість частин
+
+        Raises:
+            ValueError: Якщо параметри невалідні
+        """
+        if speed <= 0:
+            raise ValueError("Коефіцієнт прискорення має бути додатним")
+        if not 0 <= shard < shards:
+            raise ValueError("Має виконуватись 0 <= shard < shards")
+
+        self.filename = filename
+        self.speed = speed
+        self.shard = shard
+        self.shards = shards
+
+    def sharded(self, shard: int, shards: int) -> 'AccessLogReplay':
+        """Та сама частина логу для воркера shard із shards"""
+        return AccessLogReplay(self.filename, self.speed, shard, shards)
+
+    def requests(self, duration: float) -> Iterator[Tuple[float, str, str]]:
+        """
+        Генерує (секунди від початку відтворення, метод, шлях) в межах [0, duration)
+        """
+        parser = AccessLogParser()
+        origin = None
+        second = None
+        pending = []  # (метод, шлях) запитів поточної секунди логу
+
+        with open(self.filename, errors='replace') as f:
+            for index, line in enumerate(f):
+                # Спільний початок відліку для всіх воркерів - перший розпізнаний рядок логу
+                if origin is not None and index % self.shards != self.shard:
+                    continue
+                record = parser.parse(line)
+                if record is None:
+                    continue
+                timestamp, method, path = record
+                if origin is None:
+                    origin = timestamp
+                    if index % self.shards != self.shard:
+                        continue
+
+                # Рядки пишуться в момент завершення запиту, тож порядок може трохи порушуватись
+                if second is not None and timestamp <= second:
+                    pending.append((method, path))
+                    continue
+
+                if pending:
+                    for request in self._spread(second - origin, pending):
+                        if request[0] >= duration:
+                            return
+                        yield request
+                second = timestamp
+                pending = [(method, path)]
+
+        for request in self._spread(second - origin, pending) if pending else ():
+            if request[0] >= duration:
+                return
+            yield request
+
+    def _spread(self, log_offset: float, pending: List[Tuple[str, str]]) -> Iterator[Tuple[float, str, str]]:
+        """Рівномірно розподіляє запити однієї секунди логу"""
+        step = 1.0 / len(pending)
+        for position, (method, path) in enumerate(pending):
+            yield (log_offset + position * step) / self.speed, method, path
+
+    def peak_rps(self) -> float:
+        """Пікова інтенсивність відтворення: найбільша кількість запитів за секунду логу × speed"""
+        parser = AccessLogParser()
+        counts = Counter()
+        with open(self.filename, errors='replace') as f:
+            for line in f:
+                record = parser.parse(line)
+                if record:
+                    counts[record[0]] += 1
+        return max(counts.values(), default=0) * self.speed
+
+    def describe(self) -> Dict:
+        """Опис для test_results.json"""
+        return {'log': self.filename, 'speed': self.speed}
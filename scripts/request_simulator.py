@@ -6,14 +6,27 @@ HTTP Request Simulator
 
 import asyncio
 import aiohttp
+import argparse
+import errno
+import heapq
+import math
+import multiprocessing
+import os
+import random
 import time
 import json
 import sys
 import logging
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse
 
+from latency_histogram import LatencyHistogram
+from load_profiles import ConstantProfile, LoadProfile, parse_profile
+from request_mix import AccessLogReplay, Endpoint, RequestMix
+
 # Налаштування логування
 logging.basicConfig(
     level=logging.INFO,
@@ -21,11 +34,456 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+class ArrivalScheduler:
+    """
+    Розклад відправки запитів для open-loop навантаження
+
+    Генерує заплановані моменти відправки (секунди від початку тесту)
+    незалежно від того, скільки запитів ще очікують на відповідь.
+    Інтенсивність задається профілем і може змінюватись у часі.
+    """
+    DISTRIBUTIONS = ('uniform', 'poisson')
+    MIN_RATE = 0.01  # Нижче цього профіль вважається паузою
+    IDLE_STEP = 0.01  # Крок пропуску паузи (секунди)
+    MAX_STEP = 0.1  # Найдовший крок інтегрування інтенсивності (секунди)
+
+    def __init__(self, profile: LoadProfile, distribution: str = 'uniform', seed: Optional[int] = None):
+        """
+        Args:
+            profile: Профіль інтенсивності (запитів/сек від часу)
+            distribution: 'uniform' - рівні інтервали, 'poisson' - експоненційні інтервали
+            seed: Seed генератора для відтворюваного розкладу
+
+        Raises:
+            ValueError: Якщо параметри невалідні
+        """
+        if profile.peak() <= 0:
+            raise ValueError("Інтенсивність має бути додатною")
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Невідомий розподіл: {distribution}. Доступні: {', '.join(self.DISTRIBUTIONS)}")
+
+        self.profile = profile
+        self.distribution = distribution
+        self._random = random.Random(seed)
+
+    def offsets(self, duration: float) -> Iterator[float]:
+        """Генерує заплановані моменти відправки в межах [0, duration)"""
+        if self.distribution == 'uniform':
+            yield from self._uniform_offsets(duration)
+        else:
+            yield from self._poisson_offsets(duration)
+
+    def _uniform_offsets(self, duration: float) -> Iterator[float]:
+        """
+        Рівні інтервали 1 / rate(t)
+
+        Запит k відправляється, коли інтеграл інтенсивності досягає k. Інтеграл
+        накопичується кроками не довшими за MAX_STEP, тож при низькій початковій
+        інтенсивності (ramp від 0) інтервал не розтягується на 1 / MIN_RATE
+        секунд і не перескакує початок профілю.
+        """
+        if isinstance(self.profile, ConstantProfile):
+            # Множення замість накопичення - без дрейфу похибки float
+            count = math.ceil(duration * self.profile.rps)
+            for index in range(count):
+                yield index / self.profile.rps
+            return
+
+        offset = 0.0
+        accumulated = 1.0  # Накопичена частка наступного запиту; перший - одразу
+        while offset < duration:
+            rate = self.profile.rate(offset)
+            if rate < self.MIN_RATE:
+                offset += self.IDLE_STEP
+                continue
+            if accumulated >= 1.0:
+                yield offset
+                accumulated -= 1.0
+                continue
+            step = (1.0 - accumulated) / rate
+            if step <= self.MAX_STEP:
+                offset += step
+                accumulated = 1.0
+            else:
+                # Інтенсивність у середині кроку - точніше для профілю, що змінюється
+                accumulated += self.profile.rate(offset + self.MAX_STEP / 2) * self.MAX_STEP
+                offset += self.MAX_STEP
+
+    def _poisson_offsets(self, duration: float) -> Iterator[float]:
+        """Неоднорідний пуассонівський потік (метод проріджування Льюїса-Шедлера)"""
+        peak = self.profile.peak()
+        offset = self._random.expovariate(peak)
+        while offset < duration:
+            # Кандидат з потоку пікової інтенсивності приймається з імовірністю rate(t) / peak
+            if self._random.random() * peak < self.profile.rate(offset):
+                yield offset
+            offset += self._random.expovariate(peak)
+
+
+class ErrorStats:
+    """
+    Обмежений лічильник помилок за класами
+
+    Замість рядка на кожну невдалу спробу зберігає для кожного класу помилки
+    кількість, перший/останній момент появи та невелику вибірку повідомлень
+    (reservoir sampling), тож пам'ять не росте разом з кількістю помилок.
+    """
+    MAX_CLASSES = 50  # Решта класів потрапляє в 'other'
+    MAX_SAMPLES = 5  # Прикладів повідомлень на клас
+    MAX_MESSAGE_LENGTH = 200
+
+    def __init__(self, seed: Optional[int] = None):
+        self.classes = {}
+        self._random = random.Random(seed)
+
+    def record(self, error_class: str, message: str = '', timestamp: Optional[float] = None):
+        """Враховує одну помилку"""
+        if error_class not in self.classes and len(self.classes) >= self.MAX_CLASSES:
+            error_class = 'other'
+
+        timestamp = timestamp if timestamp is not None else time.time()
+        entry = self.classes.get(error_class)
+        if entry is None:
+            entry = self.classes[error_class] = {
+                'count': 0, 'first_seen': timestamp, 'last_seen': timestamp, 'samples': []
+            }
+
+        entry['count'] += 1
+        entry['last_seen'] = timestamp
+
+        message = message[:self.MAX_MESSAGE_LENGTH]
+        samples = entry['samples']
+        if len(samples) < self.MAX_SAMPLES:
+            samples.append(message)
+        else:
+            # Reservoir sampling: кожне повідомлення потрапляє у вибірку з імовірністю MAX_SAMPLES / count
+            index = self._random.randrange(entry['count'])
+            if index < self.MAX_SAMPLES:
+                samples[index] = message
+
+    def merge(self, other: 'ErrorStats'):
+        """Додає статистику іншого лічильника (наприклад, іншого воркера)"""
+        for error_class, other_entry in other.classes.items():
+            if error_class not in self.classes and len(self.classes) >= self.MAX_CLASSES:
+                error_class = 'other'
+
+            entry = self.classes.get(error_class)
+            if entry is None:
+                self.classes[error_class] = {**other_entry, 'samples': list(other_entry['samples'])}
+                continue
+
+            entry['count'] += other_entry['count']
+            entry['first_seen'] = min(entry['first_seen'], other_entry['first_seen'])
+            entry['last_seen'] = max(entry['last_seen'], other_entry['last_seen'])
+            samples = entry['samples'] + other_entry['samples']
+            entry['samples'] = self._random.sample(samples, min(len(samples), self.MAX_SAMPLES))
+
+    @property
+    def total(self) -> int:
+        """Загальна кількість помилок"""
+        return sum(entry['count'] for entry in self.classes.values())
+
+    def most_common(self) -> List:
+        """Класи помилок, відсортовані за кількістю: [(клас, запис), ...]"""
+        return sorted(self.classes.items(), key=lambda item: item[1]['count'], reverse=True)
+
+    def to_dict(self) -> Dict:
+        """Серіалізація для JSON (моменти появи - в ISO форматі)"""
+        return {
+            error_class: {
+                'count': entry['count'],
+                'first_seen': datetime.fromtimestamp(entry['first_seen']).isoformat(),
+                'last_seen': datetime.fromtimestamp(entry['last_seen']).isoformat(),
+                'samples': entry['samples'],
+            }
+            for error_class, entry in self.most_common()
+        }
+
+
+class TimeSeriesWriter:
+    """
+    Посекундний часовий ряд навантаження у форматі NDJSON
+
+    Вікно - секунда за часом завершення запиту. Кожне вікно накопичує лічильники
+    та невелику гістограму затримок і дописується у файл, щойно закривається,
+    тож пам'ять не залежить від тривалості тесту.
+    """
+    PRECISION = 0.05  # Точність гістограм вікон - грубіша за загальну, щоб рядки були компактними
+
+    def __init__(self, filename: str, lateness: int = 12):
+        """
+        Args:
+            filename: Файл часового ряду (NDJSON, рядок на секунду)
+            lateness: Скільки секунд вікно лишається відкритим для запізнілих результатів
+                (у batch режимі результати пачки обробляються після найповільнішого запиту)
+        """
+        self.filename = filename
+        self.lateness = lateness
+        self._windows = {}
+        self._watermark = None  # Вікна до цієї секунди вже записані
+        self._file = open(filename, 'w')
+
+    def record(self, timestamp: float, success: bool, response_time: float):
+        """Враховує завершений запит"""
+        second = int(timestamp)
+        if self._watermark is not None and second < self._watermark:
+            # Вікно вже записане - враховуємо в найстарішому відкритому
+            second = self._watermark
+
+        window = self._windows.get(second)
+        if window is None:
+            window = self._windows[second] = {
+                'successful': 0, 'failed': 0, 'histogram': LatencyHistogram(self.PRECISION)
+            }
+            self._flush_before(second - self.lateness)
+
+        if success:
+            window['successful'] += 1
+            window['histogram'].record(response_time)
+        else:
+            window['failed'] += 1
+
+    def _flush_before(self, second: int):
+        """Записує у файл усі вікна, старші за second"""
+        for closed in sorted(key for key in self._windows if key < second):
+            window = self._windows.pop(closed)
+            self._write(self.window_record(closed, window['successful'], window['failed'], window['histogram']))
+        if self._watermark is None or second > self._watermark:
+            self._watermark = second
+
+    def _write(self, record: Dict):
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+
+    def close(self):
+        """Записує решту вікон і закриває файл"""
+        self._flush_before(math.inf)
+        self._file.close()
+
+    @staticmethod
+    def window_record(second: int, successful: int, failed: int, histogram: LatencyHistogram) -> Dict:
+        """Рядок часового ряду для одного вікна"""
+        return {
+            'timestamp': datetime.fromtimestamp(second).isoformat(),
+            'epoch': second,
+            'rps': successful + failed,
+            'successful': successful,
+            'failed': failed,
+            'latency': {
+                'avg': histogram.mean,
+                'max': histogram.max,
+                **histogram.percentiles((50, 90, 99)),
+            },
+            'histogram': histogram.to_dict()
+        }
+
+    @classmethod
+    def merge_files(cls, sources: List[str], destination: str):
+        """
+        Об'єднує часові ряди воркерів в один файл
+
+        Файли вже відсортовані за секундою, тож злиття потокове: в пам'яті
+        лише поточний рядок кожного файлу.
+        """
+        files = [open(source) for source in sources]
+        try:
+            streams = [map(json.loads, f) for f in files]
+            merged = heapq.merge(*streams, key=lambda record: record['epoch'])
+
+            with open(destination, 'w') as out:
+                current = None
+                for record in merged:
+                    if current is not None and record['epoch'] == current['second']:
+                        current['successful'] += record['successful']
+                        current['failed'] += record['failed']
+                        current['histogram'].merge(LatencyHistogram.from_dict(record['histogram']))
+                        continue
+                    if current is not None:
+                        out.write(json.dumps(cls.window_record(**current), separators=(',', ':')) + '\n')
+                    current = {
+                        'second': record['epoch'],
+                        'successful': record['successful'],
+                        'failed': record['failed'],
+                        'histogram': LatencyHistogram.from_dict(record['histogram'])
+                    }
+                if current is not None:
+                    out.write(json.dumps(cls.window_record(**current), separators=(',', ':')) + '\n')
+        finally:
+            for f in files:
+                f.close()
+
+
+def classify_client_error(error: aiohttp.ClientError) -> str:
+    """Клас помилки aiohttp для ErrorStats"""
+    if isinstance(error, aiohttp.ClientConnectorError):
+        if error.os_error.errno == errno.ECONNREFUSED:
+            return 'connection_refused'
+        return 'connection_error'
+    if isinstance(error, aiohttp.ServerDisconnectedError):
+        return 'server_disconnected'
+    if isinstance(error, aiohttp.ClientPayloadError):
+        return 'payload_error'
+    if isinstance(error, aiohttp.ClientOSError):
+        if error.errno == errno.ECONNRESET:
+            return 'connection_reset'
+        return 'connection_error'
+    return 'client_error'
+
+
+class ConnectionConfig:
+    """
+    Стратегія з'єднань клієнта
+
+    'pool' - пул keep-alive з'єднань розміром pool_size (на процес),
+    'new' - нове TCP з'єднання на кожен запит (вимірює вартість handshake).
+    """
+    STRATEGIES = ('pool', 'new')
+
+    def __init__(self, strategy: str = 'pool', pool_size: int = 500, keepalive_timeout: float = 15.0,
+                 dns_cache_ttl: float = 10):
+        """
+        Args:
+            strategy: 'pool' або 'new'
+            pool_size: Максимум одночасних з'єднань на процес
+            keepalive_timeout: Скільки секунд тримати невикористане з'єднання в пулі
+            dns_cache_ttl: Час життя DNS кешу (секунди), 0 - без кешу
+
+        Raises:
+            ValueError: Якщо параметри невалідні
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Невідома стратегія з'єднань: {strategy}. Доступні: {', '.join(self.STRATEGIES)}")
+        if pool_size <= 0:
+            raise ValueError("Розмір пулу має бути додатним")
+        if keepalive_timeout < 0 or dns_cache_ttl < 0:
+            raise ValueError("Таймаути не можуть бути від'ємними")
+
+        self.strategy = strategy
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+
+    def create_connector(self) -> aiohttp.TCPConnector:
+        """TCPConnector відповідно до стратегії (створюється всередині event loop)"""
+        force_close = self.strategy == 'new'
+        return aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size,
+            force_close=force_close,
+            # aiohttp не дозволяє keepalive_timeout разом з force_close
+            keepalive_timeout=None if force_close else self.keepalive_timeout,
+            use_dns_cache=self.dns_cache_ttl > 0,
+            ttl_dns_cache=self.dns_cache_ttl or None,
+        )
+
+    def describe(self) -> Dict:
+        """Опис для test_results.json"""
+        return dict(vars(self))
+
+
+class ConnectionStats:
+    """
+    Статистика з'єднань через aiohttp TraceConfig
+
+    Показує, чи затримка виникає на цілі, чи на клієнті: скільки з'єднань створено
+    і перевикористано, скільки запитів чекали на вільне з'єднання в пулі,
+    і скільки коштує встановлення з'єднання.
+    """
+
+    def __init__(self, latency_precision: float = 0.01):
+        self.created = 0
+        self.reused = 0
+        self.pool_waits = 0
+        self.pool_wait_time = 0.0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        self.connect_time = LatencyHistogram(latency_precision)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """TraceConfig для ClientSession, що оновлює цю статистику"""
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_start.append(self._on_create_start)
+        trace.on_connection_create_end.append(self._on_create_end)
+        trace.on_connection_reuseconn.append(self._on_reuse)
+        trace.on_connection_queued_start.append(self._on_queued_start)
+        trace.on_connection_queued_end.append(self._on_queued_end)
+        trace.on_dns_cache_hit.append(self._on_dns_hit)
+        trace.on_dns_cache_miss.append(self._on_dns_miss)
+        return trace
+
+    async def _on_create_start(self, session, context, params):
+        context.connect_start = time.perf_counter()
+
+    async def _on_create_end(self, session, context, params):
+        self.created += 1
+        self.connect_time.record(time.perf_counter() - context.connect_start)
+
+    async def _on_reuse(self, session, context, params):
+        self.reused += 1
+
+    async def _on_queued_start(self, session, context, params):
+        context.queued_start = time.perf_counter()
+
+    async def _on_queued_end(self, session, context, params):
+        self.pool_waits += 1
+        self.pool_wait_time += time.perf_counter() - context.queued_start
+
+    async def _on_dns_hit(self, session, context, params):
+        self.dns_cache_hits += 1
+
+    async def _on_dns_miss(self, session, context, params):
+        self.dns_cache_misses += 1
+
+    def merge(self, other: 'ConnectionStats'):
+        """Додає статистику іншого воркера"""
+        self.created += other.created
+        self.reused += other.reused
+        self.pool_waits += other.pool_waits
+        self.pool_wait_time += other.pool_wait_time
+        self.dns_cache_hits += other.dns_cache_hits
+        self.dns_cache_misses += other.dns_cache_misses
+        self.connect_time.merge(other.connect_time)
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Частка запитів, що отримали вже відкрите з'єднання"""
+        total = self.created + self.reused
+        return self.reused / total if total else 0.0
+
+    def to_dict(self) -> Dict:
+        """Серіалізація для JSON"""
+        return {
+            'created': self.created,
+            'reused': self.reused,
+            'reuse_ratio': self.reuse_ratio,
+            'pool_waits': self.pool_waits,
+            'avg_pool_wait': self.pool_wait_time / self.pool_waits if self.pool_waits else 0.0,
+            'dns_cache_hits': self.dns_cache_hits,
+            'dns_cache_misses': self.dns_cache_misses,
+            'connect_time': {
+                'avg': self.connect_time.mean,
+                **self.connect_time.percentiles((50, 99)),
+                'max': self.connect_time.max,
+            },
+        }
+
+
 class RequestSimulator:
     MAX_RESPONSE_SIZE = 10 * 1024 * 1024  # 10MB максимальний розмір відповіді
-    MAX_CONCURRENT_REQUESTS = 1000  # Максимальна кількість паралельних запитів
+    MAX_CONCURRENT_REQUESTS = 1000  # Максимальна кількість паралельних запитів на один процес
+    ARRIVAL_MODES = ('batch',) + ArrivalScheduler.DISTRIBUTIONS + ('replay',)
+    PROGRESS_INTERVAL = 10  # Інтервал виводу прогресу (секунди)
+    WORKER_STARTUP_GRACE = 2.0  # Час на запуск процесів-воркерів перед спільним стартом (секунди)
+    REQUEST_TIMEOUT = 10  # Таймаут одного запиту (секунди)
+    BODY_MODES = ('drain', 'text')
 
-    def __init__(self, target_url: str, requests_per_second: int = 100, duration: int = 60):
+    def __init__(self, target_url: str, requests_per_second: int = 100, duration: int = 60,
+                 arrival_mode: str = 'batch', workers: int = 1, latency_precision: float = 0.01,
+                 timeseries_file: Optional[str] = None, profile: Optional[LoadProfile] = None,
+                 connection: Optional[ConnectionConfig] = None, body_mode: str = 'drain',
+                 verify_checksum: Optional[str] = None, mix: Optional[RequestMix] = None,
+                 replay: Optional[AccessLogReplay] = None):
         """
         Ініціалізація симулятора запитів
 
@@ -33,6 +491,23 @@ class RequestSimulator:
             target_url: URL цільового сервера
             requests_per_second: Кількість запитів на секунду
             duration: Тривалість тесту в секундах
+            arrival_mode: 'batch' - пачка запитів щосекунди (closed-loop),
+                'uniform' / 'poisson' - open-loop розклад з рівними / експоненційними інтервалами,
+                'replay' - open-loop відтворення access-логу (потребує replay)
+            workers: Кількість процесів-генераторів (кожен з власним event loop),
+                0 - автоматично за RPS та кількістю CPU
+            latency_precision: Відносна точність гістограми затримок (0.01 = 1%)
+            timeseries_file: Файл посекундного часового ряду (NDJSON), None - не записувати
+            profile: Профіль навантаження (ramp, steps, ...); якщо задано, RPS визначається
+                його піковою інтенсивністю, а requests_per_second ігнорується
+            connection: Стратегія з'єднань (за замовчуванням - пул keep-alive на 500 з'єднань)
+            body_mode: 'drain' - вичитувати тіло фрагментами без декодування і без збирання в один рядок,
+                'text' - декодувати тіло як response.text()
+            verify_checksum: Перевіряти CRC32 тіла успішних відповідей: hex значення
+                або 'auto' - еталоном стає перша успішна відповідь; None - не перевіряти
+            mix: Зважена суміш запитів (шляхи відносно target_url); None - лише GET target_url
+            replay: Access-лог для відтворення з початковими інтервалами; requests_per_second
+                тоді лише оцінка пікового RPS для кількості воркерів і паралелізму
 
         Raises:
             ValueError: Якщо параметри невалідні
@@ -43,136 +518,461 @@ class RequestSimulator:
             raise ValueError(f"Невалідний URL: {target_url}")
 
         # Валідація параметрів
-        if requests_per_second <= 0 or requests_per_second > self.MAX_CONCURRENT_REQUESTS:
-            raise ValueError(f"RPS має бути між 1 та {self.MAX_CONCURRENT_REQUESTS}")
+        if profile is not None:
+            requests_per_second = math.ceil(profile.peak())
+        if workers < 0:
+            raise ValueError("Кількість воркерів не може бути від'ємною")
+        if workers == 0:
+            workers = self.auto_workers(requests_per_second)
+
+        max_rps = self.MAX_CONCURRENT_REQUESTS * workers
+        if requests_per_second <= 0 or requests_per_second > max_rps:
+            raise ValueError(f"RPS має бути між 1 та {max_rps} для {workers} воркер(ів)")
 
         if duration <= 0 or duration > 3600:
             raise ValueError("Тривалість має бути між 1 та 3600 секунд")
 
+        if arrival_mode not in self.ARRIVAL_MODES:
+            raise ValueError(f"Невідомий режим: {arrival_mode}. Доступні: {', '.join(self.ARRIVAL_MODES)}")
+
+        if replay is not None:
+            arrival_mode = 'replay'
+        elif arrival_mode == 'replay':
+            raise ValueError("Режим replay потребує access-логу для відтворення")
+
+        if body_mode not in self.BODY_MODES:
+            raise ValueError(f"Невідомий режим читання тіла: {body_mode}. Доступні: {', '.join(self.BODY_MODES)}")
+
+        expected_checksum = None
+        if verify_checksum not in (None, 'auto'):
+            try:
+                expected_checksum = int(verify_checksum, 16)
+            except ValueError:
+                raise ValueError(f"Контрольна сума має бути hex значенням CRC32 або 'auto': {verify_checksum}")
+
         self.target_url = target_url
         self.rps = requests_per_second
         self.duration = duration
+        self.arrival_mode = arrival_mode
+        self.load_profile = profile
+        # Постійний профіль, якщо користувач не задав свій - далі всі режими працюють з профілем
+        self._rate_profile = profile or ConstantProfile(requests_per_second)
+        # Не більше воркерів, ніж запитів за секунду - інакше частина отримає нульову частку
+        self.workers = min(workers, requests_per_second)
+        self.worker_id = None  # Встановлюється в процесі-воркері
+        self.latency_precision = latency_precision
+        self.timeseries_file = timeseries_file
+        self.timeseries = None  # TimeSeriesWriter під час виконання
+        self.connection = connection or ConnectionConfig()
+        self.body_mode = body_mode
+        self.verify_checksum = verify_checksum
+        self.expected_checksum = expected_checksum  # У режимі 'auto' - з першої успішної відповіді
+        self.mix = mix
+        self.replay = replay
+        self._base_url = target_url.rstrip('/')
         self.results = {
             'total_requests': 0,
             'successful_requests': 0,
             'failed_requests': 0,
-            'response_times': [],
-            'errors': []
+            'bytes_received': 0,
+            # Гістограма з фіксованою пам'яттю замість списку всіх часів відгуку
+            # (від запланованого моменту до завершення - з урахуванням coordinated omission)
+            'latency': LatencyHistogram(latency_precision),
+            # Складові часу відгуку: обслуговування (від відправки) і черга (до відправки)
+            'service_time': LatencyHistogram(latency_precision),
+            'queue_delay': LatencyHistogram(latency_precision),
+            # Лічильник класів помилок з обмеженою пам'яттю
+            'errors': ErrorStats(),
+            'connections': ConnectionStats(latency_precision),
+            # Статистика за ендпоінтами суміші: назва → {requests, failed, latency}
+            'endpoints': {}
         }
 
-        logger.info(f"Ініціалізовано RequestSimulator: {target_url}, RPS={requests_per_second}, Duration={duration}s")
+        logger.info(f"Ініціалізовано RequestSimulator: {target_url}, RPS={requests_per_second}, "
+                    f"Duration={duration}s, Mode={arrival_mode}, Workers={self.workers}")
+
+    @classmethod
+    def auto_workers(cls, requests_per_second: int) -> int:
+        """Кількість воркерів: не менше ніж CPU, і достатньо щоб не перевищити ліміт на процес"""
+        return max(os.cpu_count() or 1, math.ceil(requests_per_second / cls.MAX_CONCURRENT_REQUESTS))
     
-    async def send_request(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore) -> Dict:
+    async def send_request(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                           scheduled_at: Optional[float] = None, request: Optional[Tuple[str, str]] = None) -> Dict:
         """
         Відправляє один HTTP запит з обмеженням розміру відповіді
 
+        Для кожного запиту фіксуються три моменти: запланований (scheduled),
+        відправка після отримання місця в семафорі (dispatched) і завершення
+        (completed). Час відгуку - completed - scheduled, час обслуговування -
+        completed - dispatched, черга - dispatched - scheduled (очікування
+        семафора та затримка event loop).
+
         Args:
             session: aiohttp клієнтська сесія
             semaphore: Семафор для контролю паралелізму
+            scheduled_at: Запланований момент відправки (time.perf_counter()).
+                Час відгуку рахується від нього, тож запізнення відправки
+                входить у затримку (без coordinated omission); None - момент виклику
+            request: (метод, шлях) з відтворюваного логу замість target_url або суміші
 
         Returns:
             Словник з результатами запиту
         """
-        start_time = time.time()
+        scheduled = scheduled_at if scheduled_at is not None else time.perf_counter()
+        endpoint = self.mix.sample() if self.mix and request is None else None
         async with semaphore:
+            dispatched = time.perf_counter()
             try:
-                async with session.get(
-                    self.target_url,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
+                # Таймаут задано один раз на рівні сесії
+                async with self._request(session, endpoint, request) as response:
                     # Читаємо відповідь з обмеженням розміру
                     content_length = response.headers.get('Content-Length')
                     if content_length and int(content_length) > self.MAX_RESPONSE_SIZE:
                         logger.warning(f"Відповідь занадто велика: {content_length} bytes")
-                        return {
+                        result = {
                             'success': False,
-                            'error': 'Response too large',
-                            'response_time': time.time() - start_time
+                            'error_type': 'too_large',
+                            'error': f'Response too large: {content_length} bytes'
                         }
-
-                    await response.text()
-                    response_time = time.time() - start_time
-
-                    return {
-                        'success': response.status == 200,
-                        'status_code': response.status,
-                        'response_time': response_time
-                    }
+                    else:
+                        received, checksum = await self._read_body(response)
+                        result = {
+                            'success': response.status == 200,
+                            'status_code': response.status,
+                            'bytes': received
+                        }
+                        if received > self.MAX_RESPONSE_SIZE:
+                            # Content-Length може бути відсутнім (chunked) або неправдивим
+                            logger.warning(f"Відповідь занадто велика: понад {self.MAX_RESPONSE_SIZE} bytes")
+                            result.update(success=False, error_type='too_large',
+                                          error=f'Response too large: over {self.MAX_RESPONSE_SIZE} bytes')
+                        elif response.status != 200:
+                            result['error_type'] = f'http_{response.status}'
+                            result['error'] = f'HTTP {response.status} {response.reason}'
+                        elif checksum is not None and not self._checksum_matches(checksum):
+                            result.update(success=False, error_type='checksum_mismatch',
+                                          error=f'CRC32 {checksum:08x} != {self.expected_checksum:08x}')
 
             except asyncio.TimeoutError:
                 logger.debug(f"Timeout для запиту до {self.target_url}")
-                return {
+                result = {
                     'success': False,
-                    'error': 'Timeout',
-                    'response_time': time.time() - start_time
+                    'error_type': 'timeout',
+                    'error': 'Timeout'
                 }
             except aiohttp.ClientError as e:
                 logger.debug(f"Client error: {e}")
-                return {
+                result = {
                     'success': False,
-                    'error': f'ClientError: {str(e)}',
-                    'response_time': time.time() - start_time
+                    'error_type': classify_client_error(e),
+                    'error': f'{type(e).__name__}: {str(e)}'
                 }
             except Exception as e:
                 logger.error(f"Неочікувана помилка: {e}", exc_info=True)
-                return {
+                result = {
                     'success': False,
-                    'error': str(e),
-                    'response_time': time.time() - start_time
+                    'error_type': 'exception',
+                    'error': f'{type(e).__name__}: {str(e)}'
                 }
+
+        completed = time.perf_counter()
+        result['response_time'] = completed - scheduled
+        result['service_time'] = completed - dispatched
+        result['queue_delay'] = dispatched - scheduled
+        # Час завершення за годинником - для посекундного часового ряду
+        result['completed_at'] = time.time()
+        if endpoint is not None:
+            result['endpoint'] = endpoint.name
+        return result
+
+    def _request(self, session: aiohttp.ClientSession, endpoint: Optional[Endpoint],
+                 request: Optional[Tuple[str, str]] = None):
+        """Контекстний менеджер запиту: GET target_url, запит ендпоінта суміші або рядка логу"""
+        if request is not None:
+            method, path = request
+            return session.request(method, self._base_url + path)
+        if endpoint is None:
+            return session.get(self.target_url)
+        path, body = self.mix.render(endpoint)
+        url = path if endpoint.absolute else self._base_url + path
+        return session.request(endpoint.method, url, data=body, headers=endpoint.headers)
     
+    async def _read_body(self, response: aiohttp.ClientResponse) -> Tuple[int, Optional[int]]:
+        """
+        Читає тіло відповіді з обмеженням розміру
+
+        У режимі 'drain' фрагменти з буфера aiohttp лише рахуються (і за потреби
+        додаються до CRC32) та одразу відкидаються - без збирання тіла в один
+        bytes і без декодування. Читання зупиняється, щойно тіло перевищує
+        MAX_RESPONSE_SIZE, незалежно від Content-Length.
+
+        StreamReader aiohttp не має readinto(), тож власний буфер для повторного
+        використання означав би ще одну копію кожного фрагмента. readchunk()
+        віддає ті самі bytes, що їх aiohttp отримав із сокета, - без нарізання
+        (як read(n)) і склеювання (як readany()).
+
+        Returns:
+            (кількість байтів, CRC32 або None, якщо перевірка вимкнена);
+            кількість більша за MAX_RESPONSE_SIZE означає, що читання перервано
+        """
+        verify = self.verify_checksum is not None
+        if self.body_mode == 'text':
+            await response.text()
+            body = await response.read()  # Вже прочитане тіло з кешу відповіді
+            return len(body), zlib.crc32(body) if verify else None
+
+        received = 0
+        checksum = 0
+        while True:
+            chunk, end_of_http_chunk = await response.content.readchunk()
+            if not chunk:
+                if end_of_http_chunk:
+                    continue  # Межа фрагмента chunked-кодування, а не кінець тіла
+                break
+            received += len(chunk)
+            if received > self.MAX_RESPONSE_SIZE:
+                # Решта тіла не вичитується - aiohttp закриє з'єднання замість повернення в пул
+                break
+            if verify:
+                checksum = zlib.crc32(chunk, checksum)
+        return received, checksum if verify else None
+
+    def _checksum_matches(self, checksum: int) -> bool:
+        """Порівнює CRC32 тіла з еталоном (у режимі 'auto' перша відповідь стає еталоном)"""
+        if self.expected_checksum is None:
+            self.expected_checksum = checksum
+            logger.info(f"🔐 Еталонна CRC32 відповіді: {checksum:08x}")
+            return True
+        return checksum == self.expected_checksum
+
+    def _record_result(self, result):
+        """Враховує результат одного запиту в загальній статистиці"""
+        if isinstance(result, BaseException):
+            logger.error(f"Exception під час запиту: {result}", exc_info=result)
+            self.results['total_requests'] += 1
+            self.results['failed_requests'] += 1
+            self.results['errors'].record('exception', f'{type(result).__name__}: {result}')
+            if self.timeseries:
+                self.timeseries.record(time.time(), False, 0.0)
+        elif isinstance(result, dict):
+            if self.timeseries:
+                self.timeseries.record(result['completed_at'], result['success'], result['response_time'])
+
+            self.results['total_requests'] += 1
+            self.results['bytes_received'] += result.get('bytes', 0)
+
+            if result['success']:
+                self.results['successful_requests'] += 1
+                self.results['latency'].record(result['response_time'])
+                self.results['service_time'].record(result['service_time'])
+                self.results['queue_delay'].record(result['queue_delay'])
+            else:
+                self.results['failed_requests'] += 1
+                self.results['errors'].record(result.get('error_type', 'unknown'), result.get('error', ''))
+
+            if 'endpoint' in result:
+                self._record_endpoint(result)
+
+    def _record_endpoint(self, result: Dict):
+        """Враховує результат у статистиці його ендпоінта"""
+        stats = self.results['endpoints'].get(result['endpoint'])
+        if stats is None:
+            stats = self.results['endpoints'][result['endpoint']] = {
+                'requests': 0, 'failed': 0, 'latency': LatencyHistogram(self.latency_precision)
+            }
+        stats['requests'] += 1
+        if result['success']:
+            stats['latency'].record(result['response_time'])
+        else:
+            stats['failed'] += 1
+
+    def _merge_results(self, other: Dict):
+        """Додає результати воркера до загальних"""
+        for key in ('total_requests', 'successful_requests', 'failed_requests', 'bytes_received'):
+            self.results[key] += other[key]
+        for key in ('latency', 'service_time', 'queue_delay'):
+            self.results[key].merge(other[key])
+        self.results['errors'].merge(other['errors'])
+        self.results['connections'].merge(other['connections'])
+        for name, other_stats in other['endpoints'].items():
+            stats = self.results['endpoints'].get(name)
+            if stats is None:
+                self.results['endpoints'][name] = other_stats
+                continue
+            stats['requests'] += other_stats['requests']
+            stats['failed'] += other_stats['failed']
+            stats['latency'].merge(other_stats['latency'])
+
+    def _log_progress(self, elapsed: int):
+        """Виводить проміжну статистику"""
+        success_rate = (self.results['successful_requests'] / max(self.results['total_requests'], 1)) * 100
+        avg_response = self.results['latency'].mean
+        prefix = f"[worker {self.worker_id}] " if self.worker_id is not None else ""
+        logger.info(f"{prefix}⏳ {elapsed}с | Успішних: {self.results['successful_requests']} | "
+              f"Успішність: {success_rate:.1f}% | Avg Response: {avg_response:.3f}с")
+
+    async def _run_batches(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore):
+        """Closed-loop режим: щосекунди пачка з rate(t) запитів"""
+        end_time = time.time() + self.duration
+
+        while time.time() < end_time:
+            batch_start = time.time()
+            batch_size = round(self._rate_profile.rate(batch_start - (end_time - self.duration)))
+
+            # Відправляємо запити пачками з семафором; уся пачка запланована на початок секунди
+            scheduled_at = time.perf_counter()
+            tasks = [self.send_request(session, semaphore, scheduled_at) for _ in range(batch_size)]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+            # Обробка результатів
+            for result in results:
+                self._record_result(result)
+
+            # Виводимо прогрес
+            elapsed = int(time.time() - (end_time - self.duration))
+            if elapsed % self.PROGRESS_INTERVAL == 0:
+                self._log_progress(elapsed)
+
+            # Чекаємо до наступної пачки
+            batch_time = time.time() - batch_start
+            if batch_time < 1.0:
+                await asyncio.sleep(1.0 - batch_time)
+
+    async def _run_open_loop(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore):
+        """
+        Open-loop режим: кожен запит відправляється у свій запланований момент,
+        не чекаючи завершення попередніх
+        """
+        if self.replay:
+            schedule = ((offset, (method, path)) for offset, method, path in self.replay.requests(self.duration))
+        else:
+            scheduler = ArrivalScheduler(self._rate_profile, self.arrival_mode)
+            schedule = ((offset, None) for offset in scheduler.offsets(self.duration))
+        in_flight = set()
+
+        def on_done(task: asyncio.Task):
+            in_flight.discard(task)
+            if not task.cancelled():
+                self._record_result(task.exception() or task.result())
+
+        start = time.perf_counter()
+        next_progress = self.PROGRESS_INTERVAL
+
+        for offset, request in schedule:
+            scheduled_at = start + offset
+            # sleep(0) при відставанні - віддаємо керування, щоб запити в роботі не голодували
+            await asyncio.sleep(max(scheduled_at - time.perf_counter(), 0))
+
+            task = asyncio.create_task(self.send_request(session, semaphore, scheduled_at, request))
+            in_flight.add(task)
+            task.add_done_callback(on_done)
+
+            if offset >= next_progress:
+                self._log_progress(next_progress)
+                next_progress += self.PROGRESS_INTERVAL
+
+        # Дочікуємось запитів, які ще в роботі
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+    async def _run_local(self):
+        """Генерує навантаження в поточному процесі"""
+        # Семафор для контролю паралелізму
+        semaphore = asyncio.Semaphore(min(self.rps, self.connection.pool_size))
+
+        if self.timeseries_file:
+            self.timeseries = TimeSeriesWriter(self.timeseries_file)
+
+        try:
+            async with aiohttp.ClientSession(
+                connector=self.connection.create_connector(),
+                timeout=aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT),
+                trace_configs=[self.results['connections'].trace_config()]
+            ) as session:
+                if self.arrival_mode == 'batch':
+                    await self._run_batches(session, semaphore)
+                else:
+                    await self._run_open_loop(session, semaphore)
+        finally:
+            if self.timeseries:
+                self.timeseries.close()
+                self.timeseries = None
+
+    def _split_rps(self) -> List[int]:
+        """Ділить цільовий RPS між воркерами (залишок - першим воркерам)"""
+        base, remainder = divmod(self.rps, self.workers)
+        return [base + (1 if i < remainder else 0) for i in range(self.workers)]
+
+    def _worker_timeseries_file(self, worker_id: int) -> Optional[str]:
+        """Тимчасовий файл часового ряду воркера"""
+        return f"{self.timeseries_file}.worker{worker_id}" if self.timeseries_file else None
+
+    def _worker_options(self, rps: int, worker_id: int) -> Dict:
+        """Аргументи конструктора для воркера з часткою rps"""
+        return {
+            'target_url': self.target_url,
+            'requests_per_second': rps,
+            'duration': self.duration,
+            'arrival_mode': self.arrival_mode,
+            'latency_precision': self.latency_precision,
+            'timeseries_file': self._worker_timeseries_file(worker_id),
+            'profile': self.load_profile.scaled(rps / self.rps) if self.load_profile else None,
+            'connection': self.connection,
+            'body_mode': self.body_mode,
+            'verify_checksum': self.verify_checksum,
+            'mix': self.mix.forked(worker_id) if self.mix else None,
+            'replay': self.replay.sharded(worker_id, self.workers) if self.replay else None,
+        }
+
+    async def _run_worker_pool(self):
+        """Генерує навантаження в кількох процесах і об'єднує їх результати"""
+        shares = self._split_rps()
+        logger.info(f"👷 Воркерів: {self.workers}, RPS на воркер: {shares}")
+
+        # Спільний момент старту; зсув фази i/rps, щоб uniform-розклади воркерів не збігались
+        start_at = time.time() + self.WORKER_STARTUP_GRACE
+        loop = asyncio.get_running_loop()
+        # spawn - дочірні процеси не успадковують event loop батьківського
+        context = multiprocessing.get_context('spawn')
+
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            futures = [
+                loop.run_in_executor(
+                    pool, _run_worker, self._worker_options(share, worker_id),
+                    worker_id, start_at + worker_id / self.rps
+                )
+                for worker_id, share in enumerate(shares)
+            ]
+            worker_results = await asyncio.gather(*futures)
+
+        for result in worker_results:
+            self._merge_results(result)
+
+        if self.timeseries_file:
+            worker_files = [self._worker_timeseries_file(worker_id) for worker_id in range(self.workers)]
+            TimeSeriesWriter.merge_files(worker_files, self.timeseries_file)
+            for worker_file in worker_files:
+                os.remove(worker_file)
+
     async def run_simulation(self):
         """Запускає симуляцію HTTP запитів"""
         logger.info(f"🚀 Початок симуляції запитів")
         logger.info(f"📊 Цільовий сервер: {self.target_url}")
         logger.info(f"⚡ Запитів/сек: {self.rps}")
+        if self.load_profile:
+            logger.info(f"📈 Профіль: {self.load_profile.describe()}")
+        if self.mix:
+            logger.info(f"🧭 Суміш запитів: {len(self.mix.endpoints)} ендпоінт(ів)")
+        if self.replay:
+            logger.info(f"📼 Відтворення логу: {self.replay.filename} (x{self.replay.speed:g})")
         logger.info(f"⏱️ Тривалість: {self.duration}с")
+        logger.info(f"🔀 Режим: {self.arrival_mode}")
         print("-" * 50)
 
-        end_time = time.time() + self.duration
-
-        # Семафор для контролю паралелізму
-        semaphore = asyncio.Semaphore(min(self.rps, 500))
-
-        connector = aiohttp.TCPConnector(limit=500, limit_per_host=500)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            while time.time() < end_time:
-                batch_start = time.time()
-
-                # Відправляємо запити пачками з семафором
-                tasks = [self.send_request(session, semaphore) for _ in range(self.rps)]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-
-                # Обробка результатів
-                for result in results:
-                    if isinstance(result, Exception):
-                        logger.error(f"Exception в gather: {result}", exc_info=result)
-                        self.results['total_requests'] += 1
-                        self.results['failed_requests'] += 1
-                        self.results['errors'].append(str(result))
-                    elif isinstance(result, dict):
-                        self.results['total_requests'] += 1
-
-                        if result['success']:
-                            self.results['successful_requests'] += 1
-                            self.results['response_times'].append(result['response_time'])
-                        else:
-                            self.results['failed_requests'] += 1
-                            if 'error' in result:
-                                self.results['errors'].append(result['error'])
-
-                # Виводимо прогрес
-                elapsed = int(time.time() - (end_time - self.duration))
-                if elapsed % 10 == 0:
-                    success_rate = (self.results['successful_requests'] / max(self.results['total_requests'], 1)) * 100
-                    avg_response = sum(self.results['response_times']) / max(len(self.results['response_times']), 1) if self.results['response_times'] else 0
-                    logger.info(f"⏳ {elapsed}с | Успішних: {self.results['successful_requests']} | "
-                          f"Успішність: {success_rate:.1f}% | Avg Response: {avg_response:.3f}с")
-
-                # Чекаємо до наступної пачки
-                batch_time = time.time() - batch_start
-                if batch_time < 1.0:
-                    await asyncio.sleep(1.0 - batch_time)
+        if self.workers > 1:
+            await self._run_worker_pool()
+        else:
+            await self._run_local()
     
     def print_summary(self):
         """Виводить підсумкову статистику"""
@@ -183,44 +983,112 @@ class RequestSimulator:
         print(f"Всього запитів: {self.results['total_requests']}")
         print(f"✅ Успішних: {self.results['successful_requests']}")
         print(f"❌ Невдалих: {self.results['failed_requests']}")
+        print(f"📦 Отримано: {self.results['bytes_received'] / 1024 / 1024:.1f} MB (режим {self.body_mode})")
         
-        if self.results['response_times']:
-            avg_time = sum(self.results['response_times']) / len(self.results['response_times'])
-            min_time = min(self.results['response_times'])
-            max_time = max(self.results['response_times'])
-            
-            # Обчислення перцентилів
-            sorted_times = sorted(self.results['response_times'])
-            p50 = sorted_times[len(sorted_times) // 2]
-            p95 = sorted_times[int(len(sorted_times) * 0.95)]
-            p99 = sorted_times[int(len(sorted_times) * 0.99)]
-            
+        latency = self.results['latency']
+        if latency.count:
             print(f"\n⏱️  Час відгуку:")
-            print(f"  Середній: {avg_time:.3f}с")
-            print(f"  Мін: {min_time:.3f}с")
-            print(f"  Макс: {max_time:.3f}с")
-            print(f"  P50: {p50:.3f}с")
-            print(f"  P95: {p95:.3f}с")
-            print(f"  P99: {p99:.3f}с")
+            print(f"  Середній: {latency.mean:.3f}с")
+            print(f"  Мін: {latency.min:.3f}с")
+            print(f"  Макс: {latency.max:.3f}с")
+            for name, value in latency.percentiles().items():
+                print(f"  {name.upper()}: {value:.3f}с")
+
+            print(f"\n  Від запланованого моменту = черга + обслуговування:")
+            print(f"  {'':8}{'відгук':>10}{'черга':>10}{'обслуг.':>10}")
+            service_time, queue_delay = self.results['service_time'], self.results['queue_delay']
+            print(f"  {'Avg':8}{latency.mean:>9.3f}с{queue_delay.mean:>9.3f}с{service_time.mean:>9.3f}с")
+            for p in (50, 90, 99, 99.9):
+                print(f"  {f'P{p:g}':8}{latency.percentile(p):>9.3f}с{queue_delay.percentile(p):>9.3f}с"
+                      f"{service_time.percentile(p):>9.3f}с")
         
+        connections = self.results['connections']
+        if connections.created or connections.reused:
+            pool_wait = connections.pool_wait_time / connections.pool_waits if connections.pool_waits else 0.0
+            print(f"\n🔌 З'єднання ({self.connection.strategy}, пул {self.connection.pool_size}):")
+            print(f"  Створено: {connections.created} | Перевикористано: {connections.reused} "
+                  f"({connections.reuse_ratio:.1%})")
+            print(f"  Встановлення з'єднання: avg {connections.connect_time.mean * 1000:.2f} мс, "
+                  f"P99 {connections.connect_time.percentile(99) * 1000:.2f} мс")
+            print(f"  Очікування вільного з'єднання: {connections.pool_waits} раз(ів), avg {pool_wait * 1000:.2f} мс")
+
+        if self.results['endpoints']:
+            print(f"\n🧭 Ендпоінти:")
+            for name, stats in sorted(self.results['endpoints'].items(), key=lambda item: -item[1]['requests']):
+                endpoint_latency = stats['latency']
+                print(f"  {name}: {stats['requests']} запитів, помилок {stats['failed']} | "
+                      f"avg {endpoint_latency.mean:.3f}с, P50 {endpoint_latency.percentile(50):.3f}с, "
+                      f"P99 {endpoint_latency.percentile(99):.3f}с")
+
+        errors = self.results['errors']
+        if errors.classes:
+            print(f"\n⚠️  Помилки за класами:")
+            for error_class, entry in errors.most_common():
+                print(f"  {error_class}: {entry['count']}")
+
         success_rate = (self.results['successful_requests'] / max(self.results['total_requests'], 1)) * 100
         print(f"\n✨ Успішність: {success_rate:.2f}%")
         print("=" * 50)
     
-    def save_results(self, filename: str = 'test_results.json'):
-        """Зберігає результати у файл"""
-        output = {
+    def build_output(self) -> Dict:
+        """Результати тесту у форматі test_results.json"""
+        latency = self.results['latency']
+        return {
             'timestamp': datetime.now().isoformat(),
             'target_url': self.target_url,
             'rps': self.rps,
             'duration': self.duration,
+            'arrival_mode': self.arrival_mode,
+            'workers': self.workers,
+            'profile': self.load_profile.describe() if self.load_profile else None,
             'total_requests': self.results['total_requests'],
             'successful_requests': self.results['successful_requests'],
             'failed_requests': self.results['failed_requests'],
-            'avg_response_time': sum(self.results['response_times']) / max(len(self.results['response_times']), 1) if self.results['response_times'] else 0,
-            'min_response_time': min(self.results['response_times']) if self.results['response_times'] else 0,
-            'max_response_time': max(self.results['response_times']) if self.results['response_times'] else 0,
+            'avg_response_time': latency.mean,
+            'min_response_time': latency.min if latency.count else 0,
+            'max_response_time': latency.max,
+            # Час відгуку рахується від запланованого моменту відправки (corrected)
+            'response_time_percentiles': latency.percentiles(),
+            'latency_histogram': latency.to_dict(),
+            'service_time': {
+                'avg': self.results['service_time'].mean,
+                'percentiles': self.results['service_time'].percentiles(),
+                'histogram': self.results['service_time'].to_dict(),
+            },
+            'queue_delay': {
+                'avg': self.results['queue_delay'].mean,
+                'percentiles': self.results['queue_delay'].percentiles(),
+                'histogram': self.results['queue_delay'].to_dict(),
+            },
+            'errors': self.results['errors'].to_dict(),
+            'connection': self.connection.describe(),
+            'connection_stats': self.results['connections'].to_dict(),
+            'timeseries_file': self.timeseries_file,
+            'body_mode': self.body_mode,
+            'bytes_received': self.results['bytes_received'],
+            'checksum': {
+                'verify': self.verify_checksum,
+                'expected': f'{self.expected_checksum:08x}' if self.expected_checksum is not None else None,
+                'mismatches': self.results['errors'].classes.get('checksum_mismatch', {}).get('count', 0),
+            },
+            'request_mix': self.mix.describe() if self.mix else None,
+            'replay': self.replay.describe() if self.replay else None,
+            'endpoints': {
+                name: {
+                    'requests': stats['requests'],
+                    'successful': stats['requests'] - stats['failed'],
+                    'failed': stats['failed'],
+                    'avg_response_time': stats['latency'].mean,
+                    'response_time_percentiles': stats['latency'].percentiles(),
+                    'latency_histogram': stats['latency'].to_dict(),
+                }
+                for name, stats in self.results['endpoints'].items()
+            },
         }
+
+    def save_results(self, filename: str = 'test_results.json'):
+        """Зберігає результати у файл"""
+        output = self.build_output()
         
         with open(filename, 'w') as f:
             json.dump(output, f, indent=2)
@@ -228,18 +1096,321 @@ class RequestSimulator:
         print(f"\n💾 Результати збережено: {filename}")
 
 
+class SaturationSearch:
+    """
+    Пошук максимального стійкого RPS (точки насичення цілі)
+
+    Серія коротких open-loop проб: спочатку RPS подвоюється до першого порушення
+    SLO, далі - бісекція між останньою успішною і першою невдалою пробою.
+    Проба успішна, якщо P99 не перевищує SLO, а частка помилок - поріг.
+    """
+    COOLDOWN = 2.0  # Пауза між пробами, щоб ціль розвантажилась (секунди)
+
+    def __init__(self, target_url: str, max_rps: int, step_duration: int = 10, start_rps: int = 100,
+                 slo_p99: float = 0.5, max_error_rate: float = 0.01, tolerance: float = 0.05,
+                 max_steps: int = 12, arrival_mode: str = 'uniform', workers: int = 1,
+                 latency_precision: float = 0.01, connection: Optional[ConnectionConfig] = None,
+                 body_mode: str = 'drain', verify_checksum: Optional[str] = None,
+                 mix: Optional[RequestMix] = None):
+        """
+        Args:
+            target_url: URL цільового сервера
+            max_rps: Верхня межа пошуку
+            step_duration: Тривалість однієї проби (секунди)
+            start_rps: RPS першої проби
+            slo_p99: Допустимий P99 часу відгуку (секунди)
+            max_error_rate: Допустима частка невдалих запитів (0.01 = 1%)
+            tolerance: Пошук зупиняється, коли (fail - pass) / pass не більше tolerance
+            max_steps: Максимальна кількість проб
+            arrival_mode: Open-loop розподіл проб (uniform / poisson)
+            workers: Кількість процесів-генераторів (0 - автоматично для кожної проби)
+            latency_precision: Відносна точність гістограми затримок
+            connection: Стратегія з'єднань для проб
+            body_mode: Режим читання тіла відповіді (див. RequestSimulator)
+            verify_checksum: Перевірка CRC32 тіла (див. RequestSimulator)
+            mix: Зважена суміш запитів для проб
+
+        Raises:
+            ValueError: Якщо параметри невалідні
+        """
+        if arrival_mode not in ArrivalScheduler.DISTRIBUTIONS:
+            # У closed-loop режимі повільна ціль знижує навантаження і приховує насичення
+            raise ValueError("Пошук насичення потребує open-loop режиму (uniform або poisson)")
+        if not 0 < start_rps <= max_rps:
+            raise ValueError("Має виконуватись 0 < start_rps <= max_rps")
+        if slo_p99 <= 0 or not 0 <= max_error_rate < 1:
+            raise ValueError("SLO має бути додатним, а поріг помилок - в межах [0, 1)")
+        if workers < 0:
+            raise ValueError("Кількість воркерів не може бути від'ємною")
+        # Перевірка до першої проби: інакше подвоєння RPS перетне ліміт посеред пошуку
+        if workers > 0 and max_rps > RequestSimulator.MAX_CONCURRENT_REQUESTS * workers:
+            raise ValueError(f"Верхня межа пошуку {max_rps} RPS перевищує "
+                             f"{RequestSimulator.MAX_CONCURRENT_REQUESTS * workers} для {workers} воркер(ів) - "
+                             f"збільште --workers або вкажіть --workers 0 (автоматично для кожної проби)")
+
+        self.target_url = target_url
+        self.max_rps = max_rps
+        self.step_duration = step_duration
+        self.start_rps = start_rps
+        self.slo_p99 = slo_p99
+        self.max_error_rate = max_error_rate
+        self.tolerance = tolerance
+        self.max_steps = max_steps
+        self.arrival_mode = arrival_mode
+        self.workers = workers
+        self.latency_precision = latency_precision
+        self.connection = connection
+        self.body_mode = body_mode
+        self.verify_checksum = verify_checksum
+        self.mix = mix
+
+        self.steps = []
+        self.best = None  # RequestSimulator найвищої успішної проби
+        self.max_sustainable_rps = 0
+
+    def evaluate(self, simulator: RequestSimulator) -> Dict:
+        """Оцінка однієї проби відносно SLO"""
+        results = simulator.results
+        total = max(results['total_requests'], 1)
+        error_rate = results['failed_requests'] / total
+        p99 = results['latency'].percentile(99)
+
+        reasons = []
+        if results['latency'].count == 0 or p99 > self.slo_p99:
+            reasons.append(f"p99 {p99:.3f}с > SLO {self.slo_p99:.3f}с")
+        if error_rate > self.max_error_rate:
+            reasons.append(f"помилок {error_rate:.2%} > {self.max_error_rate:.2%}")
+
+        return {
+            'rps': simulator.rps,
+            'passed': not reasons,
+            'p99': p99,
+            'error_rate': error_rate,
+            'throughput': results['successful_requests'] / simulator.duration,
+            'reason': '; '.join(reasons) or None,
+        }
+
+    async def _probe(self, rps: int) -> Dict:
+        """Запускає одну пробу і повертає її оцінку"""
+        simulator = RequestSimulator(self.target_url, rps, self.step_duration, self.arrival_mode,
+                                     self.workers, self.latency_precision, connection=self.connection,
+                                     body_mode=self.body_mode, verify_checksum=self.verify_checksum,
+                                     mix=self.mix)
+        await simulator.run_simulation()
+
+        step = self.evaluate(simulator)
+        self.steps.append(step)
+        if step['passed'] and rps > self.max_sustainable_rps:
+            self.max_sustainable_rps = rps
+            self.best = simulator
+        elif self.best is None and len(self.steps) == 1:
+            # Жодна проба ще не пройшла - зберігаємо першу, щоб було що записати у результати
+            self.best = simulator
+
+        status = "✅" if step['passed'] else f"❌ {step['reason']}"
+        logger.info(f"🔎 Проба {len(self.steps)}: {rps} RPS | P99 {step['p99']:.3f}с | "
+                    f"помилок {step['error_rate']:.2%} | {status}")
+        return step
+
+    async def run(self) -> int:
+        """
+        Виконує пошук
+
+        Returns:
+            Максимальний RPS, за якого виконуються SLO (0, якщо не виконуються навіть на start_rps)
+        """
+        passed_rps = 0  # Найвищий успішний RPS
+        failed_rps = None  # Найнижчий невдалий RPS
+        rps = self.start_rps
+
+        for _ in range(self.max_steps):
+            step = await self._probe(rps)
+            if step['passed']:
+                passed_rps = rps
+            else:
+                failed_rps = rps
+
+            if failed_rps is None:
+                if rps >= self.max_rps:
+                    break
+                next_rps = min(rps * 2, self.max_rps)
+            else:
+                if passed_rps and (failed_rps - passed_rps) / passed_rps <= self.tolerance:
+                    break
+                next_rps = (passed_rps + failed_rps) // 2
+
+            if next_rps in (rps, passed_rps, failed_rps) or next_rps <= 0:
+                break
+            rps = next_rps
+            await asyncio.sleep(self.COOLDOWN)
+
+        logger.info(f"🏁 Максимальний стійкий RPS: {self.max_sustainable_rps}")
+        return self.max_sustainable_rps
+
+    def build_output(self) -> Dict:
+        """Результати найвищої успішної проби + опис пошуку у форматі test_results.json"""
+        output = self.best.build_output() if self.best else {}
+        output['saturation'] = {
+            'max_sustainable_rps': self.max_sustainable_rps,
+            'slo_p99': self.slo_p99,
+            'max_error_rate': self.max_error_rate,
+            'step_duration': self.step_duration,
+            'test_seconds': self.step_duration * len(self.steps),
+            'steps': self.steps,
+        }
+        return output
+
+    def print_summary(self):
+        """Виводить хід пошуку та результати найкращої проби"""
+        if self.best:
+            self.best.print_summary()
+
+        print(f"\n🔎 ПОШУК НАСИЧЕННЯ (SLO: P99 ≤ {self.slo_p99:.3f}с, помилок ≤ {self.max_error_rate:.2%})")
+        for i, step in enumerate(self.steps, 1):
+            status = "✅" if step['passed'] else f"❌ {step['reason']}"
+            print(f"  {i}. {step['rps']} RPS - {status}")
+        print(f"🏁 Максимальний стійкий RPS: {self.max_sustainable_rps}")
+
+    def save_results(self, filename: str = 'test_results.json'):
+        """Зберігає результати у файл"""
+        with open(filename, 'w') as f:
+            json.dump(self.build_output(), f, indent=2)
+
+        print(f"\n💾 Результати збережено: {filename}")
+
+
+def _run_worker(options: Dict, worker_id: int, start_at: float) -> Dict:
+    """
+    Точка входу процесу-воркера: власний event loop і TCPConnector
+
+    Args:
+        options: Аргументи конструктора RequestSimulator (див. _worker_options)
+        worker_id: Номер воркера
+        start_at: Спільний момент старту (time.time()), щоб воркери почали одночасно
+
+    Returns:
+        Словник results воркера для об'єднання в батьківському процесі
+    """
+    simulator = RequestSimulator(**options)
+    simulator.worker_id = worker_id
+
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+    try:
+        asyncio.run(simulator._run_local())
+    except KeyboardInterrupt:
+        logger.warning(f"[worker {worker_id}] Перервано, повертаємо часткові результати")
+
+    return simulator.results
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Розбирає аргументи командного рядка"""
+    parser = argparse.ArgumentParser(
+        description="HTTP Request Simulator",
+        epilog="Приклад: python request_simulator.py http://18.159.112.169 100 60 --arrival poisson"
+    )
+    parser.add_argument('target_url', help="URL цільового сервера")
+    parser.add_argument('rps', nargs='?', type=int, default=100, help="Запитів на секунду (за замовчуванням 100)")
+    parser.add_argument('duration', nargs='?', type=int, default=60, help="Тривалість тесту, с (за замовчуванням 60)")
+    parser.add_argument('--arrival', choices=RequestSimulator.ARRIVAL_MODES,
+                        help="Режим навантаження: batch (closed-loop, за замовчуванням) або open-loop "
+                             "uniform/poisson (за замовчуванням для --search)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Кількість процесів-генераторів (0 - автоматично)")
+    parser.add_argument('--latency-precision', type=float, default=0.01,
+                        help="Відносна точність гістограми затримок (за замовчуванням 0.01 = 1%%)")
+    parser.add_argument('--timeseries', metavar='FILE',
+                        help="Записувати посекундний часовий ряд (NDJSON) у FILE під час тесту")
+    parser.add_argument('--profile', metavar='SPEC',
+                        help="Профіль навантаження замість постійного RPS, напр. 'ramp:start=100,end=5000' "
+                             "або 'steps:start=500,step=500,hold=30,count=10' (див. load_profiles.parse_profile)")
+    parser.add_argument('--body', choices=RequestSimulator.BODY_MODES, default='drain',
+                        help="Читання тіла відповіді: drain - фрагментами без декодування (за замовчуванням), "
+                             "text - декодувати як текст")
+    parser.add_argument('--verify-checksum', nargs='?', const='auto', metavar='CRC32',
+                        help="Перевіряти CRC32 тіла успішних відповідей: hex значення або без значення - "
+                             "еталоном стає перша відповідь")
+
+    request_mix = parser.add_argument_group("суміш запитів")
+    request_mix.add_argument('--mix', metavar='FILE',
+                             help="JSON опис зваженої суміші ендпоінтів (див. request_mix.RequestMix.from_dict)")
+    request_mix.add_argument('--mix-log', metavar='FILE',
+                             help="Побудувати суміш з access-логу nginx (ваги - частоти запитів)")
+    request_mix.add_argument('--mix-top', type=int, default=50,
+                             help="Скільки найчастіших ендпоінтів логу лишити (за замовчуванням 50)")
+    request_mix.add_argument('--replay', metavar='FILE',
+                             help="Відтворити access-лог nginx з початковими інтервалами між запитами "
+                                  "(rps - оцінка пікового RPS, 0 - порахувати з логу; duration - межа тривалості)")
+    request_mix.add_argument('--speed', type=float, default=1.0,
+                             help="Прискорення відтворення логу (60 - година логу за хвилину)")
+
+    connection = parser.add_argument_group("з'єднання")
+    connection.add_argument('--connections', choices=ConnectionConfig.STRATEGIES, default='pool',
+                            help="pool - пул keep-alive з'єднань, new - нове з'єднання на кожен запит")
+    connection.add_argument('--pool-size', type=int, default=500,
+                            help="Максимум одночасних з'єднань на процес (за замовчуванням 500)")
+    connection.add_argument('--keepalive-timeout', type=float, default=15.0,
+                            help="Час життя невикористаного keep-alive з'єднання, с (за замовчуванням 15)")
+    connection.add_argument('--dns-cache-ttl', type=float, default=10,
+                            help="Час життя DNS кешу, с; 0 - без кешу (за замовчуванням 10)")
+
+    search = parser.add_argument_group("пошук насичення (rps - верхня межа, duration - тривалість проби)")
+    search.add_argument('--search', action='store_true', help="Знайти максимальний RPS, за якого виконуються SLO")
+    search.add_argument('--start-rps', type=int, default=100, help="RPS першої проби (за замовчуванням 100)")
+    search.add_argument('--slo-p99', type=float, default=0.5, help="Допустимий P99, с (за замовчуванням 0.5)")
+    search.add_argument('--max-error-rate', type=float, default=0.01,
+                        help="Допустима частка помилок (за замовчуванням 0.01)")
+    search.add_argument('--max-steps', type=int, default=12, help="Максимум проб (за замовчуванням 12)")
+
+    args = parser.parse_args(argv)
+    if sum(map(bool, (args.mix, args.mix_log, args.replay))) > 1:
+        parser.error("--mix, --mix-log та --replay не можна задавати одночасно")
+    if args.replay and args.search:
+        parser.error("--replay не поєднується з --search")
+    if args.replay:
+        args.arrival = 'replay'
+    elif args.arrival == 'replay':
+        parser.error("--arrival replay потребує --replay FILE")
+    if args.arrival is None:
+        args.arrival = 'uniform' if args.search else 'batch'
+    return args
+
+
 async def main():
     """Основна функція"""
-    if len(sys.argv) < 2:
-        print("Використання: python request_simulator.py <TARGET_URL> [RPS] [DURATION]")
-        print("Приклад: python request_simulator.py http://18.159.112.169 100 60")
-        sys.exit(1)
-    
-    target_url = sys.argv[1]
-    rps = int(sys.argv[2]) if len(sys.argv) > 2 else 100
-    duration = int(sys.argv[3]) if len(sys.argv) > 3 else 60
-    
-    simulator = RequestSimulator(target_url, rps, duration)
+    args = parse_args(sys.argv[1:])
+    connection = ConnectionConfig(args.connections, args.pool_size, args.keepalive_timeout, args.dns_cache_ttl)
+    mix = None
+    if args.mix:
+        mix = RequestMix.from_file(args.mix)
+    elif args.mix_log:
+        mix = RequestMix.from_access_log(args.mix_log, args.mix_top)
+
+    if args.search:
+        simulator = SaturationSearch(args.target_url, args.rps, args.duration, min(args.start_rps, args.rps),
+                                     args.slo_p99, args.max_error_rate, max_steps=args.max_steps,
+                                     arrival_mode=args.arrival, workers=args.workers,
+                                     latency_precision=args.latency_precision, connection=connection,
+                                     body_mode=args.body, verify_checksum=args.verify_checksum, mix=mix)
+        try:
+            await simulator.run()
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Пошук перервано користувачем")
+        simulator.print_summary()
+        simulator.save_results()
+        return
+
+    profile = parse_profile(args.profile, args.duration) if args.profile else None
+    replay = AccessLogReplay(args.replay, args.speed) if args.replay else None
+    if replay and args.rps == 0:
+        args.rps = max(math.ceil(replay.peak_rps()), 1)
+
+    simulator = RequestSimulator(args.target_url, args.rps, args.duration, args.arrival, args.workers,
+                                 args.latency_precision, args.timeseries, profile, connection,
+                                 args.body, args.verify_checksum, mix, replay)
     
     try:
         await simulator.run_simulation()
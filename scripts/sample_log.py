@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Sample Log
+Компактний append-only журнал зразків метрик: заголовок зі статичними полями
+та рядки фіксованої ширини, які можна читати через mmap
+"""
+
+import json
+import math
+import mmap
+import struct
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+MAGIC = b'MCLOG\x00\x01\n'
+HEADER_LENGTH = struct.Struct('<I')
+
+# Поля, що не змінюються протягом тесту - зберігаються один раз у заголовку
+DEFAULT_STATIC_FIELDS = ('cpu.count', 'cpu.count_logical', 'memory.total', 'memory.swap_total', 'disk.total')
+
+# Тип поля → код struct: 't' - ISO час (мікросекунди від epoch), 'f' - число (int відновлюється
+# за типом з першого зразка), 'b' - bool
+FIELD_CODES = {'t': 'q', 'f': 'd', 'i': 'd', 'b': '?'}
+
+
+def _flatten(record: Dict, prefix: str = '') -> Iterator[tuple]:
+    """Листки вкладеного запису: (шлях 'cpu.percent', значення)"""
+    for key, value in record.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{path}.")
+        else:
+            yield path, value
+
+
+def _field_type(path: str, value) -> str:
+    """Тип поля за значенням першого зразка"""
+    if isinstance(value, bool):
+        return 'b'
+    if isinstance(value, int):
+        return 'i'
+    if isinstance(value, float) or value is None:
+        return 'f'
+    if isinstance(value, str) and path == 'timestamp':
+        return 't'
+    raise ValueError(f"Поле {path} не підтримується журналом зразків: {type(value).__name__}")
+
+
+def _timestamp_to_micros(value: str) -> int:
+    moment = datetime.fromisoformat(value)
+    return int(time.mktime(moment.timetuple())) * 1_000_000 + moment.microsecond
+
+
+def _micros_to_timestamp(value: int) -> str:
+    seconds, micros = divmod(value, 1_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=micros).isoformat()
+
+
+class SampleLogWriter:
+    """
+    Запис журналу зразків
+
+    Схема визначається першим зразком: статичні поля потрапляють у JSON
+    заголовок, решта листків - у рядок фіксованої ширини (struct). Рядки
+    дописуються в кінець файлу і скидаються на диск не рідше flush_interval,
+    тож після аварійного завершення втрачаються лише останні зразки.
+    """
+
+    def __init__(self, filename: str, info: Optional[Dict] = None,
+                 static_fields: tuple = DEFAULT_STATIC_FIELDS, flush_interval: float = 1.0):
+        """
+        Args:
+            filename: Файл журналу
+            info: Довільні дані для заголовка (інтервал, джерело метрик, ...)
+            static_fields: Шляхи полів, що зберігаються лише в заголовку
+            flush_interval: Як часто скидати буфер на диск (секунди)
+        """
+        self.filename = filename
+        self.info = info or {}
+        self.static_fields = static_fields
+        self.flush_interval = flush_interval
+        self.count = 0
+
+        self._file = open(filename, 'wb')
+        self._fields = None
+        self._struct = None
+        self._last_flush = time.monotonic()
+
+    def _write_header(self, record: Dict):
+        """Схема з першого зразка"""
+        fields = []
+        codes = []
+        for path, value in _flatten(record):
+            if path in self.static_fields:
+                fields.append({'path': path, 'static': value})
+            elif isinstance(value, list):
+                field_type = _field_type(path, value[0] if value else 0.0)
+                fields.append({'path': path, 'type': field_type, 'count': len(value)})
+                codes.append(FIELD_CODES[field_type] * len(value))
+            else:
+                field_type = _field_type(path, value)
+                fields.append({'path': path, 'type': field_type})
+                codes.append(FIELD_CODES[field_type])
+
+        self._fields = fields
+        self._struct = struct.Struct('<' + ''.join(codes))
+        header = json.dumps({
+            'version': 1,
+            'info': self.info,
+            'fields': fields,
+            'row_format': self._struct.format,
+            'row_size': self._struct.size,
+        }, separators=(',', ':')).encode()
+
+        self._file.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+
+    def append(self, record: Dict):
+        """
+        Дописує зразок
+
+        Raises:
+            ValueError: Якщо зразок не відповідає схемі першого зразка
+        """
+        if self._fields is None:
+            self._write_header(record)
+
+        values = []
+        flat = dict(_flatten(record))
+        for field in self._fields:
+            if 'static' in field:
+                continue
+            value = flat.get(field['path'])
+            if 'count' in field:
+                if not isinstance(value, list) or len(value) != field['count']:
+                    raise ValueError(f"Поле {field['path']} має містити {field['count']} значень")
+                values.extend(value)
+            elif field['type'] == 't':
+                values.append(_timestamp_to_micros(value))
+            elif value is None and field['type'] != 'b':
+                values.append(math.nan)
+            else:
+                values.append(value)
+
+        self._file.write(self._struct.pack(*values))
+        self.count += 1
+
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    def close(self):
+        """Скидає буфер і закриває файл"""
+        self._file.close()
+
+
+class SampleLogReader:
+    """
+    Читання журналу зразків через mmap
+
+    Рядок i знаходиться за зсувом data_offset + i * row_size, тож доступ до
+    будь-якого зразка чи стовпця не потребує читання всього файлу. Неповний
+    останній рядок (після аварійного завершення) ігнорується.
+    """
+
+    def __init__(self, filename: str):
+        """
+        Raises:
+            ValueError: Якщо файл не є журналом зразків
+        """
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            prefix = f.read(len(MAGIC) + HEADER_LENGTH.size)
+            if len(prefix) < len(MAGIC) + HEADER_LENGTH.size or not prefix.startswith(MAGIC):
+                raise ValueError(f"{filename} не є журналом зразків метрик")
+            (header_length,) = HEADER_LENGTH.unpack_from(prefix, len(MAGIC))
+            self.header = json.loads(f.read(header_length))
+
+            self.data_offset = len(prefix) + header_length
+            self._struct = struct.Struct(self.header['row_format'])
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                if f.seek(0, 2) > self.data_offset else None
+
+        self.fields = self.header['fields']
+        self.info = self.header['info']
+
+    def __len__(self) -> int:
+        if self._map is None:
+            return 0
+        return (len(self._map) - self.data_offset) // self._struct.size
+
+    def record(self, index: int) -> Dict:
+        """Зразок у вихідній схемі MetricsCollector"""
+        values = self._struct.unpack_from(self._map, self.data_offset + index * self._struct.size)
+        return self._build(values)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(len(self)):
+            yield self.record(index)
+
+    def _build(self, values: tuple) -> Dict:
+        """Відновлює вкладений запис з рядка"""
+        record = {}
+        position = 0
+        for field in self.fields:
+            if 'static' in field:
+                value = field['static']
+            elif 'count' in field:
+                value = [self._decode(field['type'], item)
+                         for item in values[position:position + field['count']]]
+                position += field['count']
+            else:
+                value = self._decode(field['type'], values[position])
+                position += 1
+
+            target = record
+            *parents, key = field['path'].split('.')
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[key] = value
+        return record
+
+    @staticmethod
+    def _decode(field_type: str, value):
+        if field_type == 't':
+            return _micros_to_timestamp(value)
+        if field_type == 'b':
+            return value
+        if math.isnan(value):
+            return None
+        return int(value) if field_type == 'i' else value
+
+    def column(self, path: str) -> List:
+        """Значення одного поля для всіх зразків (без побудови записів)"""
+        position = 0
+        for field in self.fields:
+            if field['path'] == path:
+                if 'static' in field:
+                    return [field['static']] * len(self)
+                break
+            if 'static' not in field:
+                position += field.get('count', 1)
+        else:
+            raise KeyError(path)
+
+        size = self._struct.size
+        offsets = range(self.data_offset, self.data_offset + len(self) * size, size)
+        if 'count' in field:
+            end = position + field['count']
+            return [[self._decode(field['type'], item) for item in self._struct.unpack_from(self._map, offset)[position:end]]
+                    for offset in offsets]
+        return [self._decode(field['type'], self._struct.unpack_from(self._map, offset)[position]) for offset in offsets]
+
+    def to_numpy(self):
+        """
+        Структурований numpy.memmap над рядками журналу (без копіювання)
+
+        Поля називаються шляхами ('cpu.percent'), час - мікросекунди від epoch.
+        """
+        import numpy as np
+
+        dtype = []
+        for field in self.fields:
+            if 'static' in field:
+                continue
+            code = '<' + ('i8' if field['type'] == 't' else '?' if field['type'] == 'b' else 'f8')
+            dtype.append((field['path'], code, (field['count'],)) if 'count' in field else (field['path'], code))
+        return np.memmap(self.filename, dtype=np.dtype(dtype), mode='r', offset=self.data_offset, shape=(len(self),))
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Streaming File
+Атомарний запис streaming файлу для dashboard (current_test.json) з обмеженням
+частоти оновлень та опційними дельтами графіка
+"""
+
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, Optional, Union
+
+# mkstemp створює файл з правами 0600 - повертаємо звичайні права з урахуванням umask
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def write_json_atomic(filename: str, data: Dict, indent: Optional[int] = None):
+    """
+    Записує JSON у тимчасовий файл поруч і атомарно підміняє ним цільовий
+
+    Читач (dashboard) завжди бачить або попередню, або нову повну версію файлу.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    separators = None if indent else (',', ':')
+    payload = json.dumps(data, indent=indent, separators=separators)
+
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(filename)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(payload)
+        os.chmod(temp_path, 0o666 & ~_UMASK)
+        os.replace(temp_path, filename)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+class StreamingFileWriter:
+    """
+    Публікація стану тесту у streaming файл
+
+    Оновлення частіше ніж max_rate разів на секунду не записуються одразу, а
+    зливаються: зберігається лише останнє, і воно потрапляє у файл при
+    наступному дозволеному записі або flush(). Дані можна передати функцією -
+    тоді вони будуються лише для оновлень, які справді записуються.
+
+    З deltas=True поруч пишеться файл <name>.delta.json з тими самими полями,
+    але в timeline лише точки, додані після попереднього запису, і номером
+    версії seq. Клієнт, який бачив версію base_seq, дописує їх до свого
+    графіка, тож вартість опитування не залежить від довжини timeline.
+    """
+
+    def __init__(self, filename: str, max_rate: Optional[float] = 2.0, deltas: bool = False,
+                 indent: Optional[int] = None):
+        """
+        Args:
+            filename: Streaming файл (current_test.json)
+            max_rate: Максимум записів на секунду (None - без обмеження)
+            deltas: Додатково писати дельти графіка в <name>.delta.json
+            indent: Відступ JSON (None - компактний запис)
+        """
+        self.filename = filename
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.indent = indent
+        self.delta_filename = f"{os.path.splitext(filename)[0]}.delta.json" if deltas else None
+
+        self.seq = 0
+        self.writes = 0
+        self.coalesced = 0
+        self._pending = None
+        self._last_write = None
+        self._last_timestamp = None
+
+    def due(self) -> bool:
+        """Чи дозволений запис зараз (інакше оновлення буде злите)"""
+        return self._last_write is None or time.monotonic() - self._last_write >= self.min_interval
+
+    def publish(self, data: Union[Dict, Callable[[], Dict]], force: bool = False) -> bool:
+        """
+        Публікує новий стан
+
+        Args:
+            data: Стан для dashboard або функція без аргументів, що його будує
+            force: Записати негайно, незважаючи на обмеження частоти
+
+        Returns:
+            True якщо стан записано, False якщо його відкладено
+        """
+        if not force and not self.due():
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = data
+            return False
+
+        self._pending = None
+        self._write(data() if callable(data) else data)
+        return True
+
+    def flush(self) -> bool:
+        """Записує відкладений стан, якщо він є"""
+        if self._pending is None:
+            return False
+        return self.publish(self._pending, force=True)
+
+    def _write(self, data: Dict):
+        self.seq += 1
+        data = dict(data, seq=self.seq)
+        write_json_atomic(self.filename, data, self.indent)
+
+        if self.delta_filename:
+            timeline = data.get('timeline') or []
+            if self._last_timestamp is not None:
+                new_points = [point for point in timeline if point.get('timestamp', '') > self._last_timestamp]
+            else:
+                new_points = timeline
+            if timeline:
+                self._last_timestamp = timeline[-1].get('timestamp', self._last_timestamp)
+
+            delta = dict(data, timeline=new_points, base_seq=self.seq - 1)
+            write_json_atomic(self.delta_filename, delta, self.indent)
+
+        self.writes += 1
+        self._last_write = time.monotonic()
+
+    def update_status(self, status: str):
+        """Змінює статус в останній записаній версії (напр. 'completed' після тесту)"""
+        self.flush()
+        if not os.path.exists(self.filename):
+            return
+
+        with open(self.filename) as f:
+            data = json.load(f)
+        data['status'] = status
+        self._write(data)
@@ -0,0 +1,6 @@
+"""Скрипти імпортують сусідні модулі напряму (запускаються з scripts/)"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
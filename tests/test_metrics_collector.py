@@ -0,0 +1,63 @@
+"""Тести обліку процесів metrics_collector"""
+
+import json
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+psutil = pytest.importorskip('psutil')
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / 'scripts'
+MARKER = 'fake-nginx-marker'
+
+
+def test_process_pattern_skips_collector_ancestors():
+    """Обгортка-shell з шаблоном у командному рядку (як у оркестратора) - не процес сервера"""
+    target = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)', MARKER])
+    tracker_code = textwrap.dedent(f"""
+        import json, sys
+        sys.path.insert(0, {str(SCRIPTS_DIR)!r})
+        from metrics_collector import ProcessTracker
+        tracker = ProcessTracker(pattern={MARKER!r})
+        print(json.dumps(sorted(tracker.seen_pids)))
+    """)
+    # Shell лишається батьком трекера і містить шаблон у argv
+    wrapper = subprocess.Popen(
+        ['sh', '-c', f'"$0" -c "$1" --process "{MARKER}"; :', sys.executable, tracker_code],
+        stdout=subprocess.PIPE, text=True)
+    try:
+        output, _ = wrapper.communicate(timeout=30)
+        seen_pids = json.loads(output)
+        assert target.pid in seen_pids
+        assert wrapper.pid not in seen_pids
+    finally:
+        target.kill()
+        target.wait()
+
+
+def test_inaccessible_fds_keep_process(monkeypatch):
+    """Недоступні дескриптори не виключають процес з групи"""
+    from metrics_collector import ProcessGroupStats, ProcessTracker
+
+    def deny(process):
+        raise psutil.AccessDenied(process.pid)
+
+    monkeypatch.setattr(psutil.Process, 'num_fds', deny, raising=False)
+    target = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        tracker = ProcessTracker(pids=[target.pid])
+        time.sleep(0.1)
+        group = tracker.sample(psutil.virtual_memory().total)
+        assert group['count'] == 1
+        assert group['fds'] is None
+
+        stats = ProcessGroupStats()
+        stats.add(group)
+        assert stats.to_dict()['peak_fds'] is None
+    finally:
+        target.kill()
+        target.wait()